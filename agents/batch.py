@@ -0,0 +1,300 @@
+# /agents/batch.py
+"""
+Batch mode: runs many debates offline and writes their transcripts to JSONL.
+
+The input is a JSONL file with one debate per line, either a JSON string (the topic)
+or an object:
+
+    {"id": "q-17", "topic": "...", "num_turns": 2, "turn_policy": "parallel_rounds"}
+
+`id`, `num_turns` and `turn_policy` are optional; without an id, the line number is used.
+Debates run on a bounded pool of workers that share the process-wide limiters for
+the LLM and search APIs (utils/ratelimit.py), so adding workers raises throughput
+until the provider limit is reached, and no further.
+
+Each finished debate is appended to the output file as one JSON record and flushed
+right away, so the output doubles as a checkpoint: re-running the same command skips
+every id that already has an "ok" record and retries the rest.
+
+An output path ending in .jsonl.gz is written as a compact transcript archive instead
+(utils/transcript.py): a header line per debate, one array per turn, gzip-compressed.
+It is checkpointed the same way and is much smaller for large runs.
+
+Usage:
+    python -m agents.batch topics.jsonl --out results.jsonl --workers 8
+    python -m agents.batch topics.jsonl --out archive/results.jsonl.gz --workers 8
+    python -m agents.batch topics.jsonl --out results.jsonl --llm-rps 4 --llm-tpm 1000000 --search-rps 1
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+
+from agents.engine import run_debate
+from agents.scheduler import TURN_POLICY
+from utils.concurrency import run_sync
+from utils.console import log
+from utils.transcript import ARCHIVE_SUFFIX, Transcript, TranscriptArchive, iter_debates
+from utils.ratelimit import (
+    get_limiter,
+    limiter_stats,
+    LLM_REQUESTS_PER_SECOND,
+    LLM_TOKENS_PER_MINUTE,
+    SEARCH_REQUESTS_PER_SECOND,
+)
+
+BATCH_WORKERS = int(os.getenv("DEBATE_BATCH_WORKERS", "4"))
+DEFAULT_NUM_TURNS = 3
+
+
+def make_job(item, number: int, num_turns: int = DEFAULT_NUM_TURNS, turn_policy: str = TURN_POLICY) -> dict:
+    """
+    Turns one input item (a topic string or an object) into a job dict
+    {id, topic, num_turns, turn_policy}. `num_turns` and `turn_policy` apply when the
+    item does not set them; `number` is the id when it has none.
+    """
+    if isinstance(item, str):
+        item = {"topic": item}
+    if not isinstance(item, dict) or not item.get("topic"):
+        raise ValueError(f"Item {number} has no topic.")
+    return {
+        "id": str(item.get("id", number)),
+        "topic": item["topic"],
+        "num_turns": int(item.get("num_turns", num_turns)),
+        "turn_policy": item.get("turn_policy", turn_policy),
+    }
+
+
+def parse_batch_line(line: str, line_number: int, num_turns: int = DEFAULT_NUM_TURNS,
+                     turn_policy: str = TURN_POLICY) -> dict:
+    """Turns one JSONL line into a job dict (see `make_job`), or None if it is blank."""
+    line = line.strip()
+    if not line:
+        return None
+    return make_job(json.loads(line), line_number, num_turns, turn_policy)
+
+
+def read_batch_file(path: str, num_turns: int = DEFAULT_NUM_TURNS, turn_policy: str = TURN_POLICY) -> list:
+    """Reads every job of a JSONL topics file."""
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            job = parse_batch_line(line, line_number, num_turns, turn_policy)
+            if job is not None:
+                jobs.append(job)
+    return jobs
+
+
+def completed_ids(output_path: str) -> set:
+    """Ids that already have an "ok" record in the output file (the checkpoint)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    if output_path.endswith(ARCHIVE_SUFFIX):
+        # Only the headers matter; iter_debates skips the turns without decoding them into records
+        for header, _ in iter_debates(output_path):
+            if header.get("status") == "ok":
+                done.add(header["debate"])
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short by an interrupted run
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class RecordFile:
+    """The plain JSONL output: one complete record per debate, flushed to disk at once."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        # A run killed mid-write leaves a partial last line; start a fresh one after it
+        if not _ends_with_newline(path):
+            self._file.write("\n")
+
+    def append(self, transcript: Transcript):
+        line = json.dumps(transcript_record(transcript), ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+async def run_batch_debate(job: dict) -> Transcript:
+    """Runs one debate to completion and returns its transcript, with the run's outcome in `meta`."""
+    start = time.perf_counter()
+    transcript = Transcript(job["topic"], job["id"], status="ok", usage={})
+    usage = transcript.meta["usage"]
+    async for event in run_debate(job["topic"], job["num_turns"], turn_policy=job["turn_policy"]):
+        transcript.add(event)
+        if event['type'] == 'argument':
+            # Debate totals of input (cached and not) and output tokens
+            for key, value in event.get('usage', {}).items():
+                usage[key] = usage.get(key, 0) + value
+        elif event['type'] == 'budget':
+            transcript.meta.setdefault("budget", []).append(
+                {key: event[key] for key in ("scope", "resource", "limit", "used", "name") if key in event}
+            )
+        elif event['type'] == 'error':
+            transcript.meta["status"] = "error"
+            transcript.meta["error"] = event['content']
+    transcript.meta["seconds"] = round(time.perf_counter() - start, 3)
+    return transcript
+
+
+def transcript_record(transcript: Transcript) -> dict:
+    """The plain JSONL output record of a debate."""
+    return {
+        "id": transcript.debate_id,
+        "topic": transcript.topic,
+        "stances": [{"name": name, "stance": stance} for name, stance in transcript.stances],
+        "transcript": [turn.as_dict() for turn in transcript],
+        **transcript.meta,
+    }
+
+
+class BatchProgress:
+    """Counts of a batch run, shared by its workers and reported by the API."""
+
+    def __init__(self, total: int = 0, skipped: int = 0):
+        self.total = total
+        self.skipped = skipped
+        self.completed = 0
+        self.failed = 0
+        self.running = 0
+        self.state = "running"
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def report(self) -> dict:
+        end = self.finished or time.perf_counter()
+        elapsed = end - self.started
+        done = self.completed + self.failed
+        return {
+            "state": self.state,
+            "total": self.total,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "failed": self.failed,
+            "running": self.running,
+            "pending": self.total - self.skipped - done - self.running,
+            "seconds": round(elapsed, 3),
+            "debates_per_minute": round(done / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        }
+
+
+async def run_batch(jobs: list, output_path: str, workers: int = BATCH_WORKERS,
+                    progress: BatchProgress = None) -> BatchProgress:
+    """
+    Runs `jobs` on `workers` concurrent debates and appends one record per debate to
+    `output_path`. Jobs whose id already has an "ok" record there are skipped.
+
+    Args:
+        jobs: Job dicts as returned by `make_job`.
+        output_path: The JSONL output (and checkpoint) file; a .jsonl.gz path is written
+            as a compact transcript archive.
+        workers: Maximum number of debates in flight.
+        progress: Optional BatchProgress to update, e.g. one the API reports on.
+
+    Returns:
+        The final BatchProgress.
+    """
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # One complete debate per write, flushed at once: this is the checkpoint. Opened
+    # first, since opening an archive drops a debate a crash left unfinished.
+    output = TranscriptArchive(output_path) if output_path.endswith(ARCHIVE_SUFFIX) else RecordFile(output_path)
+
+    done = completed_ids(output_path)
+    todo = [job for job in jobs if job["id"] not in done]
+    progress = progress or BatchProgress()
+    progress.total, progress.skipped = len(jobs), len(jobs) - len(todo)
+    log(f"Batch: {len(jobs)} debates, {progress.skipped} already done, {workers} workers.")
+
+    queue = asyncio.Queue()
+    for job in todo:
+        queue.put_nowait(job)
+
+    async def worker():
+        while True:
+            try:
+                job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            progress.running += 1
+            try:
+                transcript = await run_batch_debate(job)
+            except Exception as e:
+                transcript = Transcript(job["topic"], job["id"], status="error", error=str(e))
+            finally:
+                progress.running -= 1
+
+            # The write syncs to disk: keep it off the event loop
+            await run_sync(output.append, transcript)
+
+            status = transcript.meta["status"]
+            if status == "ok":
+                progress.completed += 1
+            else:
+                progress.failed += 1
+            log(f"[{progress.completed + progress.failed}/{len(todo)}] {transcript.debate_id}: {status}"
+                  + (f" ({transcript.meta['error']})" if status != "ok" else ""))
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+        progress.state = "done"
+    except asyncio.CancelledError:
+        progress.state = "cancelled"
+        raise
+    except Exception:
+        progress.state = "failed"
+        raise
+    finally:
+        progress.finished = time.perf_counter()
+        output.close()
+
+    return progress
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a batch of debates from a JSONL file of topics.")
+    parser.add_argument("input", help="JSONL file with one topic (string or object) per line.")
+    parser.add_argument("--out", required=True, help="JSONL output file (.jsonl.gz: compact transcript archive); also used to resume an interrupted run.")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Debates run at the same time.")
+    parser.add_argument("--turns", type=int, default=DEFAULT_NUM_TURNS, help="Default turns per agent.")
+    parser.add_argument("--turn-policy", default=TURN_POLICY, help="Default turn policy.")
+    parser.add_argument("--llm-rps", type=float, default=LLM_REQUESTS_PER_SECOND, help="LLM requests per second (0: unlimited).")
+    parser.add_argument("--llm-tpm", type=float, default=LLM_TOKENS_PER_MINUTE, help="LLM tokens per minute (0: unlimited).")
+    parser.add_argument("--search-rps", type=float, default=SEARCH_REQUESTS_PER_SECOND, help="Search requests per second (0: unlimited).")
+    args = parser.parse_args()
+
+    get_limiter("llm").configure(args.llm_rps, args.llm_tpm)
+    get_limiter("search").configure(args.search_rps)
+
+    jobs = read_batch_file(args.input, num_turns=args.turns, turn_policy=args.turn_policy)
+
+    final = asyncio.run(run_batch(jobs, args.out, workers=args.workers))
+    print("--- Batch Finished ---")
+    print(json.dumps({**final.report(), "rate_limits": limiter_stats()}, indent=2))
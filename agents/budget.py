@@ -0,0 +1,220 @@
+# /agents/budget.py
+"""
+Wall time, tool call and token budgets for debate turns and whole debates.
+
+Every turn runs under a turn budget whose parent is the debate budget, so a turn stops
+at whichever of the two runs out first. Limits of 0 mean unlimited.
+
+    seconds     -> wall time; checked continuously (the agent run is cancelled)
+    tool_calls  -> tool runs; a call beyond the limit is refused before it starts
+    tokens      -> LLM input + output tokens; checked before each LLM call, so the call
+                   that crosses the limit completes
+
+When a turn's budget runs out, the debater does not fail: it makes one last LLM call
+without tools and answers with what it has gathered (see DebaterAgent). That call is
+not stopped by the token limit, and it gets the time held back for it at the start.
+When the debate budget runs out, the debate ends after the current round.
+
+LangChain logs every exception raised by a callback as a warning before re-raising it;
+those warnings are filtered out for BudgetExceeded, which is how a run is meant to stop.
+"""
+
+import os
+import time
+import logging
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.tracing import llm_usage
+
+# --- Defaults ---
+TURN_SECONDS = float(os.getenv("DEBATE_TURN_SECONDS", "90"))
+TURN_TOOL_CALLS = int(os.getenv("DEBATE_TURN_TOOL_CALLS", "3"))
+TURN_TOKENS = int(os.getenv("DEBATE_TURN_TOKENS", "0"))
+DEBATE_SECONDS = float(os.getenv("DEBATE_MAX_SECONDS", "0"))
+DEBATE_TOOL_CALLS = int(os.getenv("DEBATE_MAX_TOOL_CALLS", "0"))
+DEBATE_TOKENS = int(os.getenv("DEBATE_MAX_TOKENS", "0"))
+# Time held back from a timed turn for its final answer, at most a third of the turn
+FINAL_ANSWER_SECONDS = float(os.getenv("DEBATE_FINAL_ANSWER_SECONDS", "15"))
+
+RESOURCES = ("seconds", "tool_calls", "tokens")
+TURN_LIMITS = {"seconds": TURN_SECONDS, "tool_calls": TURN_TOOL_CALLS, "tokens": TURN_TOKENS}
+DEBATE_LIMITS = {"seconds": DEBATE_SECONDS, "tool_calls": DEBATE_TOOL_CALLS, "tokens": DEBATE_TOKENS}
+
+
+class BudgetExceeded(Exception):
+    """Raised inside an agent run when a budget is spent. `budget` is the one that ran out."""
+
+    def __init__(self, budget: "Budget", resource: str):
+        super().__init__(f"{budget.scope} {resource} budget of {budget.limits[resource]:g} spent")
+        self.budget = budget
+        self.resource = resource
+
+
+class Budget:
+    """Limits on wall time, tool calls and tokens, and what has been spent so far."""
+
+    def __init__(self, scope: str, seconds: float = 0, tool_calls: int = 0, tokens: int = 0,
+                 parent: "Budget" = None):
+        self.scope = scope
+        self.limits = {"seconds": seconds, "tool_calls": tool_calls, "tokens": tokens}
+        self.parent = parent
+        self.started = time.monotonic()
+        self.spent = {"tool_calls": 0, "tokens": 0}
+        self.stopped = None  # (budget, resource) that cut the run short, if any
+        self._lock = threading.Lock()
+
+    def child(self, scope: str, seconds: float = 0, tool_calls: int = 0, tokens: int = 0) -> "Budget":
+        """A budget whose spending also counts against this one."""
+        return Budget(scope, seconds, tool_calls, tokens, parent=self)
+
+    def used(self, resource: str) -> float:
+        if resource == "seconds":
+            return time.monotonic() - self.started
+        return self.spent[resource]
+
+    def spend(self, tool_calls: int = 0, tokens: int = 0):
+        budget = self
+        while budget is not None:
+            with budget._lock:
+                budget.spent["tool_calls"] += tool_calls
+                budget.spent["tokens"] += tokens
+            budget = budget.parent
+
+    def exhausted(self, resource: str, upcoming: int = 0) -> "Budget":
+        """The first budget up the chain with no room left for `upcoming` more of `resource`, or None."""
+        budget = self
+        while budget is not None:
+            limit = budget.limits[resource]
+            if limit and budget.used(resource) + upcoming > limit:
+                return budget
+            budget = budget.parent
+        return None
+
+    def time_left(self) -> float:
+        """Seconds left before the first deadline up the chain, or None if none is set."""
+        left = None
+        budget = self
+        while budget is not None:
+            if budget.limits["seconds"]:
+                remaining = budget.limits["seconds"] - budget.used("seconds")
+                left = remaining if left is None else min(left, remaining)
+            budget = budget.parent
+        return left
+
+    def first_deadline(self) -> "Budget":
+        """The budget up the chain whose time runs out first, or None if none is timed."""
+        first, left = None, None
+        budget = self
+        while budget is not None:
+            if budget.limits["seconds"]:
+                remaining = budget.limits["seconds"] - budget.used("seconds")
+                if left is None or remaining < left:
+                    first, left = budget, remaining
+            budget = budget.parent
+        return first
+
+    def run_seconds(self) -> float:
+        """Time the agent run may take: what is left, minus what is held back for the final answer."""
+        left = self.time_left()
+        if left is None:
+            return None
+        return max(0.0, left - min(FINAL_ANSWER_SECONDS, left / 3))
+
+    def check(self, resources: tuple = ("seconds", "tokens")):
+        """
+        The (budget, resource) of the first budget up the chain with nothing left of one of
+        `resources`, or None. Spent tool calls only mean answering without tools, so they
+        do not count by default.
+        """
+        for resource in resources:
+            budget = self.exhausted(resource, upcoming=0 if resource == "seconds" else 1)
+            if budget is not None:
+                return budget, resource
+        return None
+
+    def event(self, budget: "Budget", resource: str, **fields) -> dict:
+        """The stream event reporting that `budget` ran out of `resource`."""
+        used, limit = budget.used(resource), budget.limits[resource]
+        who = f"{fields['name']}'s " if 'name' in fields else "The "
+        return {
+            'type': 'budget',
+            'scope': budget.scope,
+            'resource': resource,
+            'limit': limit,
+            'used': round(used, 3),
+            'content': f"{who}{budget.scope} {resource.replace('_', ' ')} budget is spent ({used:.4g} of {limit:g}).",
+            **fields,
+        }
+
+    def report(self) -> dict:
+        return {resource: round(self.used(resource), 3) for resource in RESOURCES}
+
+
+class _BudgetStopFilter(logging.Filter):
+    """Drops LangChain's "Error in BudgetCallbackHandler.<event> callback: BudgetExceeded(...)" warnings."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        args = record.args if isinstance(record.args, tuple) else ()
+        return not (
+            record.msg == "Error in %s.%s callback: %s" and len(args) == 3
+            and args[0] == BudgetCallbackHandler.__name__ and str(args[2]).startswith(BudgetExceeded.__name__ + "(")
+        )
+
+
+# Other errors raised in BudgetCallbackHandler are still logged
+logging.getLogger("langchain_core.callbacks.manager").addFilter(_BudgetStopFilter())
+
+
+class BudgetCallbackHandler(BaseCallbackHandler):
+    """
+    Enforces a turn budget inside an agent run: refuses tool runs and LLM calls once the
+    budget is spent by raising BudgetExceeded, and keeps the tool results gathered so far
+    for the final answer.
+
+    Once `stop()` is called it refuses every later call, whatever is left: a run cut at
+    its deadline may go on in a worker thread after the turn has moved on.
+    """
+
+    raise_error = True  # Let BudgetExceeded stop the run instead of being logged
+    run_inline = True
+
+    def __init__(self, budget: Budget, enforce: bool = True):
+        self.budget = budget
+        self.enforce = enforce  # False for the final answer, which is only accounted for
+        self.stopped = None  # (budget, resource) that ended the turn, once stop() is called
+        self.tool_results = []  # (tool name, output) of finished tool runs
+        self._tools = {}
+
+    def stop(self, budget: Budget, resource: str):
+        """Refuses every later tool run and LLM call of this handler's run."""
+        self.stopped = (budget, resource)
+
+    def _enforce(self, resource: str, upcoming: int = 0):
+        if self.stopped is not None:
+            raise BudgetExceeded(*self.stopped)
+        if not self.enforce:
+            return
+        spent = self.budget.exhausted(resource, upcoming)
+        if spent is not None:
+            raise BudgetExceeded(spent, resource)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._enforce("tokens", upcoming=1)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._enforce("tokens", upcoming=1)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = llm_usage(response)
+        self.budget.spend(tokens=usage["input_tokens"] + usage["output_tokens"])
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._enforce("tool_calls", upcoming=1)
+        self.budget.spend(tool_calls=1)
+        self._tools[run_id] = (serialized or {}).get("name", "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        name = self._tools.pop(run_id, "tool")
+        self.tool_results.append((name, str(getattr(output, "content", output))))
@@ -1,20 +1,77 @@
 # /agents/debater.py
 
 import os
+import json
+import asyncio
 from dotenv import load_dotenv
 
-# Core LangChain agent components
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import AIMessage, HumanMessage
 
-# Our tools and new agent prompt
+# The shared, pre-compiled agent runtime (LLM + tools + prompt)
+from agents.pool import get_debater_executor, get_chat_model, DEBATER_MODEL
+from agents.budget import Budget, BudgetCallbackHandler, BudgetExceeded
 from utils.prompts import debator_agent_with_tools_template
-from tools.search import web_search
-from tools.knowledge_base import knowledge_base_search  # Import the new tool
+from utils.concurrency import run_sync
+from utils.console import log
+from utils.tracing import tracing_config, metrics
 
 load_dotenv()
 
+# When enabled, agents use the executor's native `ainvoke`. Set DEBATE_ASYNC_EXECUTORS=0
+# to fall back to running the sync `invoke` in the bounded thread pool instead.
+ASYNC_EXECUTORS = os.getenv("DEBATE_ASYNC_EXECUTORS", "1") != "0"
+
+# Tool outputs can be long (full web pages, report excerpts). Only a preview is streamed.
+TOOL_RESULT_PREVIEW_CHARS = 500
+
+TURN_INPUT_PROMPT = (
+    "Based on the conversation so far and your stance, what is your next argument? "
+    "Use your tools if you need to find new information or specific details from the knowledge base."
+)
+
+# Replaces the turn input once the turn's budget is spent; the answer is generated without tools
+FINAL_ANSWER_PROMPT = (
+    "You have no time left for research this turn: do not call any tools. "
+    "Give your next argument now, based on the conversation and what you already know."
+)
+
+# How the fallback notice of a stopped turn names the resource that ran out
+_SPENT = {"seconds": "time", "tool_calls": "tool calls", "tokens": "tokens"}
+
+def _chunk_text(content) -> str:
+    """Extracts the text from a streamed message chunk (plain string or a list of parts)."""
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type", "text") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+async def _next_before(iterator, deadline: float):
+    """
+    Awaits the next item of an async iterator, raising asyncio.TimeoutError at `deadline`
+    (event loop time; None: no limit). asyncio.timeout_at would need Python 3.11.
+    """
+    if deadline is None:
+        return await iterator.__anext__()
+    return await asyncio.wait_for(iterator.__anext__(), max(0.0, deadline - asyncio.get_running_loop().time()))
+
+def _deadline(seconds: float) -> float:
+    """The event loop time `seconds` from now, or None for no limit."""
+    if seconds is None:
+        return None
+    return asyncio.get_running_loop().time() + seconds
+
+def _tool_output_preview(output) -> str:
+    """Turns a tool's output (ToolMessage, list of results, str) into a short string."""
+    output = getattr(output, "content", output)
+    if not isinstance(output, str):
+        output = json.dumps(output, default=str)
+    return output[:TOOL_RESULT_PREVIEW_CHARS]
+
 class DebaterAgent:
     """
     Represents a tool-using debater agent. It can reason, use tools like
@@ -25,30 +82,84 @@ class DebaterAgent:
         self.stance = stance
         self.name = agent_name
         
-        # Initialize the LLM
-        llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.7)
-        
-        # Define ALL the tools the agent has access to
-        tools = [web_search, knowledge_base_search]  # Add knowledge_base_search
+        # The executor is compiled once per process and shared by every debater.
+        # Our persona (stance and topic) is passed in on each call instead.
+        self.executor = get_debater_executor()
+        log(f"--- Multi-Tool Debater Agent '{self.name}' Initialized ---")
 
-        # Partially format the prompt with the agent's specific persona.
-        # This is an advanced technique for creating specialized agents from a common template.
-        prompt = debator_agent_with_tools_template.partial(
+    def _turn_inputs(self, conversation_history: list) -> dict:
+        """Builds the executor inputs for one turn, including this agent's persona."""
+        return {
+            "stance": self.stance,
+            "topic": self.topic,
+            "input": TURN_INPUT_PROMPT,
+            "chat_history": list(conversation_history)  # Snapshot, the caller keeps appending
+        }
+
+    def _budget_config(self, handler: BudgetCallbackHandler) -> dict:
+        config = tracing_config()
+        if handler is not None:
+            config["callbacks"] = config["callbacks"] + [handler]
+        return config
+
+    def _stopped(self, budget: Budget, error: Exception, handler: BudgetCallbackHandler) -> tuple:
+        """Records and returns the (budget, resource) that ended the agent run early."""
+        if isinstance(error, BudgetExceeded):
+            budget.stopped = (error.budget, error.resource)
+        else:  # The run was cut at the deadline, minus the time held back for the answer
+            budget.stopped = (budget.first_deadline() or budget, "seconds")
+        # A sync run keeps going in its worker thread after the timeout: refuse what it tries next
+        handler.stop(*budget.stopped)
+        metrics.inc("debate_budget_stops_total", scope=budget.stopped[0].scope, resource=budget.stopped[1])
+        log(f"{self.name}'s {budget.stopped[0].scope} {budget.stopped[1]} budget ran out; answering without tools.")
+        return budget.stopped
+
+    def _final_answer_messages(self, conversation_history: list, tool_results: list) -> list:
+        """The debater prompt with the final-answer input and this turn's tool results, if any."""
+        prompt = FINAL_ANSWER_PROMPT
+        if tool_results:
+            prompt += "\n\nWhat your tools returned this turn:\n" + "\n".join(
+                f"- {name}: {output[:TOOL_RESULT_PREVIEW_CHARS]}" for name, output in tool_results
+            )
+        return debator_agent_with_tools_template.format_messages(
             stance=self.stance,
-            topic=self.topic
+            topic=self.topic,
+            chat_history=list(conversation_history),
+            input=prompt,
+            agent_scratchpad=[],
         )
 
-        # Create the agent by bundling the LLM, tools, and prompt.
-        agent = create_tool_calling_agent(llm, tools, prompt)
+    async def _astream_final_answer(self, conversation_history: list, budget: Budget, tool_results: list):
+        """
+        Streams the answer of a turn whose budget ran out: one LLM call without tools,
+        bounded by the time left. Yields text chunks; if that call fails or returns no text,
+        yields a short notice instead so the debate can go on.
+        """
+        # Its own handler: accounted for, but it must be allowed to run
+        handler = BudgetCallbackHandler(budget, enforce=False)
+        llm = get_chat_model(DEBATER_MODEL, temperature=0.7)
+        messages = self._final_answer_messages(conversation_history, tool_results)
+        produced = False
+        chunks = llm.astream(messages, config=self._budget_config(handler))
+        deadline = _deadline(budget.time_left())
+        try:
+            while True:
+                try:
+                    chunk = await _next_before(chunks, deadline)
+                except StopAsyncIteration:
+                    break
+                text = _chunk_text(chunk.content)
+                if text:
+                    produced = True
+                    yield text
+        except Exception as e:
+            log(f"{self.name}'s final answer failed: {e!r}")
+        if not produced:
+            stopped_budget, resource = budget.stopped or (budget, "seconds")
+            yield f"({self.name} ran out of {_SPENT[resource]} for this {stopped_budget.scope}.)"
 
-        # The AgentExecutor is the runtime that powers the agent.
-        self.executor = AgentExecutor(
-            agent=agent,
-            tools=tools,
-            verbose=True,  # Set to True to see the agent's thought process
-            handle_parsing_errors=True # Gracefully handles LLM output errors
-        )
-        print(f"--- Multi-Tool Debater Agent '{self.name}' Initialized ---")
+    async def _afinal_answer(self, conversation_history: list, budget: Budget, tool_results: list) -> str:
+        return "".join([text async for text in self._astream_final_answer(conversation_history, budget, tool_results)])
 
     def generate_argument(self, conversation_history: list) -> str:
         """
@@ -61,20 +172,123 @@ class DebaterAgent:
         Returns:
             A string containing the agent's final argument.
         """
-        print(f"\n--- {self.name}'s Turn (Stance: {self.stance[:60]}...) ---")
-        
-        input_prompt = (
-            "Based on the conversation so far and your stance, what is your next argument? "
-            "Use your tools if you need to find new information or specific details from the knowledge base."
-        )
+        log(f"\n--- {self.name}'s Turn (Stance: {self.stance[:60]}...) ---")
 
-        response = self.executor.invoke({
-            "input": input_prompt,
-            "chat_history": conversation_history
-        })
+        response = self.executor.invoke(self._turn_inputs(conversation_history), config=tracing_config())
         
         return response['output']
 
+    async def agenerate_argument(self, conversation_history: list, budget: Budget = None) -> str:
+        """
+        Async version of `generate_argument`. Uses the executor's `ainvoke` so LLM and
+        tool round-trips do not block the event loop, or runs the sync executor in the
+        bounded thread pool when async executors are disabled.
+
+        Args:
+            conversation_history: A list of message objects (HumanMessage, AIMessage).
+            budget: Optional turn budget (agents/budget.py). When it runs out, the turn
+                ends with one answer generated without tools, and `budget.stopped` tells
+                which limit was hit.
+
+        Returns:
+            A string containing the agent's final argument.
+        """
+        log(f"\n--- {self.name}'s Turn (Stance: {self.stance[:60]}...) ---")
+
+        payload = self._turn_inputs(conversation_history)
+        handler = BudgetCallbackHandler(budget) if budget is not None else None
+        config = self._budget_config(handler)
+        if ASYNC_EXECUTORS:
+            run = self.executor.ainvoke(payload, config=config)
+        else:
+            run = run_sync(self.executor.invoke, payload, config=config)
+        try:
+            response = await asyncio.wait_for(run, budget.run_seconds() if budget is not None else None)
+        except (BudgetExceeded, asyncio.TimeoutError) as e:
+            if budget is None:
+                raise
+            self._stopped(budget, e, handler)
+            return await self._afinal_answer(conversation_history, budget, list(handler.tool_results))
+
+        return response['output']
+
+    async def astream_argument(self, conversation_history: list, budget: Budget = None):
+        """
+        Streams the next argument as it is produced, using `astream_events`.
+
+        Args:
+            conversation_history: A list of message objects (HumanMessage, AIMessage).
+            budget: Optional turn budget, as for `agenerate_argument`.
+
+        Yields:
+            Event dicts: 'argument_delta' for each LLM token chunk, 'tool_call' and
+            'tool_result' around each tool run, and a final 'argument' with the full text.
+            Deltas from an LLM call that ends up calling a tool may not be part of the
+            final argument, so the 'argument' event is the authoritative text. If the
+            budget runs out, a 'budget' event comes first, then the deltas of the answer
+            generated without tools.
+        """
+        log(f"\n--- {self.name}'s Turn (Stance: {self.stance[:60]}...) ---")
+
+        payload = self._turn_inputs(conversation_history)
+        handler = BudgetCallbackHandler(budget) if budget is not None else None
+        deltas = []
+        final_output = None
+
+        events = self.executor.astream_events(payload, config=self._budget_config(handler), version="v2")
+        deadline = _deadline(budget.run_seconds()) if budget is not None else None
+        while True:
+            # The deadline covers the waits for the next event only, never our own yields
+            try:
+                event = await _next_before(events, deadline)
+            except StopAsyncIteration:
+                break
+            except (BudgetExceeded, asyncio.TimeoutError) as e:
+                await events.aclose()
+                if budget is None:
+                    raise
+                stopped_budget, resource = self._stopped(budget, e, handler)
+                yield budget.event(stopped_budget, resource, name=self.name)
+                answer = []
+                async for text in self._astream_final_answer(conversation_history, budget, list(handler.tool_results)):
+                    answer.append(text)
+                    yield {'type': 'argument_delta', 'name': self.name, 'content': text}
+                yield {'type': 'argument', 'name': self.name, 'content': "".join(answer)}
+                return
+            kind = event["event"]
+
+            if kind == "on_chat_model_stream":
+                text = _chunk_text(event["data"]["chunk"].content)
+                if text:
+                    deltas.append(text)
+                    yield {'type': 'argument_delta', 'name': self.name, 'content': text}
+
+            elif kind == "on_tool_start":
+                yield {
+                    'type': 'tool_call',
+                    'name': self.name,
+                    'tool': event["name"],
+                    'input': event["data"].get("input"),
+                }
+
+            elif kind == "on_tool_end":
+                yield {
+                    'type': 'tool_result',
+                    'name': self.name,
+                    'tool': event["name"],
+                    'content': _tool_output_preview(event["data"].get("output")),
+                }
+
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # The root run is the AgentExecutor itself; its output holds the final answer.
+                output = event["data"].get("output")
+                if isinstance(output, dict):
+                    final_output = output.get("output")
+
+        if final_output is None:
+            final_output = "".join(deltas)
+        yield {'type': 'argument', 'name': self.name, 'content': final_output}
+
 # --- Test Block ---
 if __name__ == '__main__':
     print("--- Running Multi-Tool Debater Agent Test ---")
@@ -0,0 +1,139 @@
+# /agents/engine.py
+
+from langchain_core.messages import AIMessage
+
+from agents.orchestrator import agenerate_debate_stances
+from agents.debater import DebaterAgent
+from agents.scheduler import TurnError, TURN_POLICIES, TURN_POLICY, arun_round, plan_rounds
+from agents.budget import Budget, TURN_LIMITS, DEBATE_LIMITS
+from agents.pool import get_chat_model, SUMMARY_MODEL
+from utils.history import ConversationHistory, build_llm_summarizer, HISTORY_TURNS, HISTORY_TOKEN_BUDGET
+from utils.tracing import DebateTrace, activate_trace, metrics
+from utils.transcript import Transcript, get_archive
+from utils.concurrency import run_sync
+
+DEFAULT_OPENING = "The debate on '{topic}' has begun."
+
+
+async def run_debate(topic: str, num_turns: int, opening: str = DEFAULT_OPENING,
+                     stream_tokens: bool = False, history_turns: int = HISTORY_TURNS,
+                     history_token_budget: int = HISTORY_TOKEN_BUDGET, fresh: bool = False,
+                     timings: bool = False, turn_policy: str = TURN_POLICY,
+                     turn_limits: dict = None, debate_limits: dict = None):
+    """
+    Async turn engine shared by the API and the CLI. It runs the whole debate
+    without blocking the event loop and yields one event dict per step, so callers
+    decide how to present them (SSE frames, console output, ...).
+
+    Args:
+        topic: The topic of the debate.
+        num_turns: How many times each agent speaks.
+        opening: The moderator's opening message. May use `{topic}` and `{num_agents}`.
+        stream_tokens: If True, each turn is streamed as it is produced ('argument_delta',
+            'tool_call' and 'tool_result' events) before its final 'argument' event.
+        history_turns: Turns each agent sees verbatim; older turns are summarized.
+        history_token_budget: Maximum estimated tokens of history sent to an agent per turn.
+        fresh: Generate new stances even if cached ones exist for this topic.
+        timings: If True, a 'timings' event with the debate's span summary is sent at the end.
+        turn_policy: How turns are scheduled: 'sequential', 'parallel_openings' or
+            'parallel_rounds' (see agents/scheduler.py). Within a parallel round, streaming
+            events of different agents are interleaved.
+        turn_limits: Overrides of the per-turn budget ({seconds, tool_calls, tokens},
+            see agents/budget.py); the rest come from TURN_LIMITS.
+        debate_limits: Overrides of the whole debate's budget; the rest come from DEBATE_LIMITS.
+
+    Yields:
+        Event dicts with a `type` key: 'status', 'agent_stance', 'argument', 'budget' or
+        'error', plus the streaming event types above when `stream_tokens` is set.
+
+    When DEBATE_TRANSCRIPT_ARCHIVE is set, the finished debate's transcript is appended
+    to that archive (utils/transcript.py).
+    """
+    if turn_policy not in TURN_POLICIES:
+        yield {'type': 'error', 'content': f"Unknown turn policy '{turn_policy}'. Use one of: {', '.join(TURN_POLICIES)}."}
+        return
+
+    # Spans recorded while this debate runs (LLM calls, tools, retrieval...) go to its trace
+    trace = activate_trace(DebateTrace())
+    metrics.add_gauge("debate_active", 1)
+    archive = get_archive()
+    transcript = Transcript(topic, status="ok") if archive is not None else None
+    try:
+        turn_limits = {**TURN_LIMITS, **(turn_limits or {})}
+        budget = Budget("debate", **{**DEBATE_LIMITS, **(debate_limits or {})})
+        async for event in _run_debate(topic, num_turns, opening, stream_tokens, history_turns,
+                                       history_token_budget, fresh, turn_policy, turn_limits, budget):
+            if timings and event['type'] == 'status' and event['content'] == 'Debate concluded.':
+                yield {'type': 'timings', **trace.summary()}
+            if transcript is not None:
+                transcript.add(event)
+                if event['type'] == 'error':
+                    transcript.meta.update(status="error", error=event['content'])
+            yield event
+        if transcript is not None:
+            transcript.meta["seconds"] = round(budget.used("seconds"), 3)
+            await run_sync(archive.append, transcript)
+    finally:
+        metrics.add_gauge("debate_active", -1)
+
+
+async def _run_debate(topic, num_turns, opening, stream_tokens, history_turns, history_token_budget, fresh,
+                      turn_policy, turn_limits, budget):
+    """The debate itself; see `run_debate` for the arguments and events."""
+    # 1. Generate stances
+    yield {'type': 'status', 'content': 'Orchestrator is generating stances...'}
+    try:
+        stances = await agenerate_debate_stances(topic, fresh=fresh)
+        if len(stances) < 2:
+            yield {'type': 'error', 'content': 'Failed: Orchestrator did not generate enough stances.'}
+            return
+    except Exception as e:
+        yield {'type': 'error', 'content': f'Error during stance generation: {e}'}
+        return
+
+    # 2. Initialize Debater Agents
+    agent_names = [f"Agent {chr(65+i)}" for i in range(len(stances))]  # Agent A, B, etc.
+    debaters = [
+        DebaterAgent(topic=topic, stance=stance, agent_name=name)
+        for name, stance in zip(agent_names, stances)
+    ]
+
+    for agent in debaters:
+        yield {'type': 'agent_stance', 'name': agent.name, 'stance': agent.stance}
+
+    # 3. Run the Debate Loop
+    # Older turns are folded into a running summary, so per-turn prompt size stays flat.
+    history = ConversationHistory(
+        opening.format(topic=topic, num_agents=len(debaters)),
+        keep_last_turns=history_turns,
+        token_budget=history_token_budget,
+        summarizer=build_llm_summarizer(get_chat_model(SUMMARY_MODEL, temperature=0)),
+    )
+    rounds = plan_rounds(turn_policy, len(debaters), num_turns)
+
+    for r, speaker_indices in enumerate(rounds):
+        spent = budget.check()
+        if spent is not None:
+            # Out of debate time or tokens: end here rather than start turns that cannot finish
+            yield budget.event(*spent)
+            break
+
+        speakers = [debaters[i] for i in speaker_indices]
+        for speaker in speakers:
+            yield {'type': 'status', 'content': f'{speaker.name} is thinking...'}
+
+        # Everyone in the round answers the same snapshot; arguments come back in agent order
+        turn_budgets = [budget.child("turn", **turn_limits) for _ in speakers]
+        try:
+            async for event in arun_round(speakers, history.context(), stream_tokens, turn_budgets):
+                if event['type'] == 'argument':
+                    history.append(AIMessage(content=event['content'], name=event['name']))
+                yield event
+        except TurnError as e:
+            yield {'type': 'error', 'content': f'Error during {e.agent}\'s turn: {e.error}'}
+            return
+
+        if r < len(rounds) - 1:
+            await history.acompact()
+
+    yield {'type': 'status', 'content': 'Debate concluded.'}
@@ -1,4 +1,5 @@
 import os
+import math
 from dotenv import load_dotenv
 load_dotenv()
 import re
@@ -6,45 +7,159 @@ import re
 from pydantic import BaseModel, Field
 
 from langchain_core.output_parsers import PydanticOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import StrOutputParser
 
 from utils.prompts import orchestrator_template
+from agents.pool import get_chat_model
+from tools.embeddings import get_embeddings
+from utils.cache import TTLCache, normalize_query
+from utils.concurrency import run_sync
+from utils.console import log
+from utils.tracing import span, tracing_config
 
 class DebateStance(BaseModel):
     stances: list[str] = Field(description="A list of 2-3 distinct and polarizing debate stances.")
     
 google_api_key = os.getenv("google_api_key")
 
-def generate_debate_stances(topic:str) ->list[str]:
-    """Uses an LLM to generate polarized stances for a given debate topic.
-    This function demonstrates a simple LangChain Expression Language (LCEL) chain.
+# The chain is stateless, so it is built once and reused by every request.
+_orchestrator_chain = None
 
-    Args:
-        topic: The topic of the debate.
+# --- Stance Cache ---
+# Popular topics repeat a lot, so validated stances are cached by normalized topic.
+# With STANCE_CACHE_SIMILARITY set (e.g. 0.92), a topic whose embedding is at least that
+# similar to a cached one reuses its stances too. 0 disables the similarity lookup.
+STANCE_CACHE_TTL = float(os.getenv("STANCE_CACHE_TTL", "86400"))
+STANCE_CACHE_SIMILARITY = float(os.getenv("STANCE_CACHE_SIMILARITY", "0"))
 
-    Returns:
-        A list of strings, where each string is a distinct debate stance.
+_stance_cache = TTLCache(
+    "debate_stances",
+    max_entries=int(os.getenv("STANCE_CACHE_SIZE", "256")),
+    ttl_seconds=STANCE_CACHE_TTL,
+)
+_topic_vectors = {}  # normalized topic -> embedding, for the similarity lookup
+
+def normalize_topic(topic: str) -> str:
+    """Case-folds, collapses whitespace and strips quotes/trailing punctuation from a topic."""
+    return normalize_query(normalize_query(topic).strip("\"'“”‘’"))
+
+def _is_valid(result: DebateStance) -> bool:
+    # Only results usable for a debate are cached
+    return len(result.stances) >= 2
+
+def _cosine(a: list, b: list) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+def _cache_key(topic: str) -> str:
     """
-    print("Orchestrator initializing...")
-    
+    Returns the cache key for a topic: its normalized form, or the key of a cached topic
+    that is similar enough when the similarity lookup is enabled.
+    """
+    key = normalize_topic(topic)
+    if STANCE_CACHE_SIMILARITY <= 0 or key in _stance_cache:
+        return key
+
+    vector = _topic_vectors.get(key) or get_embeddings().embed_query(key)
+    best_key, best_score = key, STANCE_CACHE_SIMILARITY
+    for other_key, other_vector in list(_topic_vectors.items()):
+        if other_key not in _stance_cache:
+            _topic_vectors.pop(other_key, None)  # Expired or evicted
+            continue
+        score = _cosine(vector, other_vector)
+        if score >= best_score:
+            best_key, best_score = other_key, score
+    _topic_vectors[key] = vector
+    if best_key != key:
+        log(f"Reusing stances of similar topic '{best_key}' (similarity {best_score:.3f})")
+    return best_key
+
+def _build_orchestrator_chain():
+    """Returns the shared prompt | llm | parser chain used to generate stances."""
+    global _orchestrator_chain
+    if _orchestrator_chain is not None:
+        return _orchestrator_chain
+
     parser= PydanticOutputParser(pydantic_object=DebateStance)
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash",
+    llm = get_chat_model(
+        "gemini-2.0-flash",
         temperature=0.7,
         google_api_key=google_api_key
     )
     
-    print("orchestrator chain initialized.")
+    log("orchestrator chain initialized.")
     orchestrator_prompt = orchestrator_template.partial(
         format_instructions=parser.get_format_instructions(),
         messages=[]  # Initialize the agent's scratchpad as an empty list
     )
-    orchestrator_chain = orchestrator_prompt | llm | parser
-    
-    response_object = orchestrator_chain.invoke({"topic": topic})
-    print("Orchestrator response received :",response_object)
-    return response_object.stances
+    _orchestrator_chain = orchestrator_prompt | llm | parser
+    return _orchestrator_chain
+
+def generate_debate_stances(topic:str, fresh: bool = False) ->list[str]:
+    """Uses an LLM to generate polarized stances for a given debate topic.
+    This function demonstrates a simple LangChain Expression Language (LCEL) chain.
+    Results are cached by normalized topic.
+
+    Args:
+        topic: The topic of the debate.
+        fresh: Skip the cache and generate new stances (the cache is then updated).
+
+    Returns:
+        A list of strings, where each string is a distinct debate stance.
+    """
+    log("Orchestrator initializing...")
+    orchestrator_chain = _build_orchestrator_chain()
+
+    def _generate():
+        response_object = orchestrator_chain.invoke({"topic": topic}, config=tracing_config())
+        log("Orchestrator response received :",response_object)
+        return response_object
+
+    with span("stance_generation", cache="bypass" if fresh else "miss") as attrs:
+        if fresh:
+            response_object = _generate()
+            if _is_valid(response_object):
+                _stance_cache.put(normalize_topic(topic), response_object)
+        else:
+            key = _cache_key(topic)
+            if key in _stance_cache:
+                attrs["cache"] = "hit"
+            response_object = _stance_cache.get_or_compute(key, _generate, cacheable=_is_valid)
+    return list(response_object.stances)
+
+async def agenerate_debate_stances(topic:str, fresh: bool = False) ->list[str]:
+    """Async version of `generate_debate_stances`.
+    Uses `ainvoke` so the LLM round-trip does not block the event loop. Concurrent
+    requests for the same topic share one orchestrator call.
+
+    Args:
+        topic: The topic of the debate.
+        fresh: Skip the cache and generate new stances (the cache is then updated).
+
+    Returns:
+        A list of strings, where each string is a distinct debate stance.
+    """
+    log("Orchestrator initializing (async)...")
+    orchestrator_chain = _build_orchestrator_chain()
+
+    async def _generate():
+        response_object = await orchestrator_chain.ainvoke({"topic": topic}, config=tracing_config())
+        log("Orchestrator response received :",response_object)
+        return response_object
+
+    with span("stance_generation", cache="bypass" if fresh else "miss") as attrs:
+        if fresh:
+            response_object = await _generate()
+            if _is_valid(response_object):
+                _stance_cache.put(normalize_topic(topic), response_object)
+        else:
+            # The similarity lookup may need an embedding call, so keep it off the event loop
+            key = await run_sync(_cache_key, topic) if STANCE_CACHE_SIMILARITY > 0 else normalize_topic(topic)
+            if key in _stance_cache:
+                attrs["cache"] = "hit"
+            response_object = await _stance_cache.aget_or_compute(key, _generate, cacheable=_is_valid)
+    return list(response_object.stances)
 
 if __name__ == "__main__":
     print("Starting Orchestrator...")
@@ -0,0 +1,149 @@
+# /agents/pool.py
+
+import os
+import time
+import importlib
+import threading
+from typing import TYPE_CHECKING
+
+from utils.prompts import debator_agent_with_tools_template
+from utils.console import VERBOSE, log, warn
+from utils.ratelimit import RateLimitedChatModel
+from tools.search import web_search
+from tools.knowledge_base import knowledge_base_search
+
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+
+# The debater prompt is ordered so consecutive turns share the longest prefix possible.
+# Gemini 2.5 models cache such prefixes implicitly and bill them at a discount; the default
+# gemini-2.0-flash has no implicit caching, so nothing is cached unless DEBATE_MODEL names
+# a 2.5 model (e.g. gemini-2.5-flash).
+DEBATER_MODEL = os.getenv("DEBATE_MODEL", "gemini-2.0-flash")
+# Folds older turns into the running history summary (utils/history.py)
+SUMMARY_MODEL = os.getenv("DEBATE_SUMMARY_MODEL", "gemini-2.0-flash")
+DEBATER_TOOLS = [web_search, knowledge_base_search]
+
+# Heavy SDKs (Gemini, LangChain agents, Tavily, Chroma) are imported on first use so the
+# API and CLI start fast. DEBATE_PRELOAD=1 loads them at server startup instead, so the
+# first debate does not pay for them.
+PRELOAD = os.getenv("DEBATE_PRELOAD", "0") == "1"
+
+# Process-wide pools. LLM clients keep their HTTP connections alive, so sharing one
+# client per configuration avoids reconnecting on every debate. Compiled executors are
+# stateless between calls: the stance and topic are passed in at invoke time.
+_chat_models = {}
+_executors = {}
+_lock = threading.Lock()
+_chat_model_factory = None  # None: Gemini, imported on first use
+
+
+def get_chat_model(model: str = DEBATER_MODEL, temperature: float = 0.7, **kwargs) -> RateLimitedChatModel:
+    """
+    Returns the shared chat model client for this configuration, creating it once.
+
+    Args:
+        model: The Gemini model name.
+        temperature: Sampling temperature.
+        **kwargs: Any other ChatGoogleGenerativeAI argument (e.g. google_api_key).
+
+    Every client goes through the process-wide 'llm' limiter (rate and token budgets,
+    retries, circuit breaker), so Gemini's own retries are turned off.
+    """
+    key = (model, temperature, tuple(sorted(kwargs.items())))
+    with _lock:
+        llm = _chat_models.get(key)
+        if llm is None:
+            options = dict(kwargs)
+            factory = _chat_model_factory
+            if factory is None:
+                # The Gemini SDK is slow to import, so it is only loaded for the first client
+                from langchain_google_genai import ChatGoogleGenerativeAI
+                factory = ChatGoogleGenerativeAI
+                options.setdefault("max_retries", 1)
+            inner = factory(model=model, temperature=temperature, **options)
+            llm = RateLimitedChatModel(inner=inner, provider="llm")
+            _chat_models[key] = llm
+    return llm
+
+
+def set_chat_model_factory(factory):
+    """
+    Replaces the class used to build chat models (e.g. a fake model for benchmarks) and
+    empties the pools. Call it before any chain or executor is built.
+
+    Args:
+        factory: Callable taking (model=..., temperature=..., **kwargs), or None to restore Gemini.
+    """
+    global _chat_model_factory
+    with _lock:
+        _chat_model_factory = factory
+        _chat_models.clear()
+        _executors.clear()
+
+
+def get_debater_executor(verbose: bool = VERBOSE) -> "AgentExecutor":
+    """
+    Returns the shared debater AgentExecutor. Its prompt takes `stance` and `topic` as
+    runtime inputs instead of `partial` bindings, so one compiled agent serves every
+    debater in every debate.
+    """
+    key = ("debater", verbose)
+    with _lock:
+        executor = _executors.get(key)
+    if executor is not None:
+        return executor
+
+    # Core LangChain agent components, imported with the first executor
+    from langchain.agents import AgentExecutor, create_tool_calling_agent
+
+    llm = get_chat_model(DEBATER_MODEL, temperature=0.7)
+    # Create the agent by bundling the LLM, tools, and prompt.
+    agent = create_tool_calling_agent(llm, DEBATER_TOOLS, debator_agent_with_tools_template)
+
+    # The AgentExecutor is the runtime that powers the agent.
+    executor = AgentExecutor(
+        agent=agent,
+        tools=DEBATER_TOOLS,
+        verbose=verbose,  # Prints the agent's thought process; off when DEBATE_VERBOSE=0
+        handle_parsing_errors=True # Gracefully handles LLM output errors
+    )
+    with _lock:
+        # Another thread may have built one meanwhile; keep the first so everyone shares it
+        executor = _executors.setdefault(key, executor)
+    return executor
+
+
+def warm_up() -> dict:
+    """
+    Imports the vendor SDKs the debate path loads lazily and builds the shared debater
+    executor, so the first request does not pay for them. A backend that cannot be set
+    up yet (e.g. no API key) is reported and left to fail on first use as before.
+
+    Returns:
+        Seconds spent per step.
+    """
+    steps = [
+        ("langchain.agents", lambda: importlib.import_module("langchain.agents")),
+        ("langchain_google_genai", lambda: importlib.import_module("langchain_google_genai")),
+        ("tavily", lambda: importlib.import_module("langchain_community.tools.tavily_search").TavilySearchResults),
+        ("chroma", lambda: (importlib.import_module("langchain_community.vectorstores").Chroma,
+                            importlib.import_module("chromadb"))),
+        ("debater_executor", get_debater_executor),
+    ]
+    timings = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            warn(f"Warm-up step '{name}' failed: {e}")
+        timings[name] = round(time.perf_counter() - start, 3)
+    log(f"Warm-up finished in {sum(timings.values()):.2f}s: {timings}")
+    return timings
+
+
+def pool_stats() -> dict:
+    """Number of pooled clients and executors, for diagnostics."""
+    with _lock:
+        return {"chat_models": len(_chat_models), "executors": len(_executors)}
@@ -0,0 +1,136 @@
+# /agents/scheduler.py
+"""
+Turn scheduling for the debate engine.
+
+A debate is planned as a list of rounds. Every agent in a round answers the same
+history snapshot, concurrently, and their arguments are appended to the history in
+agent order, so the transcript does not depend on which answer arrives first.
+
+    sequential         -> one agent per round, round-robin (every turn sees all earlier ones)
+    parallel_openings  -> all opening statements in one round, then round-robin
+    parallel_rounds    -> every round is all agents at once
+"""
+
+import os
+import time
+import asyncio
+
+from utils.tracing import span, usage_scope, turn_usage
+
+TURN_POLICIES = ("sequential", "parallel_openings", "parallel_rounds")
+TURN_POLICY = os.getenv("DEBATE_TURN_POLICY", "sequential")
+
+
+class TurnError(Exception):
+    """Raised when an agent's turn fails. `agent` is its name, the cause is chained."""
+
+    def __init__(self, agent: str, error: Exception):
+        super().__init__(f"{agent}: {error}")
+        self.agent = agent
+        self.error = error
+
+
+def plan_rounds(policy: str, num_agents: int, num_turns: int) -> list:
+    """
+    Groups the debate's turns into rounds.
+
+    Args:
+        policy: One of TURN_POLICIES.
+        num_agents: Number of debaters.
+        num_turns: Turns per debater.
+
+    Returns:
+        A list of rounds, each a list of agent indices that run concurrently.
+    """
+    if policy not in TURN_POLICIES:
+        raise ValueError(f"Unknown turn policy '{policy}'. Use one of: {', '.join(TURN_POLICIES)}.")
+    everyone = list(range(num_agents))
+    if policy == "parallel_rounds":
+        return [everyone for _ in range(num_turns)]
+    rounds = [[i % num_agents] for i in range(num_agents * num_turns)]
+    if policy == "parallel_openings" and num_turns > 0:
+        rounds = [everyone] + rounds[num_agents:]
+    return rounds
+
+
+async def _take_turn(debater, context: list, stream_tokens: bool, emit, budget=None) -> tuple:
+    """
+    Runs one debater's turn under `budget` (if any), passing its streaming and budget
+    events to `emit`, and returns (argument, metadata) where metadata holds the token
+    usage of the turn's LLM calls, its tool calls and its wall time.
+    """
+    start = time.perf_counter()
+    tool_calls = 0
+    with span("agent_turn", agent=debater.name), usage_scope() as usage:
+        if not stream_tokens:
+            argument = await debater.agenerate_argument(context, budget)
+            if budget is not None and budget.stopped:
+                emit(budget.event(*budget.stopped, name=debater.name))
+        else:
+            argument = None
+            async for event in debater.astream_argument(context, budget):
+                if event['type'] == 'argument':
+                    argument = event['content']
+                else:
+                    tool_calls += event['type'] == 'tool_call'
+                    emit(event)
+    if budget is not None:
+        tool_calls = budget.spent["tool_calls"]
+    return argument, {
+        'usage': turn_usage(usage),
+        'tool_calls': tool_calls,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+async def arun_round(debaters: list, context: list, stream_tokens: bool = False, budgets: list = None):
+    """
+    Runs one round: every debater answers the same `context` concurrently.
+
+    Args:
+        debaters: The DebaterAgents speaking in this round, in transcript order.
+        context: The history snapshot they all answer.
+        stream_tokens: Forward 'argument_delta', 'tool_call' and 'tool_result' events.
+        budgets: Optional turn budget per debater (agents/budget.py). A turn whose budget
+            runs out emits a 'budget' event and ends with an answer given without tools.
+
+    Yields:
+        The debaters' streaming events as they are produced (each carries the agent's
+        name), then one 'argument' event per debater, in the order of `debaters`. Its
+        'usage' holds the turn's input tokens, how many of them the provider served from
+        its prompt cache (cached_input_tokens) and how many it did not, and output tokens;
+        'tool_calls' and 'seconds' count the turn's tool runs and wall time.
+
+    Raises:
+        TurnError: As soon as one turn fails; the other turns are cancelled.
+    """
+    queue = asyncio.Queue()
+    budgets = budgets or [None] * len(debaters)
+
+    async def turn(debater, budget):
+        try:
+            return await _take_turn(debater, context, stream_tokens, queue.put_nowait, budget)
+        except Exception as e:
+            raise TurnError(debater.name, e) from e
+        finally:
+            queue.put_nowait(None)  # Marks this turn as finished
+
+    tasks = [asyncio.create_task(turn(debater, budget)) for debater, budget in zip(debaters, budgets)]
+    try:
+        running = len(tasks)
+        while running:
+            event = await queue.get()
+            if event is not None:
+                yield event
+                continue
+            running -= 1
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        results = [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    for debater, (argument, turn) in zip(debaters, results):
+        yield {'type': 'argument', 'name': debater.name, 'content': argument, **turn}
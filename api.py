@@ -1,16 +1,29 @@
 # /api.py
 
-import asyncio
+import os
+import re
 import json
-from fastapi import FastAPI
-from fastapi.responses import StreamingResponse
+import uuid
+import asyncio
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 # Import our backend logic
-from agents.orchestrator import generate_debate_stances
-from agents.debater import DebaterAgent
-from langchain_core.messages import HumanMessage, AIMessage
+from agents.engine import run_debate
+from agents.scheduler import TURN_POLICY
+from agents.pool import PRELOAD, warm_up
+from agents.budget import TURN_LIMITS, DEBATE_LIMITS
+from agents.batch import BatchProgress, BATCH_WORKERS, DEFAULT_NUM_TURNS, make_job, run_batch
+from utils.concurrency import run_sync, shutdown_sync_pool
+from utils.cache import cache_stats
+from utils.history import HISTORY_TURNS, HISTORY_TOKEN_BUDGET
+from utils.tracing import metrics
+from utils.ratelimit import limiter_stats
+from utils.sessions import get_session_store, close_session_store, start_session, follow_session, session_transcript
+from tools.embeddings import embedding_cache_stats
 
 # --- FastAPI App Initialization ---
 app = FastAPI()
@@ -22,66 +35,228 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Debate-Id"],  # Lets the frontend read the id of a new debate
 )
 
+@app.on_event("startup")
+def _startup():
+    # Opening the session store closes debates a previous server process left running
+    get_session_store()
+    if PRELOAD:
+        # Pay for the heavy SDK imports now rather than on the first debate
+        warm_up()
+
+@app.on_event("shutdown")
+def _shutdown():
+    # Release the threads used for blocking LLM/tool calls
+    shutdown_sync_pool()
+    # Commit the session events still queued for the store
+    close_session_store()
+
 # --- Pydantic Model for Request Body ---
 class DebateRequest(BaseModel):
     topic: str
     num_turns: int = 3
+    stream_tokens: bool = False  # Stream token deltas and tool events for each turn
+    history_turns: int = HISTORY_TURNS  # Turns each agent sees verbatim, older ones are summarized
+    history_token_budget: int = HISTORY_TOKEN_BUDGET  # Max history tokens sent to an agent per turn
+    fresh: bool = False  # Skip the stance cache and generate new stances for this topic
+    timings: bool = False  # Send a 'timings' event with per-span latencies before the debate ends
+    turn_policy: str = TURN_POLICY  # 'sequential', 'parallel_openings' or 'parallel_rounds'
+    # Budgets (0: unlimited). A turn over budget answers without tools; a debate over budget ends early.
+    turn_seconds: float = TURN_LIMITS["seconds"]
+    turn_tool_calls: int = TURN_LIMITS["tool_calls"]
+    turn_tokens: int = TURN_LIMITS["tokens"]
+    max_seconds: float = DEBATE_LIMITS["seconds"]
+    max_tool_calls: int = DEBATE_LIMITS["tool_calls"]
+    max_tokens: int = DEBATE_LIMITS["tokens"]
 
 # --- Asynchronous Generator for Streaming the Debate ---
-async def run_debate_stream(topic: str, num_turns: int):
+def _sse(event: dict, event_id: int = None) -> str:
+    """Frames an event dict as a Server-Sent Events message, with an `id:` line when given."""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}data: {json.dumps(event)}\n\n"
+
+async def stream_session(debate_id: str, after: int = 0):
     """
-    This function runs the debate and yields each turn as a JSON string.
+    Yields the debate's events numbered above `after` as SSE frames, then follows it live.
+    The debate runs in its own task: a dropped connection only ends this stream.
     """
-    # 1. Generate stances
-    yield f"data: {json.dumps({'type': 'status', 'content': 'Orchestrator is generating stances...'})}\n\n"
-    try:
-        stances = generate_debate_stances(topic)
-        if len(stances) < 2:
-            yield f"data: {json.dumps({'type': 'error', 'content': 'Failed: Orchestrator did not generate enough stances.'})}\n\n"
-            return
-    except Exception as e:
-        yield f"data: {json.dumps({'type': 'error', 'content': f'Error during stance generation: {e}'})}\n\n"
-        return
-
-    # 2. Initialize Debater Agents
-    agent_names = [f"Agent {chr(65+i)}" for i in range(len(stances))]
-    debaters = [
-        DebaterAgent(topic=topic, stance=stance, agent_name=name)
-        for name, stance in zip(agent_names, stances)
-    ]
-    
-    for agent in debaters:
-        yield f"data: {json.dumps({'type': 'agent_stance', 'name': agent.name, 'stance': agent.stance})}\n\n"
-    
-    # 3. Run the Debate Loop
-    conversation_history = [HumanMessage(content=f"The debate on '{topic}' has begun.")]
-    total_exchanges = len(debaters) * num_turns
-
-    for i in range(total_exchanges):
-        current_debater = debaters[i % len(debaters)]
-        
-        yield f"data: {json.dumps({'type': 'status', 'content': f'{current_debater.name} is thinking...'})}\n\n"
-        
-        argument = current_debater.generate_argument(conversation_history)
-        agent_message = AIMessage(content=argument, name=current_debater.name)
-        conversation_history.append(agent_message)
-        
-        # Yield the argument
-        yield f"data: {json.dumps({'type': 'argument', 'name': current_debater.name, 'content': argument})}\n\n"
-        await asyncio.sleep(1) # Small delay for better UX
-
-    yield f"data: {json.dumps({'type': 'status', 'content': 'Debate concluded.'})}\n\n"
+    async for seq, event in follow_session(debate_id, after):
+        yield _sse(event, seq)
 
 # --- FastAPI Endpoint ---
 @app.post("/debate")
 async def debate_endpoint(request: DebateRequest):
     """
-    This endpoint streams a debate on a given topic.
+    This endpoint starts a debate on a given topic and streams it.
+
+    All LLM and tool calls are awaited, so one debate never stalls the other streams.
+    With `stream_tokens`, 'argument_delta', 'tool_call' and 'tool_result' events are
+    forwarded as soon as they are produced. With `timings`, a 'timings' event
+    summarizing the debate's spans is sent before it concludes. `turn_policy`
+    selects which turns run concurrently (see agents/scheduler.py). The `turn_*` and
+    `max_*` budgets bound each turn and the whole debate; a spent budget is reported
+    with a 'budget' event (see agents/budget.py).
+
+    The first event is {'type': 'session', 'debate_id': ...} (also sent as the
+    X-Debate-Id header). If the connection drops, reconnect to
+    /debate/{debate_id}/events with the last received event id.
     """
+    events = run_debate(
+        request.topic,
+        request.num_turns,
+        stream_tokens=request.stream_tokens,
+        history_turns=request.history_turns,
+        history_token_budget=request.history_token_budget,
+        fresh=request.fresh,
+        timings=request.timings,
+        turn_policy=request.turn_policy,
+        turn_limits={"seconds": request.turn_seconds, "tool_calls": request.turn_tool_calls, "tokens": request.turn_tokens},
+        debate_limits={"seconds": request.max_seconds, "tool_calls": request.max_tool_calls, "tokens": request.max_tokens},
+    )
+    session = start_session(request.topic, request.model_dump(), events)
     return StreamingResponse(
-        run_debate_stream(request.topic, request.num_turns),
-        media_type="text/event-stream"
+        stream_session(session.id),
+        media_type="text/event-stream",
+        headers={"X-Debate-Id": session.id},
     )
 
+@app.get("/debate/{debate_id}/events")
+async def debate_events_endpoint(debate_id: str, after: int = 0,
+                                 last_event_id: Optional[str] = Header(default=None)):
+    """
+    Replays a debate's events after the given event id (the `Last-Event-ID` header, or
+    `after`), then streams the rest live. Replays never re-run any LLM call.
+    """
+    if await run_sync(get_session_store().get, debate_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown debate {debate_id}.")
+    if last_event_id is not None:
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID must be an event number.")
+    return StreamingResponse(stream_session(debate_id, after), media_type="text/event-stream")
+
+@app.get("/debate/{debate_id}")
+async def debate_session_endpoint(debate_id: str):
+    """
+    A debate's status, stances and transcript so far.
+    """
+    debate = await session_transcript(debate_id)
+    if debate is None:
+        raise HTTPException(status_code=404, detail=f"Unknown debate {debate_id}.")
+    return debate
+
+
+
+@app.get("/cache/stats")
+async def cache_stats_endpoint():
+    """
+    Hit/miss counts, coalesced calls and latency saved for the shared tool-result caches.
+    """
+    return cache_stats()
+
+
+def _cache_metric_lines() -> list:
+    """Prometheus lines for the tool-result and embedding caches."""
+    lines = []
+    stats = cache_stats()
+    for field, kind in (("hits", "counter"), ("misses", "counter"), ("coalesced", "counter"),
+                        ("saved_seconds", "counter"), ("size", "gauge")):
+        name = f"debate_cache_{field}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# TYPE {name} {kind}")
+        for cache, values in sorted(stats.items()):
+            lines.append(f'{name}{{cache="{cache}"}} {values.get(field, 0)}')
+    embedding = embedding_cache_stats()
+    if embedding:
+        lines.append("# TYPE debate_embedding_cache_total counter")
+        for result, value in sorted(embedding.items()):
+            lines.append(f'debate_embedding_cache_total{{result="{result}"}} {value}')
+    return lines
+
+
+def _limiter_metric_lines() -> list:
+    """Prometheus lines for the per-provider limiters."""
+    lines = []
+    stats = limiter_stats()
+    for field in ("calls", "retries", "failures", "quota_errors", "request_waits", "token_waits", "wait_seconds"):
+        lines.append(f"# TYPE debate_provider_{field}_total counter")
+        for provider, values in sorted(stats.items()):
+            lines.append(f'debate_provider_{field}_total{{provider="{provider}"}} {values[field]}')
+    lines.append("# TYPE debate_provider_circuit_open gauge")
+    for provider, values in sorted(stats.items()):
+        lines.append(f'debate_provider_circuit_open{{provider="{provider}"}} {int(values["circuit"] != "closed")}')
+    return lines
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Span latency histograms, token counts, active debates, cache and provider limiter
+    counters in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(_cache_metric_lines() + _limiter_metric_lines()),
+                             media_type="text/plain; version=0.0.4")
+
+
+
+# --- Batch Jobs ---
+BATCH_OUTPUT_DIR = os.getenv("DEBATE_BATCH_DIR", "batch_results")
+_JOB_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_batch_jobs = {}  # job id -> {"progress": BatchProgress, "task": asyncio.Task, "output": path}
+
+class BatchRequest(BaseModel):
+    topics: list  # Topic strings or objects {"id", "topic", "num_turns", "turn_policy"}
+    num_turns: int = DEFAULT_NUM_TURNS  # Default turns per agent
+    turn_policy: str = TURN_POLICY  # Default turn policy
+    workers: int = BATCH_WORKERS  # Debates of this job run at the same time
+    job_id: Optional[str] = None  # Reuse an earlier job's id to resume it: finished debates are skipped
+
+def _batch_status(job_id: str) -> dict:
+    job = _batch_jobs[job_id]
+    return {"job_id": job_id, "output": job["output"], **job["progress"].report()}
+
+@app.post("/batch")
+async def batch_endpoint(request: BatchRequest):
+    """
+    Starts a batch of debates in the background and returns its job id. Transcripts are
+    appended to a JSONL file as debates finish; all jobs share the global rate limits.
+    """
+    job_id = request.job_id or uuid.uuid4().hex[:12]
+    if not _JOB_ID_PATTERN.match(job_id):
+        raise HTTPException(status_code=400, detail="job_id may only contain letters, digits, '-' and '_'.")
+    if job_id in _batch_jobs and not _batch_jobs[job_id]["task"].done():
+        raise HTTPException(status_code=409, detail=f"Batch job {job_id} is already running.")
+    try:
+        jobs = [make_job(item, number, request.num_turns, request.turn_policy)
+                for number, item in enumerate(request.topics, start=1)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    output = os.path.join(BATCH_OUTPUT_DIR, f"{job_id}.jsonl")
+    progress = BatchProgress(total=len(jobs))
+    task = asyncio.create_task(run_batch(jobs, output, workers=request.workers, progress=progress))
+    _batch_jobs[job_id] = {"progress": progress, "task": task, "output": output}
+    return _batch_status(job_id)
+
+@app.get("/batch/{job_id}")
+async def batch_status_endpoint(job_id: str):
+    """
+    Progress of a batch job: completed, failed, running and pending debates, and throughput.
+    """
+    if job_id not in _batch_jobs:
+        raise HTTPException(status_code=404, detail=f"Unknown batch job {job_id}.")
+    return {**_batch_status(job_id), "rate_limits": limiter_stats()}
+
+@app.get("/batch/{job_id}/results")
+async def batch_results_endpoint(job_id: str):
+    """
+    The job's JSONL output so far, one debate record per line.
+    """
+    if not _JOB_ID_PATTERN.match(job_id):
+        raise HTTPException(status_code=404, detail=f"Unknown batch job {job_id}.")
+    output = os.path.join(BATCH_OUTPUT_DIR, f"{job_id}.jsonl")
+    if not os.path.exists(output):
+        raise HTTPException(status_code=404, detail=f"No results for batch job {job_id}.")
+    return FileResponse(output, media_type="application/x-ndjson")
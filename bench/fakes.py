@@ -0,0 +1,288 @@
+# /bench/fakes.py
+"""
+Deterministic stand-ins for the paid backends, so the whole pipeline can be driven
+and timed without network access or API keys.
+
+    FakeDebateChatModel -> replaces Gemini for the orchestrator, the debaters and the summarizer
+    PrefixCache         -> stands in for the provider's prompt prefix cache behind the fake model
+    FakeSearchClient    -> replaces the Tavily client behind `web_search`
+    LatencyEmbeddings   -> the local hashing embedder with a simulated network delay
+"""
+
+import json
+import time
+import zlib
+import hashlib
+import random
+import asyncio
+import threading
+from typing import Optional
+
+from pydantic import PrivateAttr
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from tools.embeddings import HashingEmbeddings
+
+_VOCABULARY = (
+    "drones autonomy oversight accountability evidence safety regulation cost efficiency "
+    "privacy risk deployment ethics policy data transparency liability public trust "
+    "infrastructure innovation precedent harm benefit scale community consent audit"
+).split()
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class ResourceExhausted(Exception):
+    """Quota error shaped like Google's (same class name, HTTP 429 code)."""
+    code = 429
+
+
+class PrefixCache:
+    """
+    Local stand-in for provider-side prompt caching (e.g. Gemini's implicit caching):
+    remembers every message prefix it has seen and reports how many input tokens of a new
+    request are covered by the longest one. Like the real thing, prefixes shorter than
+    `min_tokens` are never served from the cache, and the oldest entries are evicted first.
+    """
+
+    def __init__(self, min_tokens: int = 256, max_entries: int = 100_000):
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self._prefixes = {}  # hash of messages[:i] -> tokens of messages[:i]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(message) -> bytes:
+        tool_calls = json.dumps(getattr(message, "tool_calls", None) or [], sort_keys=True, default=str)
+        return f"{message.type}\0{message.content}\0{tool_calls}".encode("utf-8")
+
+    def lookup(self, messages: list) -> tuple:
+        """Records the request's prefixes and returns (input tokens, cached input tokens)."""
+        digest = hashlib.sha256()
+        total = cached = 0
+        with self._lock:
+            for message in messages:
+                digest.update(self._key(message))
+                total += _estimate_tokens(str(message.content))
+                key = digest.digest()
+                if key in self._prefixes:
+                    cached = total
+                else:
+                    if len(self._prefixes) >= self.max_entries:
+                        self._prefixes.pop(next(iter(self._prefixes)))
+                    self._prefixes[key] = total
+        return total, (cached if cached >= self.min_tokens else 0)
+
+
+class FakeDebateChatModel(BaseChatModel):
+    """
+    Chat model with configurable latency and output length that behaves like the real
+    ones in this pipeline: it returns JSON stances to the orchestrator, a summary to the
+    history summarizer, and tool calls or arguments to debaters.
+
+    Its answers depend only on the input messages, so runs are reproducible.
+    """
+
+    model: str = "fake-debater"
+    temperature: float = 0.7
+    first_token_latency_s: float = 0.2
+    token_latency_s: float = 0.005
+    output_tokens: int = 50
+    tool_call_every: int = 2  # Roughly one turn in N starts with a tool call. 0 disables tools.
+    quota_per_second: float = 0.0  # Calls beyond this rate fail with ResourceExhausted. 0 disables.
+    prefill_latency_s: float = 0.0  # Extra time to first token per 1000 input tokens not served from the cache
+    prefix_cache: Optional[PrefixCache] = None  # Reports cached input tokens when set
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    _tool_names: list = PrivateAttr(default_factory=lambda: ["web_search", "knowledge_base_search"])
+    _usage: dict = PrivateAttr(default_factory=lambda: {"calls": 0, "input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0})
+    _usage_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _recent_calls: list = PrivateAttr(default_factory=list)
+
+    def __init__(self, **kwargs):
+        # The pool passes Gemini-only arguments (e.g. google_api_key); ignore those.
+        known = {name: value for name, value in kwargs.items() if name in type(self).model_fields}
+        super().__init__(**known)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-debate"
+
+    @property
+    def usage(self) -> dict:
+        with self._usage_lock:
+            return dict(self._usage)
+
+    def bind_tools(self, tools, **kwargs):
+        self._tool_names = [getattr(tool, "name", str(tool)) for tool in tools]
+        return self
+
+    def _check_quota(self):
+        """Rejects the call if more than `quota_per_second` calls started in the last second."""
+        if not self.quota_per_second:
+            return
+        now = time.monotonic()
+        with self._usage_lock:
+            self._recent_calls = [t for t in self._recent_calls if now - t < 1.0]
+            if len(self._recent_calls) >= self.quota_per_second:
+                self._usage["rejected"] = self._usage.get("rejected", 0) + 1
+                raise ResourceExhausted("429 Resource has been exhausted (fake quota).")
+            self._recent_calls.append(now)
+
+    # --- Response planning ---
+    def _plan(self, messages: list):
+        """Returns (text, tool_call or None) for these input messages."""
+        prompt = "\n".join(str(message.content) for message in messages)
+        seed = zlib.crc32(prompt.encode("utf-8"))
+        rng = random.Random(seed)
+
+        if "debate Orchestrator" in prompt:
+            stances = [
+                f"Stance {label}: " + " ".join(rng.choice(_VOCABULARY) for _ in range(12))
+                for label in "ABC"[:rng.choice([2, 3])]
+            ]
+            return json.dumps({"stances": stances}), None
+
+        if "keeping notes on a long debate" in prompt:
+            return " ".join(rng.choice(_VOCABULARY) for _ in range(self.output_tokens)), None
+
+        last = messages[-1] if messages else None
+        if (
+            self.tool_call_every
+            and not isinstance(last, ToolMessage)
+            and seed % self.tool_call_every == 0
+        ):
+            tool = self._tool_names[seed % len(self._tool_names)]
+            query = " ".join(rng.choice(_VOCABULARY) for _ in range(4))
+            return "", {"name": tool, "args": {"query": query}, "id": f"call_{seed:08x}"}
+
+        return " ".join(rng.choice(_VOCABULARY) for _ in range(self.output_tokens)) + ".", None
+
+    def _usage_metadata(self, messages: list, text: str) -> dict:
+        if self.prefix_cache is not None:
+            input_tokens, cached_tokens = self.prefix_cache.lookup(messages)
+        else:
+            input_tokens, cached_tokens = sum(_estimate_tokens(str(message.content)) for message in messages), 0
+        output_tokens = max(1, len(text.split()))
+        with self._usage_lock:
+            self._usage["calls"] += 1
+            self._usage["input_tokens"] += input_tokens
+            self._usage["cached_input_tokens"] += cached_tokens
+            self._usage["output_tokens"] += output_tokens
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_token_details": {"cache_read": cached_tokens},
+        }
+
+    def _respond(self, messages: list) -> tuple:
+        """Returns (text, tool_call or None, usage metadata) for one call."""
+        self._check_quota()
+        text, tool_call = self._plan(messages)
+        return text, tool_call, self._usage_metadata(messages, text)
+
+    def _first_token_delay(self, usage: dict) -> float:
+        uncached = usage["input_tokens"] - usage["input_token_details"]["cache_read"]
+        return self.first_token_latency_s + self.prefill_latency_s * uncached / 1000
+
+    def _message(self, messages: list) -> tuple:
+        text, tool_call, usage = self._respond(messages)
+        message = AIMessage(
+            content=text,
+            tool_calls=[{**tool_call, "type": "tool_call"}] if tool_call else [],
+            usage_metadata=usage,
+        )
+        return message, self._first_token_delay(usage) + self.token_latency_s * len(text.split())
+
+    # --- BaseChatModel interface ---
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message, delay = self._message(messages)
+        time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message, delay = self._message(messages)
+        await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, text: str, tool_call, usage: dict):
+        if tool_call:
+            yield AIMessageChunk(
+                content="",
+                tool_call_chunks=[{
+                    "name": tool_call["name"],
+                    "args": json.dumps(tool_call["args"]),
+                    "id": tool_call["id"],
+                    "index": 0,
+                    "type": "tool_call_chunk",
+                }],
+                usage_metadata=usage,
+            )
+            return
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            last = i == len(words) - 1
+            yield AIMessageChunk(
+                content=word + ("" if last else " "),
+                usage_metadata=usage if last else None,
+            )
+
+    # Token callbacks are emitted by BaseChatModel for each yielded chunk
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, tool_call, usage = self._respond(messages)
+        time.sleep(self._first_token_delay(usage))
+        for chunk in self._chunks(text, tool_call, usage):
+            time.sleep(self.token_latency_s)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, tool_call, usage = self._respond(messages)
+        await asyncio.sleep(self._first_token_delay(usage))
+        for chunk in self._chunks(text, tool_call, usage):
+            await asyncio.sleep(self.token_latency_s)
+            yield ChatGenerationChunk(message=chunk)
+
+
+class FakeSearchClient:
+    """Drop-in for the Tavily client: `.invoke(query)` returns one canned result after a delay."""
+
+    def __init__(self, latency_s: float = 0.3):
+        self.latency_s = latency_s
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, query: str) -> list:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_s)
+        digest = zlib.crc32(query.encode("utf-8"))
+        return [{
+            "url": f"https://example.com/article/{digest:08x}",
+            "content": f"Recent reporting on '{query}' cites {digest % 90 + 10}% growth and ongoing policy debate.",
+        }]
+
+
+class LatencyEmbeddings(Embeddings):
+    """The deterministic hashing embedder with a fixed delay per call, like a remote API."""
+
+    def __init__(self, latency_s: float = 0.05, dimensions: int = 256):
+        self.latency_s = latency_s
+        self.inner = HashingEmbeddings(dimensions)
+        self.calls = 0
+
+    def embed_documents(self, texts: list) -> list:
+        self.calls += 1
+        time.sleep(self.latency_s)
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        self.calls += 1
+        time.sleep(self.latency_s)
+        return self.inner.embed_query(text)
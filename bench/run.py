@@ -0,0 +1,496 @@
+# /bench/run.py
+"""
+Offline, deterministic benchmark of the full debate pipeline.
+
+Gemini, Tavily and the embedding API are replaced by the fakes in bench/fakes.py (with
+configurable latency and output length), then each stage is driven and timed:
+
+    stance     -> agenerate_debate_stances (fresh, then cached)
+    turn       -> DebaterAgent.agenerate_argument over a growing history
+    kb_search  -> knowledge_base_search against a freshly ingested synthetic corpus
+    sse        -> the /debate endpoint end to end, with several debates in flight
+    archive    -> transcript storage: memory per turn and bytes on disk of batch JSONL
+                  records and message objects against the compact transcript archive
+
+Results (latency percentiles, tokens per turn, concurrent-debate throughput and memory)
+are written as JSON so runs can be compared between versions.
+
+Usage:
+    python -m bench.run
+    python -m bench.run --concurrency 20 --llm-latency 0.5 --out bench/results/pr.json
+    python -m bench.run --compare bench/results/baseline.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+import contextlib
+import subprocess
+
+
+# --- Statistics ---
+def percentiles(values: list) -> dict:
+    """Nearest-rank percentiles of a list of seconds, reported in milliseconds."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(1000 * sum(ordered) / len(ordered), 2),
+        "p50_ms": round(1000 * rank(50), 2),
+        "p90_ms": round(1000 * rank(90), 2),
+        "p99_ms": round(1000 * rank(99), 2),
+        "max_ms": round(1000 * ordered[-1], 2),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+@contextlib.contextmanager
+def _quiet(enabled: bool):
+    """Silences the pipeline's console output while a stage runs."""
+    if not enabled:
+        yield
+        return
+    # Discarded rather than buffered, so it does not show up in the memory figures
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        yield
+
+
+# --- Environment ---
+def _configure_environment(workdir: str):
+    """Points every on-disk artifact at a scratch directory and selects the local embedder.
+    Must run before the pipeline modules are imported, since they read these at import."""
+    os.environ["KB_PERSIST_DIR"] = os.path.join(workdir, "chroma_db")
+    os.environ["KB_EMBEDDER"] = "hashing"
+    os.environ["KB_EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embeddings.sqlite")
+    os.environ["DEBATE_SESSION_DB"] = os.path.join(workdir, "sessions.sqlite")
+
+
+def _write_corpus(directory: str, num_docs: int, seed: int = 7) -> list:
+    """Writes a deterministic synthetic markdown corpus for the knowledge base."""
+    from bench.fakes import _VOCABULARY
+
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for i in range(num_docs):
+        paragraphs = [
+            " ".join(rng.choice(_VOCABULARY) for _ in range(80)) + "."
+            for _ in range(12)
+        ]
+        with open(os.path.join(directory, f"report_{i:03d}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# Report {i}\n\n" + "\n\n".join(paragraphs))
+    return [directory]
+
+
+# --- Stages ---
+async def bench_stance(args) -> dict:
+    from agents.orchestrator import agenerate_debate_stances
+
+    fresh, cached = [], []
+    for i in range(args.samples):
+        topic = f"{args.topic} (variant {i})"
+        start = time.perf_counter()
+        await agenerate_debate_stances(topic, fresh=True)
+        fresh.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await agenerate_debate_stances(topic)
+        cached.append(time.perf_counter() - start)
+    return {"stance": percentiles(fresh), "stance_cached": percentiles(cached)}
+
+
+async def bench_turns(args, llm) -> dict:
+    from langchain_core.messages import AIMessage, HumanMessage
+    from agents.debater import DebaterAgent
+
+    agents = [
+        DebaterAgent(topic=args.topic, stance=f"Stance {label}", agent_name=f"Agent {label}")
+        for label in "AB"
+    ]
+    history = [HumanMessage(content=f"The debate on '{args.topic}' has begun.")]
+    latencies, input_tokens, cached_tokens, output_tokens = [], [], [], []
+
+    for i in range(args.samples):
+        agent = agents[i % len(agents)]
+        before = llm.usage
+        start = time.perf_counter()
+        argument = await agent.agenerate_argument(history)
+        latencies.append(time.perf_counter() - start)
+        after = llm.usage
+        input_tokens.append(after["input_tokens"] - before["input_tokens"])
+        cached_tokens.append(after["cached_input_tokens"] - before["cached_input_tokens"])
+        output_tokens.append(after["output_tokens"] - before["output_tokens"])
+        history.append(AIMessage(content=argument, name=agent.name))
+
+    return {
+        "turn": percentiles(latencies),
+        "tokens_per_turn": {
+            "input_mean": round(sum(input_tokens) / len(input_tokens), 1),
+            "input_last": input_tokens[-1],
+            # Served from the (fake) provider prompt cache; the rest is billed and prefilled in full
+            "cached_mean": round(sum(cached_tokens) / len(cached_tokens), 1),
+            "cached_last": cached_tokens[-1],
+            "uncached_mean": round((sum(input_tokens) - sum(cached_tokens)) / len(input_tokens), 1),
+            "output_mean": round(sum(output_tokens) / len(output_tokens), 1),
+        },
+    }
+
+
+def bench_knowledge_base(args, workdir: str) -> dict:
+    from tools.ingest import ingest
+    from tools.knowledge_base import knowledge_base_search
+    from bench.fakes import _VOCABULARY
+
+    start = time.perf_counter()
+    manifest = ingest(_write_corpus(os.path.join(workdir, "corpus"), args.kb_docs))
+    ingest_seconds = time.perf_counter() - start
+
+    rng = random.Random(11)
+    queries = [" ".join(rng.choice(_VOCABULARY) for _ in range(5)) for _ in range(args.samples)]
+    cold, warm, sizes = [], [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = knowledge_base_search.invoke({"query": query})
+        cold.append(time.perf_counter() - start)
+        sizes.append(len(result) // 4 + 1)
+    for query in queries:
+        start = time.perf_counter()
+        knowledge_base_search.invoke({"query": query})
+        warm.append(time.perf_counter() - start)
+
+    return {
+        "kb_ingest": {"seconds": round(ingest_seconds, 3), "chunks": manifest["num_chunks"]},
+        "kb_result_tokens": {"mean": round(sum(sizes) / len(sizes), 1), "max": max(sizes)},
+        "kb_search": percentiles(cold),
+        "kb_search_cached": percentiles(warm),
+    }
+
+
+async def _post_sse(app, path: str, payload: dict, on_chunk):
+    """
+    Sends one POST straight to the ASGI app and calls `on_chunk(bytes)` as each body chunk
+    is sent. Unlike an HTTP client transport this sees chunks the moment they are produced,
+    which is what the time-to-next-event figures need.
+    """
+    body = json.dumps(payload).encode("utf-8")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("bench", 0),
+        "server": ("bench", 80),
+    }
+    request_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            on_chunk(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+
+
+async def _one_sse_debate(app, args, index: int) -> dict:
+    """Runs one debate through /debate and records event arrival times."""
+    payload = {
+        "topic": f"{args.topic} #{index}",
+        "num_turns": args.turns,
+        "stream_tokens": args.stream_tokens,
+        "turn_policy": args.turn_policy,
+    }
+    arrivals, types = [], []
+    buffer = ""
+
+    def on_chunk(chunk: bytes):
+        nonlocal buffer
+        buffer += chunk.decode("utf-8")
+        *frames, buffer = buffer.split("\n\n")
+        for frame in frames:
+            for line in frame.split("\n"):
+                if line.startswith("data: "):
+                    arrivals.append(time.perf_counter())
+                    types.append(json.loads(line[6:])["type"])
+
+    start = time.perf_counter()
+    await _post_sse(app, "/debate", payload, on_chunk)
+    gaps = [b - a for a, b in zip([start] + arrivals, arrivals)]
+    return {
+        "total": time.perf_counter() - start,
+        "first_event": arrivals[0] - start if arrivals else None,
+        "gaps": gaps,
+        "arguments": types.count("argument"),
+        "errors": types.count("error"),
+    }
+
+
+async def bench_sse(args) -> dict:
+    from api import app
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[_one_sse_debate(app, args, i) for i in range(args.concurrency)])
+    wall = time.perf_counter() - start
+
+    # Memory is measured in a second pass: tracing allocations slows everything down and
+    # would distort the latency figures above.
+    tracemalloc.start()
+    await asyncio.gather(*[_one_sse_debate(app, args, args.concurrency + i) for i in range(args.concurrency)])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "sse_debate": percentiles([r["total"] for r in results]),
+        "sse_first_event": percentiles([r["first_event"] for r in results if r["first_event"] is not None]),
+        "sse_next_event": percentiles([gap for r in results for gap in r["gaps"]]),
+        "throughput": {
+            "concurrent_debates": args.concurrency,
+            "wall_seconds": round(wall, 3),
+            "debates_per_second": round(args.concurrency / wall, 3),
+            "arguments": sum(r["arguments"] for r in results),
+            "errors": sum(r["errors"] for r in results),
+        },
+        "memory": {
+            "traced_peak_mb": round(peak / 2**20, 2),
+            "per_debate_mb": round(peak / 2**20 / args.concurrency, 3),
+        },
+    }
+
+
+def bench_archive(args, workdir: str) -> dict:
+    """Memory and disk footprint of the same synthetic debates in each transcript format."""
+    from langchain_core.messages import AIMessage
+    from bench.fakes import _VOCABULARY
+    from agents.batch import transcript_record
+    from utils.transcript import Transcript, TranscriptArchive, iter_debates
+
+    rng = random.Random(11)
+    names = [f"Agent {label}" for label in "ABC"]
+    transcripts = []
+    for d in range(args.archive_debates):
+        transcript = Transcript(f"{args.topic} ({d})", f"debate-{d}", status="ok")
+        for name in names:
+            transcript.add({'type': 'agent_stance', 'name': name, 'stance': " ".join(rng.choice(_VOCABULARY) for _ in range(12))})
+        for t in range(args.turns * len(names)):
+            # Built the way the engine builds them: a fresh name string per event
+            transcript.add({
+                'type': 'argument', 'name': "Agent " + "ABC"[t % len(names)],
+                'content': " ".join(rng.choice(_VOCABULARY) for _ in range(args.output_tokens)) + ".",
+                'usage': {"input_tokens": rng.randint(800, 2500), "cached_input_tokens": rng.randint(0, 800),
+                          "output_tokens": args.output_tokens},
+                'tool_calls': rng.randint(0, 2), 'seconds': round(rng.uniform(0.5, 5), 3),
+            })
+        transcripts.append(transcript)
+    turns = [turn for transcript in transcripts for turn in transcript]
+
+    def held_bytes(build) -> float:
+        """Traced bytes per turn of the objects `build` makes around the existing turn texts."""
+        tracemalloc.start()
+        held = build()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del held
+        return round(size / len(turns), 1)
+
+    memory = {
+        "messages": held_bytes(lambda: [AIMessage(content=turn.content, name="Agent " + turn.name[-1]) for turn in turns]),
+        "record_dicts": held_bytes(lambda: [transcript_record(transcript) for transcript in transcripts]),
+        "turn_records": held_bytes(lambda: [turn.__class__(*turn.to_row()) for turn in turns]),
+    }
+
+    jsonl_path = os.path.join(workdir, "transcripts.jsonl")
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for transcript in transcripts:
+            f.write(json.dumps(transcript_record(transcript), ensure_ascii=False) + "\n")
+    archive_path = os.path.join(workdir, "transcripts.jsonl.gz")
+    archive = TranscriptArchive(archive_path)
+    for transcript in transcripts:
+        archive.append(transcript)
+    archive.close()
+
+    start = time.perf_counter()
+    read = sum(1 for _, debate_turns in iter_debates(archive_path) for _ in debate_turns)
+    read_seconds = time.perf_counter() - start
+
+    jsonl_bytes, archive_bytes = os.path.getsize(jsonl_path), os.path.getsize(archive_path)
+    return {
+        "debates": len(transcripts),
+        "turns": len(turns),
+        "bytes_per_turn_in_memory": memory,
+        "jsonl_bytes_per_turn": round(jsonl_bytes / len(turns), 1),
+        "archive_bytes_per_turn": round(archive_bytes / len(turns), 1),
+        "archive_size_ratio": round(archive_bytes / jsonl_bytes, 3),
+        "archive_read_turns_per_second": round(read / read_seconds) if read_seconds else None,
+    }
+
+
+# --- Reporting ---
+def compare(current: dict, baseline: dict):
+    """Prints the p50/p99 change of every stage present in both results."""
+    print(f"--- Compared with {baseline['meta'].get('revision', '?')} ({baseline['meta'].get('timestamp', '?')}) ---")
+    for stage, stats in current["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if not old or "p50_ms" not in stats or "p50_ms" not in old:
+            continue
+        deltas = []
+        for key in ("p50_ms", "p99_ms"):
+            change = (stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            deltas.append(f"{key[:-3]} {old[key]:.1f} -> {stats[key]:.1f} ms ({change:+.1f}%)")
+        print(f"  {stage:<18} " + ", ".join(deltas))
+
+
+def print_summary(result: dict):
+    print("--- Benchmark Results ---")
+    for stage, stats in result["stages"].items():
+        if "p50_ms" in stats:
+            print(f"  {stage:<18} n={stats['count']:<4} p50={stats['p50_ms']:>9.1f}ms  p90={stats['p90_ms']:>9.1f}ms  p99={stats['p99_ms']:>9.1f}ms")
+    for section in ("tokens_per_turn", "prompt_cache", "throughput", "memory", "kb_ingest", "kb_result_tokens", "transcript_archive", "rate_limits"):
+        if section in result:
+            print(f"  {section}: {result[section]}")
+
+
+async def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="debate-bench-")
+    _configure_environment(workdir)
+
+    # Imported only now, after the environment points at the scratch directory
+    from agents import pool
+    from tools import search, embeddings
+    from bench.fakes import FakeDebateChatModel, FakeSearchClient, LatencyEmbeddings, PrefixCache
+
+    llm_settings = dict(
+        first_token_latency_s=args.llm_latency,
+        token_latency_s=args.token_latency,
+        output_tokens=args.output_tokens,
+        tool_call_every=args.tool_call_every,
+        quota_per_second=args.llm_quota,
+        prefill_latency_s=args.prefill_latency,
+        prefix_cache=None if args.no_prefix_cache else PrefixCache(min_tokens=args.prefix_cache_min_tokens),
+    )
+    shared_llm = FakeDebateChatModel(**llm_settings)
+    pool.set_chat_model_factory(lambda **kwargs: shared_llm)
+    search.set_search_client(FakeSearchClient(latency_s=args.search_latency))
+    embeddings.set_embeddings(LatencyEmbeddings(latency_s=args.embed_latency))
+    from utils.ratelimit import get_limiter, limiter_stats
+    get_limiter("llm").configure(args.llm_rps)
+
+    result = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": vars(args),
+        },
+        "stages": {},
+    }
+
+    with _quiet(not args.verbose):
+        result["stages"].update(await bench_stance(args))
+        turns = await bench_turns(args, shared_llm)
+        kb = bench_knowledge_base(args, workdir)
+        sse = await bench_sse(args)
+        archive = bench_archive(args, workdir)
+
+    result["stages"]["turn"] = turns["turn"]
+    result["tokens_per_turn"] = turns["tokens_per_turn"]
+    result["kb_ingest"] = kb.pop("kb_ingest")
+    result["kb_result_tokens"] = kb.pop("kb_result_tokens")
+    result["stages"].update(kb)
+    result["throughput"] = sse.pop("throughput")
+    result["memory"] = sse.pop("memory")
+    result["memory"]["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    result["stages"].update(sse)
+    result["transcript_archive"] = archive
+    result["rate_limits"] = {
+        "llm": limiter_stats()["llm"],
+        "llm_quota_rejections": shared_llm.usage.get("rejected", 0),
+    }
+    usage = shared_llm.usage
+    result["prompt_cache"] = {
+        "input_tokens": usage["input_tokens"],
+        "cached_input_tokens": usage["cached_input_tokens"],
+        "cached_share": round(usage["cached_input_tokens"] / usage["input_tokens"], 3) if usage["input_tokens"] else 0.0,
+    }
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the debate pipeline.")
+    parser.add_argument("--topic", default="Widespread drone delivery in urban areas")
+    parser.add_argument("--samples", type=int, default=20, help="Calls per single-stage benchmark.")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per agent in SSE debates.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Debates in flight during the SSE stage.")
+    parser.add_argument("--stream-tokens", action="store_true", help="Request token streaming in SSE debates.")
+    parser.add_argument("--turn-policy", default="sequential", help="Turn scheduling policy for SSE debates.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM time to first token (s).")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Fake LLM time per output token (s).")
+    parser.add_argument("--output-tokens", type=int, default=50, help="Fake LLM tokens per answer.")
+    parser.add_argument("--tool-call-every", type=int, default=2, help="One turn in N starts with a tool call (0: never).")
+    parser.add_argument("--llm-quota", type=float, default=0.0, help="Fake LLM quota in calls/s; excess calls fail with 429 (0: none).")
+    parser.add_argument("--llm-rps", type=float, default=0.0, help="Client-side LLM rate limit in requests/s (0: unlimited).")
+    parser.add_argument("--prefill-latency", type=float, default=0.05, help="Fake LLM time to first token per 1000 uncached input tokens (s).")
+    parser.add_argument("--prefix-cache-min-tokens", type=int, default=256, help="Shortest prompt prefix the fake provider caches.")
+    parser.add_argument("--no-prefix-cache", action="store_true", help="Disable the fake provider prompt cache.")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Fake web search latency (s).")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Fake embedding call latency (s).")
+    parser.add_argument("--kb-docs", type=int, default=20, help="Synthetic documents in the knowledge base.")
+    parser.add_argument("--archive-debates", type=int, default=500, help="Synthetic debates in the transcript archive stage.")
+    parser.add_argument("--out", default=None, help="Where to write the JSON results.")
+    parser.add_argument("--compare", default=None, help="A previous results file to compare against.")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's console output.")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    print_summary(result)
+
+    out = args.out or os.path.join("bench", "results", f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(result, json.load(f))
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
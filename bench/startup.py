@@ -0,0 +1,140 @@
+# /bench/startup.py
+"""
+Cold-start benchmark: how long it takes to import each entry point and how much memory
+a fresh process holds afterwards (what every extra uvicorn worker costs).
+
+Each measurement runs in a new interpreter, so nothing is shared with earlier imports:
+
+    api          -> `import api` (one uvicorn worker before its first request)
+    api_preload  -> `import api` then `agents.pool.warm_up()` (what DEBATE_PRELOAD=1 pays at startup)
+    batch        -> `import agents.batch`
+    cli          -> `import main`
+
+No network calls are made: warm-up only imports the SDKs and builds the executor.
+
+Usage:
+    python -m bench.startup
+    python -m bench.startup --repeat 7 --out bench/results/startup-pr.json
+    python -m bench.startup --compare bench/results/startup-baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+from bench.run import _git_revision
+
+# Vendor SDKs that should only be loaded when a debate actually needs them
+HEAVY_MODULES = ("langchain.agents", "langchain_google_genai", "langchain_community", "chromadb", "google.ai")
+
+TARGETS = {
+    "api": "import api",
+    "api_preload": "import api\nfrom agents.pool import warm_up\nwarm_up()",
+    "batch": "import agents.batch",
+    "cli": "import main",
+}
+
+# Runs in the child process: times the target and reports what it left loaded
+_PROBE = """
+import sys, json, time, resource
+start = time.perf_counter()
+exec({code!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "heavy_loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure(code: str) -> dict:
+    """Runs `code` in a fresh interpreter and returns its import time and memory."""
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "bench-placeholder")  # Lets warm-up build the client offline
+    env.setdefault("TAVILY_API_KEY", "bench-placeholder")
+    env["DEBATE_VERBOSE"] = "0"
+    completed = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _PROBE.format(code=code, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def bench_target(code: str, repeat: int) -> dict:
+    """Median import time and memory over `repeat` fresh processes."""
+    try:
+        runs = [measure(code) for _ in range(repeat)]
+    except subprocess.CalledProcessError as e:
+        # e.g. a target this revision does not support yet
+        return {"error": (e.stderr or "").strip().splitlines()[-1:] or [f"exit status {e.returncode}"]}
+    return {
+        "runs": repeat,
+        "p50_ms": round(1000 * statistics.median(run["seconds"] for run in runs), 1),
+        "max_ms": round(1000 * max(run["seconds"] for run in runs), 1),
+        "max_rss_mb": round(statistics.median(run["max_rss_mb"] for run in runs), 1),
+        "modules": runs[-1]["modules"],
+        "heavy_loaded": runs[-1]["heavy_loaded"],
+    }
+
+
+def compare(current: dict, baseline: dict):
+    """Prints the import time and memory change of every target present in both results."""
+    print(f"--- Compared with {baseline['meta'].get('revision', '?')} ({baseline['meta'].get('timestamp', '?')}) ---")
+    for target, stats in current["targets"].items():
+        old = baseline.get("targets", {}).get(target)
+        if not old or "error" in old or "error" in stats:
+            continue
+        deltas = []
+        for key, unit in (("p50_ms", "ms"), ("max_rss_mb", "MB")):
+            change = (stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            deltas.append(f"{key} {old[key]:.1f} -> {stats[key]:.1f} {unit} ({change:+.1f}%)")
+        print(f"  {target:<12} " + ", ".join(deltas))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import time and memory of the entry points.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per target.")
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument("--out", default=None, help="Where to write the JSON results.")
+    parser.add_argument("--compare", default=None, help="A previous results file to compare against.")
+    args = parser.parse_args(argv)
+
+    result = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+        },
+        "targets": {},
+    }
+    print("--- Startup Benchmark ---")
+    for target in args.targets:
+        stats = result["targets"][target] = bench_target(TARGETS[target], max(1, args.repeat))
+        if "error" in stats:
+            print(f"  {target:<12} failed: {stats['error'][0]}")
+            continue
+        print(f"  {target:<12} p50={stats['p50_ms']:>8.1f}ms  rss={stats['max_rss_mb']:>6.1f}MB  "
+              f"modules={stats['modules']:<5} heavy={','.join(stats['heavy_loaded']) or '-'}")
+
+    out = args.out or os.path.join("bench", "results", f"startup-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(result, json.load(f))
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -12,6 +12,15 @@ document.addEventListener('DOMContentLoaded', () => {
     ];
     let agents = {};
     let agentCounter = 0;
+    let streamingBubbles = {}; // Agent name -> <p> receiving argument_delta tokens
+
+    // The server keeps running a debate when the connection drops. We remember its id and
+    // the last event id we handled, and reconnect to replay only what we missed.
+    const API_URL = 'http://127.0.0.1:8000';
+    const MAX_RECONNECTS = 5;
+    let debateId = null;
+    let lastEventId = 0;
+    let debateEnded = false;
 
     const typewriter = (element, text, callback) => {
         let i = 0;
@@ -59,6 +68,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
     const handleStreamData = (data) => {
         switch (data.type) {
+            case 'session':
+                debateId = data.debate_id;
+                break;
+
             case 'agent_stance':
                 if (!agents[data.name]) {
                     const color = agentColors[agentCounter % agentColors.length];
@@ -85,6 +98,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 break;
             
             case 'status':
+                if (data.content === 'Debate concluded.') debateEnded = true;
                 Object.values(agents).forEach(agent => {
                     document.getElementById(agent.id)?.classList.remove('thinking');
                 });
@@ -97,21 +111,77 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
                 break;
 
+            case 'argument_delta':
+                if (!streamingBubbles[data.name]) {
+                    streamingBubbles[data.name] = addMessage(data.name, '');
+                }
+                streamingBubbles[data.name].textContent += data.content;
+                transcriptArea.scrollTop = transcriptArea.scrollHeight;
+                break;
+
+            case 'tool_call':
+                addMessage('System', `${data.name} is using ${data.tool}...`, true);
+                break;
+
+            case 'tool_result':
+                addMessage('System', `${data.tool} returned results to ${data.name}.`, true);
+                break;
+
+            case 'budget':
+                addMessage('System', data.content, true);
+                break;
+
             case 'argument':
                 const agentName = data.name;
                 const agentProfile = document.getElementById(agents[agentName].id);
                 if (agentProfile) agentProfile.classList.remove('thinking');
-                
-                const messageElement = addMessage(agentName, '');
-                typewriter(messageElement, data.content);
+
+                if (streamingBubbles[agentName]) {
+                    // Tokens were already shown; the final event holds the authoritative text
+                    streamingBubbles[agentName].textContent = data.content;
+                    delete streamingBubbles[agentName];
+                } else {
+                    const messageElement = addMessage(agentName, '');
+                    typewriter(messageElement, data.content);
+                }
                 break;
 
             case 'error':
+                debateEnded = true;
                 addMessage('System', data.content, true);
                 break;
         }
     };
 
+    // Reads SSE frames ("id: N" and "data: {...}" lines) until the stream ends.
+    const readStream = async (response) => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            // Token deltas arrive in many small frames; a read can end mid-frame,
+            // so keep the incomplete tail until the next chunk completes it.
+            buffer += decoder.decode(value, { stream: true });
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+
+            frames.filter(frame => frame.trim()).forEach(frame => {
+                let data = null;
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('id: ')) {
+                        lastEventId = parseInt(line.substring(4), 10);
+                    } else if (line.startsWith('data: ')) {
+                        data = JSON.parse(line.substring(6));
+                    }
+                });
+                if (data) handleStreamData(data);
+            });
+        }
+    };
+
     form.addEventListener('submit', async (e) => {
         e.preventDefault();
         const topic = topicInput.value.trim();
@@ -122,39 +192,49 @@ document.addEventListener('DOMContentLoaded', () => {
         agentProfilesDiv.innerHTML = '';
         agents = {};
         agentCounter = 0;
+        streamingBubbles = {};
+        debateId = null;
+        lastEventId = 0;
+        debateEnded = false;
         startButton.disabled = true;
         addMessage('System', 'Initializing debate...', true);
 
         try {
-            const response = await fetch('http://127.0.0.1:8000/debate', {
+            const response = await fetch(`${API_URL}/debate`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ topic: topic }),
+                body: JSON.stringify({ topic: topic, stream_tokens: true }),
             });
+            await readStream(response);
+        } catch (error) {
+            // The connection dropped; we reconnect below if the debate had started
+        }
 
-            const reader = response.body.getReader();
-            const decoder = new TextDecoder();
-            while (true) {
-                const { value, done } = await reader.read();
-                if (done) break;
-                
-                const chunk = decoder.decode(value);
-                const lines = chunk.split('\n\n').filter(line => line.trim());
-
-                lines.forEach(line => {
-                    if (line.startsWith('data: ')) {
-                        handleStreamData(JSON.parse(line.substring(6)));
-                    }
+        // Resume from the last event we handled. The server replays the rest from its
+        // session store, so no turn is generated twice.
+        let attempts = 0;
+        while (!debateEnded && debateId && attempts < MAX_RECONNECTS) {
+            attempts++;
+            addMessage('System', 'Connection lost. Reconnecting...', true);
+            await new Promise(resolve => setTimeout(resolve, 1000 * attempts));
+            try {
+                const before = lastEventId;
+                const response = await fetch(`${API_URL}/debate/${debateId}/events`, {
+                    headers: { 'Last-Event-ID': String(lastEventId) },
                 });
+                if (!response.ok) break;
+                await readStream(response);
+                if (lastEventId > before) attempts = 0;
+            } catch (error) {
+                // Try again after a longer pause
             }
-        } catch (error) {
-            addMessage('System', 'Error connecting to the server.', true);
-        } finally {
-            startButton.disabled = false;
-            addMessage('System', 'Debate concluded.', true);
-            Object.values(agents).forEach(agent => {
-                document.getElementById(agent.id)?.classList.remove('thinking');
-            });
         }
+
+        if (!debateEnded) addMessage('System', 'Error connecting to the server.', true);
+        startButton.disabled = false;
+        addMessage('System', 'Debate concluded.', true);
+        Object.values(agents).forEach(agent => {
+            document.getElementById(agent.id)?.classList.remove('thinking');
+        });
     });
 });
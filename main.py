@@ -1,13 +1,14 @@
 # /main.py
 
 import asyncio
-from agents.orchestrator import generate_debate_stances
-from agents.debater import DebaterAgent
-from langchain_core.messages import HumanMessage, AIMessage
+from agents.engine import run_debate
+from agents.scheduler import TURN_POLICY
+from utils.transcript import Transcript
 
 # --- Configuration ---
 DEBATE_TOPIC = "The feasibility and ethics of widespread drone delivery in urban areas."
 NUM_TURNS = 3 # Each agent speaks this many times.
+OPENING = "The debate on '{topic}' will now begin. We have {num_agents} participants. Let's hear the opening statements."
 
 async def main():
     """
@@ -15,62 +16,33 @@ async def main():
     """
     print(f"--- Starting Debate on: {DEBATE_TOPIC} ---")
 
-    # 1. Generate stances
-    try:
-        stances = generate_debate_stances(DEBATE_TOPIC)
-        if len(stances) < 2:
-            print("\n❌ --- Debate Failed: Orchestrator needs at least 2 stances. --- ❌")
-            return
-    except Exception as e:
-        print(f"\n❌ --- Debate Failed during stance generation: {e} --- ❌")
-        return
+    # The async turn engine generates stances, initializes the agents and runs the loop.
+    # We only need to present the events it yields.
+    transcript = Transcript(DEBATE_TOPIC)
 
-    # 2. Initialize Debater Agents
-    agent_names = [f"Agent {chr(65+i)}" for i in range(len(stances))] # Agent A, B, etc.
-    debaters = [
-        DebaterAgent(topic=DEBATE_TOPIC, stance=stance, agent_name=name)
-        for name, stance in zip(agent_names, stances)
-    ]
-
-    print("\n--- The Debaters Have Assembled ---")
-    for agent in debaters:
-        print(f"- {agent.name}: {agent.stance}")
-    print("----------------------------------\n")
+    # Set DEBATE_TURN_POLICY=parallel_openings (or parallel_rounds) to run turns concurrently.
+    async for event in run_debate(DEBATE_TOPIC, NUM_TURNS, opening=OPENING, turn_policy=TURN_POLICY):
+        if event['type'] == 'error':
+            print(f"\n❌ --- Debate Failed: {event['content']} --- ❌")
+            return
 
-    # 3. Run the Debate Loop
-    # The history now uses LangChain message objects, which is required by the agent executor.
-    conversation_history = [
-        HumanMessage(content=f"The debate on '{DEBATE_TOPIC}' will now begin. We have {len(debaters)} participants. Let's hear the opening statements.")
-    ]
-    
-    total_exchanges = len(debaters) * NUM_TURNS
+        elif event['type'] == 'agent_stance':
+            if not transcript.stances:
+                print("\n--- The Debaters Have Assembled ---")
+            transcript.add(event)
+            print(f"- {event['name']}: {event['stance']}")
 
-    for i in range(total_exchanges):
-        current_debater = debaters[i % len(debaters)]
-        
-        # The agent's generate_argument method now takes the list of messages directly.
-        argument = current_debater.generate_argument(conversation_history)
-        
-        # The agent's response is now an AIMessage.
-        # We assign the agent's name to the message for clarity in the transcript.
-        agent_message = AIMessage(content=argument, name=current_debater.name)
-        
-        # Add the agent's response to the history
-        conversation_history.append(agent_message)
-        
-        # Print the turn to the console
-        print(f"\n**{current_debater.name}:** {argument}")
+        elif event['type'] == 'argument':
+            transcript.add(event)
+            # Print the turn to the console
+            print(f"\n**{event['name']}:** {event['content']}")
 
     # 4. Print the final transcript
     print("\n\n--- ✅ Debate Concluded ---")
     print("--- Final Transcript ---")
-    for message in conversation_history:
-        if isinstance(message, HumanMessage):
-            # The initial moderator message
-            print(f"Moderator: {message.content}")
-        elif isinstance(message, AIMessage):
-            # Agent messages, using the name we assigned
-            print(f"**{message.name}:** {message.content}")
+    print(f"Moderator: {OPENING.format(topic=DEBATE_TOPIC, num_agents=len(transcript.stances))}")
+    for turn in transcript:
+        print(f"**{turn.name}:** {turn.content}")
     print("--------------------------")
 
 
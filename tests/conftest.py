@@ -0,0 +1,13 @@
+# /tests/conftest.py
+
+import os
+import tempfile
+
+# Like bench/run.py: scratch paths and the local embedder, set before the pipeline
+# modules are imported, since they read these at import
+_workdir = tempfile.mkdtemp(prefix="debate-tests-")
+os.environ.setdefault("KB_EMBEDDER", "hashing")
+os.environ.setdefault("KB_PERSIST_DIR", os.path.join(_workdir, "chroma_db"))
+os.environ.setdefault("KB_EMBEDDING_CACHE_PATH", os.path.join(_workdir, "embeddings.sqlite"))
+os.environ.setdefault("DEBATE_SESSION_DB", os.path.join(_workdir, "sessions.sqlite"))
+os.environ.setdefault("DEBATE_VERBOSE", "0")
@@ -0,0 +1,38 @@
+# /tests/test_batch.py
+
+import asyncio
+
+import pytest
+
+from agents import pool
+from agents.batch import completed_ids, make_job, run_batch
+from bench.fakes import FakeDebateChatModel, FakeSearchClient
+from tools import search
+from utils import console
+
+
+@pytest.fixture(autouse=True)
+def fake_llm():
+    pool.set_chat_model_factory(lambda **kwargs: FakeDebateChatModel(
+        first_token_latency_s=0.0, token_latency_s=0.0, output_tokens=5, tool_call_every=0,
+    ))
+    search.set_search_client(FakeSearchClient(latency_s=0.0))
+    yield
+    pool.set_chat_model_factory(None)
+    search.set_search_client(None)
+
+
+def _jobs() -> list:
+    return [make_job(topic, number, num_turns=1) for number, topic in enumerate(["Drones", "Tariffs"], start=1)]
+
+
+@pytest.mark.parametrize("verbose", [False, True])
+def test_progress_follows_the_verbosity_switch(tmp_path, monkeypatch, capsys, verbose):
+    monkeypatch.setattr(console, "VERBOSE", verbose)
+    path = str(tmp_path / "out.jsonl")
+    progress = asyncio.run(run_batch(_jobs(), path, workers=2))
+    assert progress.report()["completed"] == 2
+    assert completed_ids(path) == {"1", "2"}
+    out = capsys.readouterr().out
+    assert ("Batch: 2 debates" in out) == verbose
+    assert ("[2/2]" in out) == verbose
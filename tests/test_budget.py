@@ -0,0 +1,38 @@
+# /tests/test_budget.py
+
+import asyncio
+import logging
+import uuid
+
+import pytest
+from langchain_core.callbacks.manager import AsyncCallbackManager, CallbackManager, handle_event
+
+from agents.budget import Budget, BudgetCallbackHandler, BudgetExceeded
+
+
+def _spent_handler() -> BudgetCallbackHandler:
+    budget = Budget("turn", tool_calls=1)
+    budget.spend(tool_calls=1)
+    return BudgetCallbackHandler(budget)
+
+
+def test_budget_stop_is_not_logged(caplog):
+    manager = CallbackManager([_spent_handler()])
+    with caplog.at_level(logging.WARNING), pytest.raises(BudgetExceeded):
+        manager.on_tool_start({"name": "search"}, "query", run_id=uuid.uuid4())
+    assert not caplog.records
+
+
+def test_async_budget_stop_is_not_logged(caplog):
+    manager = AsyncCallbackManager([_spent_handler()])
+    with caplog.at_level(logging.WARNING), pytest.raises(BudgetExceeded):
+        asyncio.run(manager.on_tool_start({"name": "search"}, "query", run_id=uuid.uuid4()))
+    assert not caplog.records
+
+
+def test_other_handler_errors_are_still_logged(caplog):
+    handler = _spent_handler()
+    handler.on_tool_end = lambda *args, **kwargs: 1 / 0
+    with caplog.at_level(logging.WARNING), pytest.raises(ZeroDivisionError):
+        handle_event([handler], "on_tool_end", None, "output", run_id=uuid.uuid4())
+    assert "ZeroDivisionError" in caplog.text
@@ -0,0 +1,87 @@
+# /tests/test_debater.py
+
+import time
+import asyncio
+
+import pytest
+
+from agents import debater, pool
+from agents.budget import Budget
+from agents.debater import DebaterAgent
+from bench.fakes import FakeDebateChatModel, FakeSearchClient
+from tools import search
+
+
+@pytest.fixture
+def fake_llm():
+    """Installs a fake chat model built from `settings` for every pool client."""
+    def install(**settings):
+        llm = FakeDebateChatModel(**settings)
+        pool.set_chat_model_factory(lambda **kwargs: llm)
+        return llm
+    search.set_search_client(FakeSearchClient(latency_s=0.0))
+    yield install
+    pool.set_chat_model_factory(None)
+    search.set_search_client(None)
+
+
+def _agent() -> DebaterAgent:
+    return DebaterAgent("Drones in farming", "Drones help farmers.", "Agent A")
+
+
+def _stream(agent, budget) -> list:
+    async def collect():
+        return [event async for event in agent.astream_argument([], budget)]
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("async_executors", [True, False])
+def test_slow_turn_is_cut_at_its_deadline(fake_llm, monkeypatch, async_executors):
+    monkeypatch.setattr(debater, "ASYNC_EXECUTORS", async_executors)
+    fake_llm(first_token_latency_s=2.0, tool_call_every=0)
+    budget = Budget("turn", seconds=0.3)
+    answer = asyncio.run(_agent().agenerate_argument([], budget))
+    assert answer == "(Agent A ran out of time for this turn.)"
+    assert budget.stopped == (budget, "seconds")
+    assert budget.used("seconds") < 1.0
+
+
+def test_streamed_turn_is_cut_at_its_deadline(fake_llm):
+    fake_llm(first_token_latency_s=2.0, tool_call_every=0)
+    budget = Budget("turn", seconds=0.3)
+    events = _stream(_agent(), budget)
+    assert [event['type'] for event in events] == ['budget', 'argument_delta', 'argument']
+    assert events[0]['resource'] == "seconds"
+    assert budget.used("seconds") < 1.0
+
+
+def test_turn_within_budget_is_not_stopped(fake_llm):
+    fake_llm(first_token_latency_s=0.0, token_latency_s=0.0, tool_call_every=0, output_tokens=5)
+    budget = Budget("turn", seconds=30)
+    events = _stream(_agent(), budget)
+    assert events[-1]['type'] == 'argument' and events[-1]['content'].endswith(".")
+    assert budget.stopped is None
+
+
+def test_abandoned_sync_run_is_refused_further_calls(fake_llm, monkeypatch):
+    monkeypatch.setattr(debater, "ASYNC_EXECUTORS", False)
+    # Every answer starts with a tool call; the first one is still running at the deadline
+    llm = fake_llm(first_token_latency_s=0.8, token_latency_s=0.0, tool_call_every=1)
+    budget = Budget("turn", seconds=0.9)
+    asyncio.run(_agent().agenerate_argument([], budget))
+    calls = llm.usage["calls"]  # The cut run's first call and the final answer
+
+    time.sleep(1.5)  # The worker thread finishes its LLM call meanwhile
+    assert llm.usage["calls"] == calls == 2
+    assert budget.spent["tool_calls"] == 0
+
+
+def test_fallback_names_the_budget_that_ran_out(fake_llm):
+    # The final answer is too slow to produce anything, so the fallback notice is shown
+    fake_llm(first_token_latency_s=2.0, tool_call_every=0)
+    debate = Budget("debate", tokens=10)
+    debate.spend(tokens=10)
+    budget = debate.child("turn", seconds=0.3)
+    answer = asyncio.run(_agent().agenerate_argument([], budget))
+    assert budget.stopped == (debate, "tokens")
+    assert answer == "(Agent A ran out of tokens for this debate.)"
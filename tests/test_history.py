@@ -0,0 +1,71 @@
+# /tests/test_history.py
+
+import os
+import sys
+import asyncio
+import subprocess
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from utils.history import ConversationHistory, build_llm_summarizer
+from bench.fakes import FakeDebateChatModel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _turn(i: int) -> AIMessage:
+    return AIMessage(content=f"Point {i} is strong. " + "Evidence follows here. " * 10, name=f"Agent {'AB'[i % 2]}")
+
+
+def _debate(summarizer, turns: int = 10, **kwargs) -> ConversationHistory:
+    history = ConversationHistory("The debate has begun.", summarizer=summarizer, **kwargs)
+
+    async def run():
+        for i in range(turns):
+            history.append(_turn(i))
+            await history.acompact()
+    asyncio.run(run())
+    return history
+
+
+def test_older_turns_are_folded_by_the_summarizer():
+    calls = []
+
+    def summarize(inputs: dict) -> str:
+        calls.append(inputs)
+        return f"summary of {inputs['turns'].count('Point')} turns"
+
+    history = _debate(RunnableLambda(summarize), keep_last_turns=4, token_budget=100_000)
+    assert len(history.context()) == 1 + 1 + len(history._recent)
+    assert history.keep_last_turns <= len(history._recent) < history.keep_last_turns + 2
+    assert history.summary.startswith("summary of")
+    # Turns are folded in batches, and each fold extends the previous summary
+    assert len(calls) == 3 and calls[1]["summary"] == "summary of 2 turns"
+
+
+def test_failed_summary_falls_back_to_first_sentences():
+    def fail(inputs: dict) -> str:
+        raise RuntimeError("quota")
+
+    history = _debate(RunnableLambda(fail), keep_last_turns=4, token_budget=100_000)
+    assert history.summary.splitlines()[0] == "- Agent A: Point 0 is strong."
+
+
+def test_context_stays_under_the_token_budget():
+    history = _debate(None, turns=30, keep_last_turns=20, token_budget=600)
+    assert history.context_tokens() <= 600
+    assert history._recent[-1].content.startswith("Point 29")
+
+
+def test_llm_summarizer_uses_the_given_model():
+    llm = FakeDebateChatModel(first_token_latency_s=0.0, token_latency_s=0.0, output_tokens=8)
+    history = _debate(build_llm_summarizer(llm), keep_last_turns=4, token_budget=100_000)
+    assert llm.usage["calls"] == 3
+    assert len(history.summary.split()) == 8
+
+
+def test_utils_do_not_import_the_agents():
+    # tools.retrieval -> utils.history used to pull in agents.pool, which imports tools.retrieval
+    code = "import sys, tools.retrieval, utils.history; sys.exit('agents.pool' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=ROOT).returncode == 0
@@ -0,0 +1,66 @@
+# /tests/test_ingest.py
+
+import os
+
+import pytest
+
+from tools.ingest import ingest
+from tools.knowledge_base import open_vectorstore
+
+PARAGRAPHS = [f"Paragraph {i}. " + " ".join(f"word{i}x{j}" for j in range(40)) for i in range(6)]
+
+
+@pytest.fixture
+def kb(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("\n\n".join(PARAGRAPHS))
+    (docs / "b.md").write_text("Another file about drones.")
+    index = str(tmp_path / "index")
+
+    def run(sources, **kwargs):
+        ingest([str(source) for source in sources], persist_directory=index, chunk_size=300, chunk_overlap=0, **kwargs)
+        stored = open_vectorstore(index).get(include=["metadatas", "documents"])
+        return list(zip(stored["metadatas"], stored["documents"]))
+
+    return docs, run
+
+
+def _positions(rows, name: str) -> list:
+    return sorted((m["chunk_index"], text[:12]) for m, text in rows if os.path.basename(m["source"]) == name)
+
+
+def test_edit_updates_positions_of_reused_chunks(kb):
+    docs, run = kb
+    run([docs])
+    (docs / "a.md").write_text("\n\n".join(["NEW intro " + " ".join(f"new{j}" for j in range(40))] + PARAGRAPHS))
+    rows = run([docs])
+
+    positions = _positions(rows, "a.md")
+    assert [index for index, _ in positions] == list(range(len(positions)))
+    assert positions[0][1].startswith("NEW intro")
+    assert positions[1][1].startswith("Paragraph 0")
+    hashes = {m["content_hash"] for m, _ in rows if os.path.basename(m["source"]) == "a.md"}
+    assert len(hashes) == 1
+
+
+def test_indexing_one_file_keeps_the_others(kb):
+    docs, run = kb
+    run([docs])
+    rows = run([docs / "a.md"])
+    assert _positions(rows, "b.md")
+
+
+def test_files_gone_from_a_given_directory_are_removed(kb):
+    docs, run = kb
+    run([docs])
+    (docs / "b.md").unlink()
+    assert not _positions(run([docs]), "b.md")
+
+
+def test_prune_keeps_only_the_given_sources(kb):
+    docs, run = kb
+    run([docs])
+    rows = run([docs / "a.md"], prune=True)
+    assert not _positions(rows, "b.md")
+    assert _positions(rows, "a.md")
@@ -0,0 +1,59 @@
+# /tests/test_knowledge_base.py
+
+import os
+import sys
+import subprocess
+import threading
+
+import pytest
+
+from tools import knowledge_base
+from tools.knowledge_base import knowledge_base_search
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def docs(tmp_path, monkeypatch):
+    """Sources for the index in KB_PERSIST_DIR, built by `python -m tools.ingest` in another process."""
+    monkeypatch.setattr(knowledge_base, "_retriever", None)
+    monkeypatch.setattr(knowledge_base, "_manifest_stamp", None)
+    knowledge_base._kb_cache.clear()
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "farming.md").write_text("Farmers use drones to survey crops and spray fields.")
+    yield docs
+    if knowledge_base._retriever is not None:
+        knowledge_base._retriever.close()
+
+
+def _ingest(docs):
+    command = [sys.executable, "-W", "ignore", "-m", "tools.ingest", str(docs), "--rebuild"]
+    subprocess.run(command, cwd=ROOT, check=True, capture_output=True)
+
+
+def test_concurrent_first_searches_load_the_index_once(docs, monkeypatch):
+    _ingest(docs)
+    loads = []
+    load = knowledge_base._load_retriever
+    monkeypatch.setattr(knowledge_base, "_load_retriever", lambda *args: loads.append(1) or load(*args))
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(knowledge_base_search.invoke("drones"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert all("Farmers use drones" in result for result in results)
+
+
+def test_new_index_version_is_picked_up_without_a_restart(docs):
+    _ingest(docs)
+    assert "submarine" not in knowledge_base_search.invoke("submarine patrols")
+    version = knowledge_base._index_version
+
+    (docs / "navy.md").write_text("A submarine patrols under the polar ice.")
+    _ingest(docs)
+    assert "submarine patrols" in knowledge_base_search.invoke("submarine patrols")
+    assert knowledge_base._index_version != version
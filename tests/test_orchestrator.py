@@ -0,0 +1,86 @@
+# /tests/test_orchestrator.py
+
+import asyncio
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from agents import orchestrator
+from agents.orchestrator import DebateStance, agenerate_debate_stances, generate_debate_stances
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Stands in for the orchestrator chain: answers with the queued stance lists, counting calls."""
+    replies = []
+    calls = []
+
+    def answer(inputs: dict) -> DebateStance:
+        calls.append(inputs["topic"])
+        return DebateStance(stances=replies.pop(0) if replies else ["For", "Against"])
+
+    async def aanswer(inputs: dict) -> DebateStance:
+        await asyncio.sleep(0.05)
+        return answer(inputs)
+
+    monkeypatch.setattr(orchestrator, "_orchestrator_chain", RunnableLambda(answer, afunc=aanswer))
+    orchestrator._stance_cache.clear()
+    yield replies, calls
+    orchestrator._stance_cache.clear()
+
+
+def test_stances_are_cached_by_normalized_topic(chain):
+    replies, calls = chain
+    replies.append(["Drones help", "Drones harm"])
+    assert generate_debate_stances("Drones in farming?") == ["Drones help", "Drones harm"]
+    assert generate_debate_stances('  "drones IN farming" ') == ["Drones help", "Drones harm"]
+    assert len(calls) == 1
+
+
+def test_fresh_bypasses_and_replaces_the_cached_stances(chain):
+    replies, calls = chain
+    replies.extend([["Old for", "Old against"], ["New for", "New against"]])
+    generate_debate_stances("Drones")
+    assert generate_debate_stances("drones", fresh=True) == ["New for", "New against"]
+    # Later requests get the fresh stances
+    assert generate_debate_stances("Drones") == ["New for", "New against"]
+    assert len(calls) == 2
+
+
+def test_invalid_fresh_stances_do_not_replace_valid_ones(chain):
+    replies, calls = chain
+    replies.extend([["For", "Against"], ["Only one"]])
+    generate_debate_stances("Drones")
+    assert generate_debate_stances("Drones", fresh=True) == ["Only one"]
+    assert generate_debate_stances("Drones") == ["For", "Against"]
+
+
+def test_invalid_stances_are_not_cached(chain):
+    replies, calls = chain
+    replies.extend([["Only one"], ["For", "Against"]])
+    assert generate_debate_stances("Drones") == ["Only one"]
+    assert generate_debate_stances("Drones") == ["For", "Against"]
+    assert len(calls) == 2
+
+
+def test_concurrent_requests_share_one_call(chain):
+    replies, calls = chain
+
+    async def main():
+        return await asyncio.gather(*(agenerate_debate_stances("Drones") for _ in range(5)))
+
+    assert asyncio.run(main()) == [["For", "Against"]] * 5
+    assert len(calls) == 1
+
+
+def test_async_fresh_overrides_the_cache(chain):
+    replies, calls = chain
+    replies.extend([["Old for", "Old against"], ["New for", "New against"]])
+
+    async def main():
+        await agenerate_debate_stances("Drones")
+        fresh = await agenerate_debate_stances("Drones", fresh=True)
+        return fresh, await agenerate_debate_stances("drones")
+
+    assert asyncio.run(main()) == (["New for", "New against"], ["New for", "New against"])
+    assert len(calls) == 2
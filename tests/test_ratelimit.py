@@ -0,0 +1,147 @@
+# /tests/test_ratelimit.py
+
+import time
+import asyncio
+
+import pytest
+
+from utils import ratelimit
+from utils.ratelimit import CircuitBreaker, CircuitOpenError, ProviderLimiter, TokenBucket
+
+
+class ServiceUnavailable(Exception):
+    """An outage error, as the provider SDKs name it."""
+
+
+class ResourceExhausted(Exception):
+    """A quota error, as the provider SDKs name it."""
+
+
+def _raise(error):
+    def func():
+        raise error
+    return func
+
+
+@pytest.fixture
+def limiter():
+    limiter = ProviderLimiter("test", attempts=1)
+    limiter.breaker = CircuitBreaker("test", failure_threshold=2, cooldown_seconds=0.05)
+    return limiter
+
+
+def _open(limiter):
+    for _ in range(2):
+        with pytest.raises(ServiceUnavailable):
+            limiter.call(_raise(ServiceUnavailable()))
+    assert limiter.breaker.state == "open"
+
+
+# --- Circuit breaker ---
+def test_opens_after_consecutive_failures_and_rejects_calls(limiter):
+    _open(limiter)
+    with pytest.raises(CircuitOpenError):
+        limiter.call(lambda: "ok")
+
+
+def test_probe_success_closes_the_circuit(limiter):
+    _open(limiter)
+    time.sleep(0.06)
+    assert limiter.call(lambda: "ok") == "ok"
+    assert limiter.breaker.state == "closed"
+    assert limiter.call(lambda: "ok") == "ok"
+
+
+def test_probe_failure_reopens_the_circuit(limiter):
+    _open(limiter)
+    time.sleep(0.06)
+    with pytest.raises(ServiceUnavailable):
+        limiter.call(_raise(ServiceUnavailable()))
+    assert limiter.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        limiter.call(lambda: "ok")
+
+
+def test_only_one_probe_at_a_time():
+    breaker = CircuitBreaker("test", failure_threshold=1, cooldown_seconds=0.0)
+    breaker.record_failure()
+    probe = breaker.before_call()
+    assert probe is not None and breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_quota_error_on_probe_closes_the_circuit(limiter):
+    _open(limiter)
+    time.sleep(0.06)
+    with pytest.raises(ResourceExhausted):
+        limiter.call(_raise(ResourceExhausted()))
+    # The provider answered: it is reachable, only rate limited
+    assert limiter.breaker.state == "closed"
+    assert limiter.call(lambda: "ok") == "ok"
+
+
+def test_cancelled_probe_is_released(limiter):
+    _open(limiter)
+    time.sleep(0.06)
+
+    async def cancel_probe():
+        task = asyncio.create_task(limiter.acall(asyncio.sleep, 10))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert limiter.breaker.state == "half_open"
+    assert limiter.call(lambda: "ok") == "ok"
+    assert limiter.breaker.state == "closed"
+
+
+def test_stale_probe_token_does_not_release_a_newer_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, cooldown_seconds=0.0)
+    breaker.record_failure()
+    first = breaker.before_call()
+    breaker.record_failure()  # The first probe failed; the circuit reopens
+    second = breaker.before_call()
+    breaker.end_probe(first)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.end_probe(second)
+    assert breaker.before_call() is not None
+
+
+# --- Adaptive rate ---
+def test_configured_limit_is_kept(monkeypatch):
+    monkeypatch.setattr(ratelimit, "DISCOVERED_LIMIT_SECONDS", 0.05)
+    bucket = TokenBucket("test", limit=10)
+    bucket.backoff()
+    assert bucket.rate == 5
+    time.sleep(0.06)
+    bucket.acquire()
+    assert bucket.limit == 10
+
+
+def test_discovered_limit_expires_without_further_quota_errors(monkeypatch):
+    monkeypatch.setattr(ratelimit, "DISCOVERED_LIMIT_SECONDS", 0.05)
+    bucket = TokenBucket("test")
+    bucket.acquire()
+    bucket.backoff()
+    assert bucket.limit == 1.0
+    time.sleep(0.06)
+    start = time.monotonic()
+    for _ in range(20):
+        bucket.acquire()
+    assert bucket.limit == 0.0
+    assert time.monotonic() - start < 0.05
+
+
+def test_quota_errors_extend_a_discovered_limit(monkeypatch):
+    monkeypatch.setattr(ratelimit, "DISCOVERED_LIMIT_SECONDS", 0.1)
+    bucket = TokenBucket("test")
+    bucket.backoff()
+    time.sleep(0.06)
+    bucket.backoff()
+    time.sleep(0.06)
+    bucket.acquire(blocking=False)  # Checks for expiry
+    assert bucket.limit > 0
@@ -0,0 +1,41 @@
+# /tests/test_retrieval.py
+
+from tools.embeddings import HashingEmbeddings
+from tools.knowledge_base import open_vectorstore
+from tools.retrieval import HybridRetriever
+
+
+def _retriever(tmp_path, chunks: list) -> HybridRetriever:
+    embeddings = HashingEmbeddings()
+    db = open_vectorstore(str(tmp_path / "index"), embeddings=embeddings)
+    db.add_texts([text for text, _ in chunks], metadatas=[metadata for _, metadata in chunks],
+                 ids=[f"id-{i}" for i in range(len(chunks))])
+    return HybridRetriever(db, embeddings)
+
+
+def test_vector_hits_map_back_by_id(tmp_path):
+    # Two chunks claim the same position: both must still be reachable by vector search
+    retriever = _retriever(tmp_path, [
+        ("falcons hunt over open fields", {"source": "a.md", "chunk_index": 0}),
+        ("submarines dive under polar ice", {"source": "a.md", "chunk_index": 0}),
+        ("gardens need water in summer", {"source": "b.md", "chunk_index": 0}),
+    ])
+    vector = retriever.embeddings.embed_query("submarines dive under polar ice")
+    rows = retriever._vector_rows(vector, 3)
+    assert sorted(rows) == [0, 1, 2]
+    assert retriever.texts[rows[0]] == "submarines dive under polar ice"
+
+
+def test_neighbors_merge_only_at_consistent_positions(tmp_path):
+    retriever = _retriever(tmp_path, [
+        ("alpha one", {"source": "a.md", "chunk_index": 0}),
+        ("alpha two", {"source": "a.md", "chunk_index": 1}),
+        ("alpha three", {"source": "a.md", "chunk_index": 2}),
+        ("stale copy", {"source": "b.md", "chunk_index": 0}),
+        ("beta one", {"source": "b.md", "chunk_index": 0}),
+        ("beta two", {"source": "b.md", "chunk_index": 1}),
+    ])
+    assert retriever._passages([1], window=1) == ["alpha one alpha two alpha three"]
+    # b.md position 0 is ambiguous: it is neither pulled in as a neighbor nor merged
+    assert retriever._passages([5], window=1) == ["beta two"]
+    assert sorted(retriever._passages([3, 4], window=1)) == ["beta one", "stale copy"]
@@ -0,0 +1,89 @@
+# /tests/test_scheduler.py
+
+import time
+import asyncio
+
+import pytest
+
+from agents.budget import Budget
+from agents.scheduler import TurnError, arun_round, plan_rounds
+
+
+class FakeDebater:
+    """Answers after `delay` seconds, or fails with `error`; streams two deltas and the argument."""
+
+    def __init__(self, name: str, delay: float = 0.0, error: Exception = None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.cancelled = False
+        self.contexts = []
+
+    async def agenerate_argument(self, context, budget=None):
+        self.contexts.append(context)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return f"{self.name} argues."
+
+    async def astream_argument(self, context, budget=None):
+        for text in (self.name, " argues."):
+            yield {'type': 'argument_delta', 'name': self.name, 'content': text}
+        yield {'type': 'argument', 'name': self.name, 'content': await self.agenerate_argument(context, budget)}
+
+
+def _round(debaters, **kwargs) -> list:
+    async def collect():
+        return [event async for event in arun_round(debaters, ["opening"], **kwargs)]
+    return asyncio.run(collect())
+
+
+def test_plan_rounds():
+    assert plan_rounds("sequential", 2, 2) == [[0], [1], [0], [1]]
+    assert plan_rounds("parallel_openings", 3, 2) == [[0, 1, 2], [0], [1], [2]]
+    assert plan_rounds("parallel_rounds", 2, 3) == [[0, 1]] * 3
+    assert plan_rounds("parallel_openings", 2, 0) == []
+    with pytest.raises(ValueError):
+        plan_rounds("random", 2, 2)
+
+
+def test_round_runs_turns_concurrently_in_transcript_order():
+    debaters = [FakeDebater("A", delay=0.3), FakeDebater("B", delay=0.1), FakeDebater("C", delay=0.2)]
+    start = time.perf_counter()
+    events = _round(debaters)
+    assert time.perf_counter() - start < 0.5
+    # B finishes first, but arguments follow the order of the debaters
+    assert [(event['type'], event['name']) for event in events] == [('argument', 'A'), ('argument', 'B'), ('argument', 'C')]
+    assert all(debater.contexts == [["opening"]] for debater in debaters)
+    assert {'usage', 'tool_calls', 'seconds'} <= set(events[0])
+
+
+def test_streamed_events_come_before_the_arguments():
+    events = _round([FakeDebater("A"), FakeDebater("B")], stream_tokens=True)
+    kinds = [event['type'] for event in events]
+    assert kinds.count('argument_delta') == 4
+    assert kinds[-2:] == ['argument', 'argument'] and 'argument' not in kinds[:-2]
+
+
+def test_failed_turn_cancels_the_others():
+    slow = FakeDebater("A", delay=5)
+    with pytest.raises(TurnError) as raised:
+        _round([slow, FakeDebater("B", error=RuntimeError("quota"))])
+    assert raised.value.agent == "B" and isinstance(raised.value.error, RuntimeError)
+    assert slow.cancelled
+
+
+def test_budget_stop_is_reported_for_unstreamed_turns():
+    class Stopped(FakeDebater):
+        async def agenerate_argument(self, context, budget=None):
+            budget.stopped = (budget, "seconds")
+            return "Short answer."
+
+    budget = Budget("turn", seconds=1)
+    events = _round([Stopped("A")], budgets=[budget])
+    assert [event['type'] for event in events] == ['budget', 'argument']
+    assert events[0]['resource'] == "seconds" and events[0]['name'] == "A"
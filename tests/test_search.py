@@ -0,0 +1,90 @@
+# /tests/test_search.py
+
+import json
+
+import pytest
+import requests
+
+from utils import ratelimit
+from utils.ratelimit import ProviderLimiter
+from tools import search
+
+
+def _response(status: int, payload: dict = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.reason = "Too Many Requests" if status == 429 else "OK"
+    response._content = json.dumps(payload or {}).encode()
+    return response
+
+
+@pytest.fixture
+def tavily(monkeypatch):
+    """The real Tavily tool, with its HTTP calls answered by `responses` in order."""
+    from langchain_community.tools.tavily_search import TavilySearchResults
+    import langchain_community.utilities.tavily_search as api
+
+    monkeypatch.setenv("TAVILY_API_KEY", "test-key")
+    monkeypatch.setattr(ratelimit, "RETRY_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(ratelimit, "DISCOVERED_LIMIT_SECONDS", 0.0)
+    monkeypatch.setitem(ratelimit._limiters, "search", ProviderLimiter("search", attempts=3))
+    responses = []
+    monkeypatch.setattr(api.requests, "post", lambda *args, **kwargs: responses.pop(0))
+    search.set_search_client(TavilySearchResults(max_results=1))
+    yield responses
+    search.set_search_client(None)
+
+
+RESULT = {"title": "Drones", "url": "https://example.com", "content": "Drones are cheap.", "score": 0.9}
+
+
+def test_quota_errors_reach_the_limiter(tavily):
+    tavily.extend([_response(429), _response(200, {"results": [RESULT]})])
+    assert search.web_search.invoke("drone costs") == [RESULT]
+    stats = ratelimit.get_limiter("search").report()
+    assert (stats["retries"], stats["quota_errors"]) == (1, 1)
+
+
+def test_failed_search_is_reported_to_the_agent(tavily):
+    tavily.extend([_response(429)] * 3)
+    result = search.web_search.invoke("drone exports")
+    assert result.startswith("Web search unavailable: HTTPError('429")
+    assert ratelimit.get_limiter("search").report()["failures"] == 3
+
+
+class ScriptedClient:
+    """A search client answering with `replies` in order, like a Tavily tool that reports errors in-band."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def invoke(self, query: str):
+        self.calls += 1
+        return self.replies.pop(0)
+
+
+@pytest.fixture
+def client():
+    def install(*replies):
+        client = ScriptedClient(*replies)
+        search.set_search_client(client)
+        return client
+    yield install
+    search.set_search_client(None)
+
+
+def test_results_are_cached_by_normalized_query(client):
+    fake = client([RESULT])
+    assert search.web_search.invoke("Drone costs?") == [RESULT]
+    assert search.web_search.invoke("  drone   COSTS") == [RESULT]
+    assert fake.calls == 1
+
+
+def test_error_results_are_not_cached(client):
+    fake = client("HTTPError('429 Too Many Requests')", [RESULT])
+    assert search.web_search.invoke("drone costs") == "HTTPError('429 Too Many Requests')"
+    # The next agent asking the same question gets a fresh search, not the cached error
+    assert search.web_search.invoke("Drone costs?") == [RESULT]
+    assert search.web_search.invoke("drone costs") == [RESULT]
+    assert fake.calls == 2
@@ -0,0 +1,132 @@
+# /tests/test_sessions.py
+
+import os
+import sys
+import socket
+import asyncio
+import threading
+import subprocess
+
+import pytest
+
+from utils import sessions
+from utils.sessions import SessionStore, follow_session, session_transcript, start_session
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"))
+    monkeypatch.setattr(sessions, "_store", store)
+    yield store
+    store.close()
+
+
+async def _debate(turns: int):
+    for turn in range(turns):
+        for token in ("Drones ", "are ", "useful."):
+            yield {'type': 'argument_delta', 'name': 'Agent A', 'content': token}
+        yield {'type': 'argument', 'name': 'Agent A', 'content': f"Drones are useful. ({turn})"}
+
+
+def _run(topic: str, turns: int) -> tuple:
+    async def main():
+        session = start_session(topic, {}, _debate(turns))
+        live = [item async for item in follow_session(session.id)]
+        await session.task
+        return session.id, live
+    return asyncio.run(main())
+
+
+def test_store_is_used_off_the_event_loop(store, monkeypatch):
+    loop_thread = threading.get_ident()
+    writers = set()
+    connection = store._conn
+
+    class Connection:
+        def __getattr__(self, name):
+            return getattr(connection, name)
+
+        def execute(self, *args):
+            writers.add(threading.get_ident())
+            return connection.execute(*args)
+
+    monkeypatch.setattr(store, "_conn", Connection())
+    debate_id, _ = _run("topic", turns=3)
+
+    async def read():
+        # A finished debate: replayed and summarized from the store
+        replay = [item async for item in follow_session(debate_id)]
+        return replay, await session_transcript(debate_id)
+
+    replay, transcript = asyncio.run(read())
+    assert len(replay) == 4 and len(transcript["transcript"]) == 3
+    assert writers and loop_thread not in writers
+
+
+def test_replay_skips_token_deltas(store):
+    debate_id, live = _run("topic", turns=2)
+    assert [seq for seq, _ in live] == list(range(1, 10))
+
+    async def replay_after(after):
+        return [item async for item in follow_session(debate_id, after)]
+
+    replay = asyncio.run(replay_after(0))
+    assert [(seq, event['type']) for seq, event in replay] == [(1, 'session'), (5, 'argument'), (9, 'argument')]
+    # A client that last saw a delta resumes from the next stored event
+    assert [seq for seq, _ in asyncio.run(replay_after(3))] == [5, 9]
+    assert store.get(debate_id)["status"] == "done"
+
+
+def test_close_commits_queued_writes(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    store = SessionStore(path)
+    store.create("d1", "topic", {})
+    for seq in range(1, 101):
+        store.append("d1", seq, {'type': 'argument', 'content': str(seq)})
+    store.finish("d1", "done")
+    store.close()
+
+    reopened = SessionStore(path)
+    assert len(reopened.events("d1")) == 100
+    assert reopened.get("d1")["status"] == "done"
+    reopened.close()
+
+
+def test_failing_write_does_not_lose_its_batch(store):
+    store.create("d1", "topic", {})
+    store.append("d1", 1, {'type': 'argument', 'content': "first"})
+    store.append("d1", 1, {'type': 'argument', 'content': "duplicate"})
+    store.append("d1", 2, {'type': 'argument', 'content': "second"})
+    store.finish("d1", "done")
+    assert [event['content'] for _, event in store.events("d1")] == ["first", "second"]
+    assert store.get("d1")["status"] == "done"
+
+
+def test_restart_only_interrupts_sessions_of_exited_processes(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    host = socket.gethostname()
+    owners = {
+        "live": f"{host}:{os.getppid()}",  # Another worker, still serving its debate
+        "exited": f"{host}:{exited.pid}",
+        "legacy": None,  # Recorded before sessions had an owner
+    }
+    store = SessionStore(path)
+    for debate_id, owner in owners.items():
+        store.create(debate_id, "topic", {})
+        store.append(debate_id, 1, {'type': 'session', 'debate_id': debate_id})
+    store.flush()
+    with store._lock:
+        for debate_id, owner in owners.items():
+            store._conn.execute("UPDATE debates SET owner = ? WHERE id = ?", (owner, debate_id))
+        store._conn.commit()
+    store.close()
+
+    restarted = SessionStore(path)
+    assert restarted.mark_interrupted() == 2
+    assert {debate_id: restarted.get(debate_id)["status"] for debate_id in owners} == {
+        "live": "running", "exited": "interrupted", "legacy": "interrupted",
+    }
+    assert [seq for seq, _ in restarted.events("exited")] == [1, 2]
+    restarted.close()
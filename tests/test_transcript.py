@@ -0,0 +1,111 @@
+# /tests/test_transcript.py
+
+import os
+import shutil
+
+from utils.transcript import Transcript, TranscriptArchive, iter_debates, iter_turns, seal_archive
+
+
+def _transcript(debate_id: str, turns: int = 3) -> Transcript:
+    transcript = Transcript("topic", debate_id, status="ok")
+    transcript.add({'type': 'agent_stance', 'name': 'Agent A', 'stance': 'For'})
+    for i in range(turns):
+        transcript.add({
+            'type': 'argument', 'name': 'Agent A', 'content': f"{debate_id} turn {i}",
+            'usage': {"input_tokens": 10, "cached_input_tokens": 4, "output_tokens": 2},
+            'tool_calls': 1, 'seconds': 0.5,
+        })
+    return transcript
+
+
+def _ids(path: str) -> list:
+    return [header["debate"] for header, _ in iter_debates(path)]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "a.jsonl.gz")
+    archive = TranscriptArchive(path)
+    for d in range(3):
+        archive.append(_transcript(f"d{d}"))
+    archive.close()
+
+    turns = list(iter_turns(path))
+    assert [debate for debate, _ in turns] == ["d0"] * 3 + ["d1"] * 3 + ["d2"] * 3
+    turn = turns[0][1]
+    assert (turn.name, turn.content, turn.tool_calls, turn.cached_input_tokens) == ("Agent A", "d0 turn 0", 1, 4)
+
+
+def test_partly_read_debates_are_skipped(tmp_path):
+    path = str(tmp_path / "a.jsonl.gz")
+    archive = TranscriptArchive(path)
+    for d in range(3):
+        archive.append(_transcript(f"d{d}"))
+    archive.close()
+    assert [(header["debate"], next(turns).content) for header, turns in iter_debates(path)] == [
+        ("d0", "d0 turn 0"), ("d1", "d1 turn 0"), ("d2", "d2 turn 0"),
+    ]
+
+
+def test_resume_after_crash_without_close(tmp_path):
+    path = str(tmp_path / "a.jsonl.gz")
+    archive = TranscriptArchive(path)
+    archive.append(_transcript("d0"))
+    # The process dies: the file is left as it is, never closed
+    shutil.copy(path, str(tmp_path / "crashed.jsonl.gz"))
+    archive.close()
+    path = str(tmp_path / "crashed.jsonl.gz")
+
+    archive = TranscriptArchive(path)
+    archive.append(_transcript("d1"))
+    archive.close()
+    assert _ids(path) == ["d0", "d1"]
+
+
+def test_resume_after_crash_mid_write(tmp_path):
+    path = str(tmp_path / "a.jsonl.gz")
+    archive = TranscriptArchive(path)
+    archive.append(_transcript("d0"))
+    archive.append(_transcript("d1", turns=50))
+    archive.close()
+    complete = os.path.getsize(path)
+
+    for cut in (7, 40, 200):
+        broken = str(tmp_path / f"cut{cut}.jsonl.gz")
+        shutil.copy(path, broken)
+        with open(broken, "r+b") as f:
+            f.truncate(complete - cut)
+        # Readers get what was complete before the cut
+        assert _ids(broken)[0] == "d0"
+        # Reopening drops the unfinished debate, and later debates read back
+        archive = TranscriptArchive(broken)
+        archive.append(_transcript("d2"))
+        archive.close()
+        assert _ids(broken) == ["d0", "d2"]
+
+
+def test_seal_keeps_complete_archives(tmp_path):
+    path = str(tmp_path / "a.jsonl.gz")
+    archive = TranscriptArchive(path)
+    archive.append(_transcript("d0"))
+    archive.close()
+    assert seal_archive(path) == 0
+    assert seal_archive(str(tmp_path / "missing.jsonl.gz")) == 0
+
+
+def test_batch_checkpoint_after_crash(tmp_path):
+    from agents.batch import completed_ids
+
+    path = str(tmp_path / "batch.jsonl.gz")
+    archive = TranscriptArchive(path)
+    archive.append(_transcript("q-1"))
+    archive.append(_transcript("q-2", turns=50))
+    archive.close()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 100)
+
+    # What run_batch does: open the output, then read the checkpoint
+    output = TranscriptArchive(path)
+    assert completed_ids(path) == {"q-1"}
+    output.append(_transcript("q-2"))
+    output.close()
+    assert completed_ids(path) == {"q-1", "q-2"}
@@ -0,0 +1,236 @@
+# /tools/embeddings.py
+"""
+Embedding backends for the knowledge base.
+
+`get_embeddings()` returns the process-wide embeddings object used by both ingestion and
+retrieval. The backend is chosen with KB_EMBEDDER:
+
+    gemini   -> GoogleGenerativeAIEmbeddings (default, needs network and an API key)
+    hashing  -> HashingEmbeddings, a deterministic local embedder for tests and offline runs
+
+Either backend is wrapped in `CachedEmbeddings`: an in-memory LRU in front of a
+content-addressed SQLite store, so a text is only ever embedded once per model.
+Gemini calls also go through the shared 'embedding' limiter (utils/ratelimit.py).
+"""
+
+import os
+import re
+import math
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+from utils.tracing import span
+from utils.ratelimit import get_limiter
+from dotenv import load_dotenv
+load_dotenv()
+
+# --- Configuration ---
+EMBEDDER = os.getenv("KB_EMBEDDER", "gemini")
+GEMINI_EMBEDDING_MODEL = "gemini-embedding-001"
+HASHING_DIMENSIONS = int(os.getenv("KB_HASHING_DIMENSIONS", "256"))
+EMBEDDING_CACHE_ENABLED = os.getenv("KB_EMBEDDING_CACHE", "1") != "0"
+EMBEDDING_CACHE_PATH = os.getenv("KB_EMBEDDING_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite"))
+EMBEDDING_LRU_SIZE = int(os.getenv("KB_EMBEDDING_LRU_SIZE", "4096"))
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_embeddings = None
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic, network-free embedder using the hashing trick: every word is hashed
+    to a signed bucket of a fixed-size vector, which is then L2-normalized. Texts that
+    share words end up close together, which is enough for tests and benchmarks.
+    """
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> list:
+        vector = [0.0] * self.dimensions
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            sign = 1.0 if value & 1 else -1.0
+            vector[(value >> 1) % self.dimensions] += sign
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text)
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """Sends every call of a remote embedder through the 'embedding' limiter (rate limit, retries, breaker)."""
+
+    def __init__(self, inner: Embeddings):
+        self.inner = inner
+
+    def embed_documents(self, texts: list) -> list:
+        return get_limiter("embedding").call(self.inner.embed_documents, texts)
+
+    def embed_query(self, text: str) -> list:
+        return get_limiter("embedding").call(self.inner.embed_query, text)
+
+
+class EmbeddingStore:
+    """Content-addressed SQLite store of float32 vectors, safe to share between threads."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys: list) -> dict:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for offset in range(0, len(keys), 500):
+                batch = keys[offset:offset + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items: dict):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings object with an in-memory LRU and a persistent store.
+    Keys hash the model name, the kind (query or document, which some providers embed
+    differently) and the text, so switching models never returns stale vectors.
+    """
+
+    def __init__(self, inner: Embeddings, model_name: str, store: EmbeddingStore = None,
+                 lru_size: int = EMBEDDING_LRU_SIZE):
+        self.inner = inner
+        self.model_name = model_name
+        self.store = store
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: list):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, kind: str, texts: list, compute) -> list:
+        with span("embedding", kind=kind, texts=len(texts)) as attrs:
+            keys = [self._key(kind, text) for text in texts]
+            results = {}
+
+            with self._lock:
+                for key in keys:
+                    if key in self._lru:
+                        self._lru.move_to_end(key)
+                        results[key] = self._lru[key]
+                self.stats["memory_hits"] += len(results)
+
+            missing = [key for key in dict.fromkeys(keys) if key not in results]
+            if missing and self.store is not None:
+                from_disk = self.store.get_many(missing)
+                with self._lock:
+                    for key, vector in from_disk.items():
+                        self._remember(key, vector)
+                    self.stats["disk_hits"] += len(from_disk)
+                results.update(from_disk)
+
+            todo = {}
+            for key, text in zip(keys, texts):
+                if key not in results:
+                    todo.setdefault(key, text)
+            attrs["cache"] = "miss" if todo else "hit"
+            if todo:
+                computed = dict(zip(todo, compute(list(todo.values()))))
+                if self.store is not None:
+                    self.store.put_many(computed)
+                with self._lock:
+                    for key, vector in computed.items():
+                        self._remember(key, vector)
+                    self.stats["misses"] += len(computed)
+                results.update(computed)
+
+            return [results[key] for key in keys]
+
+    def embed_documents(self, texts: list) -> list:
+        return self._lookup("document", texts, self.inner.embed_documents)
+
+    def embed_query(self, text: str) -> list:
+        return self._lookup("query", [text], lambda todo: [self.inner.embed_query(todo[0])])[0]
+
+
+def embedding_model_name() -> str:
+    """Name of the configured embedding model, recorded in the index manifest."""
+    if EMBEDDER == "hashing":
+        return f"hashing-{HASHING_DIMENSIONS}"
+    return GEMINI_EMBEDDING_MODEL
+
+
+def _build_embedder() -> Embeddings:
+    if EMBEDDER == "hashing":
+        return HashingEmbeddings(HASHING_DIMENSIONS)
+    if EMBEDDER == "gemini":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return RateLimitedEmbeddings(
+            GoogleGenerativeAIEmbeddings(model=GEMINI_EMBEDDING_MODEL, google_api_key=os.getenv("google_api_key"))
+        )
+    raise ValueError(f"Unknown KB_EMBEDDER '{EMBEDDER}'. Use 'gemini' or 'hashing'.")
+
+
+def get_embeddings() -> Embeddings:
+    """Returns the process-wide (cached) embeddings object for the configured backend."""
+    global _embeddings
+    if _embeddings is None:
+        embedder = _build_embedder()
+        if EMBEDDING_CACHE_ENABLED:
+            embedder = CachedEmbeddings(embedder, embedding_model_name(), EmbeddingStore(EMBEDDING_CACHE_PATH))
+        _embeddings = embedder
+    return _embeddings
+
+
+def embedding_cache_stats() -> dict:
+    """Hit and miss counts of the embedding cache, or {} when it is disabled."""
+    return dict(getattr(_embeddings, "stats", None) or {})
+
+
+def set_embeddings(embeddings: Embeddings):
+    """Replaces the process-wide embeddings object, e.g. with a fake for benchmarks."""
+    global _embeddings
+    _embeddings = embeddings
+
+
+if __name__ == "__main__":
+    print("testing embedding cache")
+    embeddings = get_embeddings()
+    for _ in range(2):
+        vector = embeddings.embed_query("What are the main ethical concerns regarding AI in military applications")
+        print(f"{embedding_model_name()}: {len(vector)} dimensions")
+    print(getattr(embeddings, "stats", "cache disabled"))
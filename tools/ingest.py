@@ -0,0 +1,370 @@
+# /tools/ingest.py
+"""
+Offline ingestion pipeline for the knowledge base.
+
+Builds (or updates) the persisted Chroma index that `knowledge_base_search` opens at
+runtime. Sources can be files or whole directories of PDF, text and markdown files.
+The pipeline streams through four stages:
+
+    hash  -> every file is keyed by the SHA-256 of its content; unchanged files are skipped
+    parse -> pages are loaded lazily, optionally in a process pool (PDF parsing is CPU bound)
+    chunk -> pages are split into chunks whose ids are hashes of their content
+    embed -> chunks are embedded in batches and upserted; chunks already in the index
+             (e.g. untouched pages of an edited file) are not embedded again, only their
+             metadata (position in the file, file hash) is brought up to date
+
+so running this repeatedly never adds duplicate vectors, and only new or changed
+content costs embedding calls.
+
+Indexed files that are gone from the given directories (or are given files that no
+longer exist) are removed from the index. Files indexed from other sources are kept,
+unless --prune asks to drop everything that is not part of this run's sources.
+
+Usage:
+    python -m tools.ingest                          # index everything under docs/
+    python -m tools.ingest reports/ notes.md        # add or update specific files and directories
+    python -m tools.ingest docs/ --prune            # make the index hold exactly docs/
+    python -m tools.ingest --workers 4              # parse PDFs in 4 processes
+    python -m tools.ingest --rebuild                # drop the index and embed everything again
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from tools.knowledge_base import (
+    KB_PERSIST_DIR,
+    KB_MANIFEST_FILENAME,
+    KB_DEFAULT_SOURCES,
+    EMBEDDING_MODEL,
+    load_manifest,
+    open_vectorstore,
+)
+
+# Bump when the manifest layout or chunk id scheme changes; forces a full rebuild.
+MANIFEST_SCHEMA_VERSION = 2
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md", ".markdown")
+CHUNK_SIZE = int(os.getenv("KB_CHUNK_SIZE", "300"))
+CHUNK_OVERLAP = int(os.getenv("KB_CHUNK_OVERLAP", "50"))
+EMBED_BATCH_SIZE = int(os.getenv("KB_EMBED_BATCH_SIZE", "64"))
+
+
+def file_sha256(path: str) -> str:
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Stable id of a chunk: the hash of its source path and content."""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def _covered_by(path: str, sources: list) -> bool:
+    """True if `path` is one of the given files or lies under one of the given directories."""
+    for source in sources:
+        source = os.path.normpath(source)
+        if path == source or path.startswith(source.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+
+def discover_sources(paths: list) -> list:
+    """Expands directories into the supported files they contain, recursively."""
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in files:
+                    if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        found.add(os.path.normpath(os.path.join(root, name)))
+        elif not os.path.exists(path):
+            print(f"Not found: {path}")
+        elif path.lower().endswith(SUPPORTED_EXTENSIONS):
+            found.add(os.path.normpath(path))
+        else:
+            print(f"Skipping unsupported file: {path}")
+    return sorted(found)
+
+
+# --- Pipeline Statistics ---
+class StageStats:
+    """Accumulates items and time spent in each pipeline stage."""
+
+    def __init__(self):
+        self.items = {}
+        self.seconds = {}
+
+    def add(self, stage: str, items: int, seconds: float):
+        self.items[stage] = self.items.get(stage, 0) + items
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def report(self) -> dict:
+        """Returns {stage: {items, seconds, per_second}} and prints a summary."""
+        units = {"hash": "docs", "parse": "docs", "pages": "pages", "chunk": "chunks", "embed": "chunks"}
+        summary = {}
+        print("--- Ingestion Throughput ---")
+        for stage, items in self.items.items():
+            seconds = self.seconds[stage]
+            rate = items / seconds if seconds > 0 else float("inf")
+            summary[stage] = {"items": items, "seconds": round(seconds, 3), "per_second": round(rate, 2)}
+            print(f"  {stage:<6} {items:>7} {units.get(stage, 'items'):<6} in {seconds:7.2f}s  ({rate:,.1f} {units.get(stage, 'items')}/s)")
+        return summary
+
+
+# --- Stage: Parse ---
+def _lazy_pages(path: str):
+    """Yields the pages of one file as Documents without loading the whole file first."""
+    if path.lower().endswith(".pdf"):
+        loader = PyPDFLoader(path)
+    else:
+        loader = TextLoader(path, encoding="utf-8")
+    yield from loader.lazy_load()
+
+
+def _parse_file(path: str) -> list:
+    """Parses one file into (text, metadata) pairs. Top-level so a process pool can run it."""
+    return [(page.page_content, page.metadata) for page in _lazy_pages(path)]
+
+
+def _iter_parsed(paths: list, workers: int, stats: StageStats):
+    """
+    Yields (path, pages) for each file in order. With workers > 1, files are parsed in a
+    process pool, keeping only a small window of files in flight to bound memory.
+    """
+    if workers <= 1:
+        for path in paths:
+            start = time.perf_counter()
+            pages = [Document(page_content=text, metadata=metadata) for text, metadata in _parse_file(path)]
+            stats.add("parse", 1, time.perf_counter() - start)
+            stats.add("pages", len(pages), time.perf_counter() - start)
+            yield path, pages
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        remaining = iter(paths)
+        start = time.perf_counter()
+        for path in remaining:
+            pending.append((path, pool.submit(_parse_file, path)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            path, future = pending.popleft()
+            pages = [Document(page_content=text, metadata=metadata) for text, metadata in future.result()]
+            # Wall time while waiting on the pool, so the rate reflects parallel throughput
+            elapsed = time.perf_counter() - start
+            stats.add("parse", 1, elapsed)
+            stats.add("pages", len(pages), elapsed)
+            next_path = next(remaining, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(_parse_file, next_path)))
+            yield path, pages
+            start = time.perf_counter()
+
+
+# --- Stage: Chunk ---
+def _chunk_pages(path: str, pages: list, content_hash: str, text_splitter) -> tuple:
+    """
+    Splits a file's pages into chunks and returns (chunks, ids), dropping repeated chunks.
+    `chunk_index` numbers the kept chunks 0, 1, ... so neighbors are always consecutive.
+    """
+    chunks, ids, seen = [], [], set()
+    for chunk in text_splitter.split_documents(pages):
+        cid = chunk_id(path, chunk.page_content)
+        if cid in seen:
+            continue  # Identical text repeated in the same file adds nothing to retrieval
+        seen.add(cid)
+        chunk.metadata.update({"source": path, "content_hash": content_hash, "chunk_index": len(chunks)})
+        chunks.append(chunk)
+        ids.append(cid)
+    return chunks, ids
+
+
+# --- Stage: Embed + Upsert ---
+def _upsert_chunks(db, chunks: list, ids: list, batch_size: int, stats: StageStats) -> int:
+    """
+    Embeds and upserts chunks in batches. Chunks already present are not embedded again,
+    but their metadata is replaced: the same text may sit at another position in a new
+    version of the file. Returns the number embedded.
+    """
+    embedded = 0
+    for offset in range(0, len(chunks), batch_size):
+        batch_ids = ids[offset:offset + batch_size]
+        batch_chunks = chunks[offset:offset + batch_size]
+
+        existing = set(db.get(ids=batch_ids, include=[])["ids"])
+        kept = [(cid, chunk) for cid, chunk in zip(batch_ids, batch_chunks) if cid in existing]
+        if kept:
+            # Metadata only: the langchain wrapper has no update without re-embedding
+            db._collection.update(ids=[cid for cid, _ in kept], metadatas=[chunk.metadata for _, chunk in kept])
+        todo = [(cid, chunk) for cid, chunk in zip(batch_ids, batch_chunks) if cid not in existing]
+        if not todo:
+            continue
+
+        start = time.perf_counter()
+        db.add_documents([chunk for _, chunk in todo], ids=[cid for cid, _ in todo])
+        stats.add("embed", len(todo), time.perf_counter() - start)
+        embedded += len(todo)
+    return embedded
+
+
+# --- Manifest ---
+def _empty_manifest(chunk_size: int, chunk_overlap: int) -> dict:
+    return {
+        "schema_version": MANIFEST_SCHEMA_VERSION,
+        "index_version": 0,
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "num_chunks": 0,
+        "files": {},
+    }
+
+
+def _needs_rebuild(manifest: dict, chunk_size: int, chunk_overlap: int) -> bool:
+    """An index built with another embedder, splitter or schema cannot be updated in place."""
+    return (
+        manifest.get("schema_version") != MANIFEST_SCHEMA_VERSION
+        or manifest.get("embedding_model") != EMBEDDING_MODEL
+        or manifest.get("chunk_size") != chunk_size
+        or manifest.get("chunk_overlap") != chunk_overlap
+    )
+
+
+def _write_manifest(manifest: dict, persist_directory: str):
+    """Writes the manifest atomically so a crashed run never leaves a half-written file."""
+    os.makedirs(persist_directory, exist_ok=True)
+    manifest_path = os.path.join(persist_directory, KB_MANIFEST_FILENAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def ingest(sources: list, persist_directory: str = KB_PERSIST_DIR, rebuild: bool = False,
+           chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+           batch_size: int = EMBED_BATCH_SIZE, workers: int = 1, prune: bool = False) -> dict:
+    """
+    Brings the persisted index in line with the given sources.
+
+    Args:
+        sources: Files and/or directories to index.
+        persist_directory: Where the Chroma index and its manifest live.
+        rebuild: Drop the existing index and embed everything again.
+        chunk_size: Maximum characters per chunk.
+        chunk_overlap: Characters shared by consecutive chunks.
+        batch_size: Chunks per embedding call.
+        workers: Processes used to parse files. 1 parses in this process.
+        prune: Remove every indexed file that is not among `sources`. By default only
+            files that disappeared from the given directories (or given files that no
+            longer exist) are removed, and files indexed from other sources are kept.
+
+    Returns:
+        The manifest describing the resulting index.
+    """
+    stats = StageStats()
+    manifest = load_manifest(persist_directory)
+    db = open_vectorstore(persist_directory)
+    changed = False
+
+    if manifest is None or rebuild or _needs_rebuild(manifest, chunk_size, chunk_overlap):
+        # Without a usable manifest we cannot tell which vectors are current, so start clean
+        print("Building a fresh index...")
+        db.delete_collection()
+        db = open_vectorstore(persist_directory)
+        previous_version = manifest.get("index_version", 0) if manifest else 0
+        manifest = _empty_manifest(chunk_size, chunk_overlap)
+        # Versions keep counting up, so a rebuilt index never reuses a version readers have cached
+        manifest["index_version"] = previous_version
+        changed = True
+
+    paths = discover_sources(sources)
+    wanted = set(paths)
+
+    # Remove files that are no longer part of the sources they were indexed from
+    for path in list(manifest["files"]):
+        if path not in wanted and (prune or _covered_by(path, sources)):
+            print(f"Removing '{path}' from the index")
+            db.delete(ids=manifest["files"].pop(path)["chunk_ids"])
+            changed = True
+
+    # Stage: hash. Only new or changed files go further down the pipeline.
+    to_index = {}
+    for path in paths:
+        start = time.perf_counter()
+        content_hash = file_sha256(path)
+        stats.add("hash", 1, time.perf_counter() - start)
+        entry = manifest["files"].get(path)
+        if entry is None or entry["sha256"] != content_hash:
+            to_index[path] = content_hash
+    print(f"{len(paths)} files found, {len(to_index)} new or changed.")
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+    for path, pages in _iter_parsed(list(to_index), workers, stats):
+        content_hash = to_index[path]
+
+        start = time.perf_counter()
+        chunks, ids = _chunk_pages(path, pages, content_hash, text_splitter)
+        stats.add("chunk", len(chunks), time.perf_counter() - start)
+
+        embedded = _upsert_chunks(db, chunks, ids, batch_size, stats)
+
+        # Drop chunks of the previous version of the file that no longer exist
+        old_entry = manifest["files"].get(path)
+        if old_entry is not None:
+            stale = list(set(old_entry["chunk_ids"]) - set(ids))
+            if stale:
+                db.delete(ids=stale)
+
+        manifest["files"][path] = {"sha256": content_hash, "chunk_ids": ids}
+        changed = True
+        print(f"Indexed {path}: {len(chunks)} chunks, {embedded} embedded")
+
+    if changed:
+        manifest["index_version"] += 1
+        manifest["num_chunks"] = sum(len(entry["chunk_ids"]) for entry in manifest["files"].values())
+        manifest["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        _write_manifest(manifest, persist_directory)
+        print(f"Knowledge base index is now v{manifest['index_version']} ({manifest['num_chunks']} chunks).")
+    else:
+        print(f"Knowledge base index v{manifest['index_version']} is up to date.")
+
+    manifest["last_run_stats"] = stats.report()
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the knowledge base index offline.")
+    parser.add_argument("sources", nargs="*", default=KB_DEFAULT_SOURCES, help="Files or directories to index.")
+    parser.add_argument("--persist-dir", default=KB_PERSIST_DIR, help="Index directory.")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the index and embed everything again.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Maximum characters per chunk.")
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP, help="Characters shared by consecutive chunks.")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Chunks per embedding call.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse files.")
+    parser.add_argument("--prune", action="store_true", help="Remove indexed files that are not among the sources.")
+    args = parser.parse_args()
+
+    ingest(
+        args.sources,
+        persist_directory=args.persist_dir,
+        rebuild=args.rebuild,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        prune=args.prune,
+    )
@@ -1,33 +1,116 @@
 from langchain_core.tools import tool
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import CharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import Chroma
 import os
+import json
+import threading
 _retriever = None
+_index_version = None
+_manifest_stamp = None  # Identifies the manifest file the retriever was built from
+_retriever_lock = threading.Lock()
 from dotenv import load_dotenv
 load_dotenv()
+from tools.embeddings import get_embeddings, embedding_model_name
+from tools.retrieval import HybridRetriever
+from utils.cache import TTLCache, normalize_query
+from utils.console import log
+from utils.tracing import span
+
+# --- Index Configuration ---
+# The index is built offline by `python -m tools.ingest` and only opened here.
+KB_PERSIST_DIR = os.getenv("KB_PERSIST_DIR", "chroma_db")
+KB_MANIFEST_FILENAME = "manifest.json"
+KB_COLLECTION = "knowledge_base"
+KB_DEFAULT_SOURCES = ["docs"]  # Files or directories indexed by default
+EMBEDDING_MODEL = embedding_model_name()  # Depends on KB_EMBEDDER, see tools/embeddings.py
+
+# Retrieval results shared by every agent and debate in the process. Keys include the
+# index version, so re-ingesting never serves results from the previous index.
+_kb_cache = TTLCache(
+    "knowledge_base_search",
+    max_entries=int(os.getenv("KB_SEARCH_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("KB_SEARCH_CACHE_TTL", "3600")),
+)
+
+
+class KnowledgeBaseNotBuiltError(RuntimeError):
+    """Raised when the runtime path finds no prebuilt index to open."""
+
+
+def load_manifest(persist_directory: str = KB_PERSIST_DIR):
+    """Reads the index manifest written by the ingestion command, or None if there is none."""
+    manifest_path = os.path.join(persist_directory, KB_MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _stat_manifest(persist_directory: str = KB_PERSIST_DIR):
+    """Changes whenever the manifest is rewritten (ingest replaces it atomically), or None if absent."""
+    try:
+        stat = os.stat(os.path.join(persist_directory, KB_MANIFEST_FILENAME))
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def open_vectorstore(persist_directory: str = KB_PERSIST_DIR, embeddings=None):
+    """Opens the persisted Chroma collection without loading or embedding any documents."""
+    # Chroma and its client are only imported when the index is first opened
+    from langchain_community.vectorstores import Chroma
+    return Chroma(
+        collection_name=KB_COLLECTION,
+        embedding_function=embeddings or get_embeddings(),
+        persist_directory=persist_directory,
+    )
+
 
 def _initialize_retriever():
-    """Loads the document, splits it, creates embeddings, and builds retriever"""
-    
-    global _retriever
-    if _retriever is not None:
-        return _retriever
-    print("Initializing Knowledge Base Retriever...")
-    
-    # Load the PDF file instead of a text file
-    loader = PyPDFLoader("docs/ai_military.pdf")
-    documents = loader.load()
-    
-    text_splitter = CharacterTextSplitter(chunk_size=300, chunk_overlap=50)
-    docs = text_splitter.split_documents(documents)
-    
-    embeddings = GoogleGenerativeAIEmbeddings(model="gemini-embedding-001", google_api_key=os.getenv("google_api_key"))
-    
-    db = Chroma.from_documents(docs, embeddings, persist_directory="chroma_db")
-    _retriever = db.as_retriever(search_kwargs={"k": 1})
-    return _retriever
+    """
+    Opens the prebuilt index and builds the retriever, again whenever `tools.ingest`
+    has written a new index version. Nothing is re-embedded here.
+
+    Returns:
+        (retriever, index version)
+    """
+    global _retriever, _index_version, _manifest_stamp
+    # Fast path: one stat() per search tells whether the manifest was rewritten
+    stamp = _stat_manifest()
+    retriever, version = _retriever, _index_version
+    if retriever is not None and stamp == _manifest_stamp:
+        return retriever, version
+
+    # Concurrent first searches from parallel agents load the index once
+    with _retriever_lock:
+        stamp = _stat_manifest()
+        if _retriever is not None and stamp == _manifest_stamp:
+            return _retriever, _index_version
+        retriever, version = _load_retriever(_retriever, _index_version)
+        _retriever, _index_version, _manifest_stamp = retriever, version, stamp
+        return retriever, version
+
+
+def _load_retriever(current, current_version):
+    """The retriever of the index on disk: `current` if its version has not changed."""
+    manifest = load_manifest()
+    if manifest is None:
+        raise KnowledgeBaseNotBuiltError(
+            f"No knowledge base index found in '{KB_PERSIST_DIR}'. Run `python -m tools.ingest` first."
+        )
+    if manifest.get("embedding_model") != EMBEDDING_MODEL:
+        raise KnowledgeBaseNotBuiltError(
+            f"Index was built with '{manifest.get('embedding_model')}' but '{EMBEDDING_MODEL}' is configured. "
+            "Run `python -m tools.ingest --rebuild`."
+        )
+    if current is not None:
+        if manifest['index_version'] == current_version:
+            return current, current_version
+        # The in-process Chroma client caches the old index: close it before reopening
+        current.close()
+    log(f"Opening Knowledge Base index v{manifest['index_version']} ({manifest['num_chunks']} chunks)...")
+
+    embeddings = get_embeddings()
+    retriever = HybridRetriever(open_vectorstore(embeddings=embeddings), embeddings)
+    return retriever, manifest['index_version']
 
 @tool
 def knowledge_base_search(query: str) -> str:
@@ -35,16 +118,26 @@ def knowledge_base_search(query: str) -> str:
     Searches the knowledge base document (a report on AI ethics in urban planning)
     to find specific information, definitions, or arguments related to the report.
     Use this tool when you need to cite specific details from the official report.
+    One call returns several relevant passages with their surrounding context, so
+    there is rarely a need to search again for the same point.
 
     Args:
         query: The specific question or topic to look up in the knowledge base.
     """
-    print(f"\033[32m--- Executing Knowledge Base Search with query: '{query}' ---\033[0m")
-    retriever = _initialize_retriever()
-    
-    docs = retriever.invoke(query)
-    unique_docs = list({doc.page_content for doc in docs})  # Remove duplicates
-    return "\n\n".join(unique_docs)
+    log(f"\033[32m--- Executing Knowledge Base Search with query: '{query}' ---\033[0m")
+    try:
+        retriever, index_version = _initialize_retriever()
+    except KnowledgeBaseNotBuiltError as e:
+        # Let the agent carry on without the knowledge base instead of failing its turn
+        return f"Knowledge base unavailable: {e}"
+
+    def _search():
+        # Passages are merged from distinct chunks, so they never repeat each other
+        return "\n\n".join(retriever.search(query))
+
+    key = (index_version, normalize_query(query))
+    with span("retrieval", cache="hit" if key in _kb_cache else "miss"):
+        return _kb_cache.get_or_compute(key, _search)
 
 if __name__ == "__main__":
     print("testing KB")
@@ -0,0 +1,272 @@
+# /tools/retrieval.py
+"""
+Hybrid retrieval over the knowledge base index.
+
+One query goes through four steps:
+
+    recall  -> the vector store and an in-process BM25 keyword index each return their
+               best KB_CANDIDATES chunks; the two rankings are fused with reciprocal
+               rank fusion (RRF), so exact terms (names, figures) and paraphrases both count
+    select  -> KB_SELECTION picks KB_TOP_K chunks from the fused list:
+                 mmr        maximal marginal relevance, trading relevance for diversity (KB_MMR_LAMBDA)
+                 threshold  fused order, dropping chunks less similar to the query than KB_SCORE_THRESHOLD
+                 top        fused order
+    expand  -> every selected chunk is merged with its KB_NEIGHBOR_WINDOW neighbors of the
+               same source (by `chunk_index`), and overlapping runs become one passage;
+               a chunk whose (source, chunk_index) is shared by another chunk is kept alone
+    budget  -> passages are returned best first until KB_TOKEN_BUDGET is spent
+
+so an agent gets a few coherent passages from one tool call instead of one 300-character
+chunk per call.
+
+The BM25 index is built from the chunks stored in Chroma when the index is opened;
+only their text and metadata are kept in memory, vectors stay in the store.
+"""
+
+import os
+import re
+import math
+import heapq
+from collections import defaultdict
+
+from utils.tokens import estimate_tokens
+from utils.tracing import span
+
+# --- Configuration ---
+KB_TOP_K = int(os.getenv("KB_TOP_K", "4"))
+KB_CANDIDATES = int(os.getenv("KB_CANDIDATES", "20"))  # Per retriever, before fusion
+KB_SELECTION = os.getenv("KB_SELECTION", "mmr")
+KB_MMR_LAMBDA = float(os.getenv("KB_MMR_LAMBDA", "0.6"))
+KB_SCORE_THRESHOLD = float(os.getenv("KB_SCORE_THRESHOLD", "0.3"))
+KB_NEIGHBOR_WINDOW = int(os.getenv("KB_NEIGHBOR_WINDOW", "1"))
+KB_TOKEN_BUDGET = int(os.getenv("KB_TOKEN_BUDGET", "800"))
+RRF_K = 60  # The usual RRF constant: damps the weight of the very first ranks
+
+SELECTIONS = ("mmr", "threshold", "top")
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> list:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of texts, with an inverted index for fast scoring."""
+
+    def __init__(self, texts: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(doc, term frequency)]
+        self.lengths = []
+        for doc, text in enumerate(texts):
+            counts = defaultdict(int)
+            for token in _tokenize(text):
+                counts[token] += 1
+            for term, tf in counts.items():
+                self.postings[term].append((doc, tf))
+            self.lengths.append(sum(counts.values()))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        total = len(self.lengths)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query: str, n: int) -> list:
+        """The `n` best (doc, score) pairs for `query`, best first. Docs sharing no term are left out."""
+        scores = defaultdict(float)
+        for term in set(_tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc] / (self.average_length or 1))
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(n, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = RRF_K) -> list:
+    """Fuses several best-first lists of ids into one list of (id, score), best first."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _unit_rows(vectors: list):
+    import numpy as np  # Loaded with Chroma anyway; kept out of the module import
+    matrix = np.asarray(vectors, dtype=float)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select(relevance: list, vectors: list, k: int, lambda_mult: float = KB_MMR_LAMBDA) -> list:
+    """
+    Maximal marginal relevance: greedily picks the candidate with the best trade-off
+    between its relevance and its similarity to those already picked.
+
+    Args:
+        relevance: Relevance of each candidate, in [0, 1].
+        vectors: Embedding of each candidate.
+        k: How many to pick.
+        lambda_mult: 1 ranks by relevance only, 0 by diversity only.
+
+    Returns:
+        Indices into the candidate list, in pick order.
+    """
+    if not relevance:
+        return []
+    unit = _unit_rows(vectors)
+    similarity = unit @ unit.T
+    picked = [max(range(len(relevance)), key=lambda i: relevance[i])]
+    while len(picked) < min(k, len(relevance)):
+        best, best_score = None, None
+        for i in range(len(relevance)):
+            if i in picked:
+                continue
+            score = lambda_mult * relevance[i] - (1 - lambda_mult) * max(similarity[i, j] for j in picked)
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        picked.append(best)
+    return picked
+
+
+def _join_overlapping(left: str, right: str) -> str:
+    """Joins consecutive chunks, dropping the text the splitter repeated between them."""
+    for size in range(min(len(left), len(right) // 2), 9, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return left + " " + right
+
+
+class HybridRetriever:
+    """BM25 + vector retrieval over the chunks of one index version. Read-only once built."""
+
+    def __init__(self, db, embeddings):
+        self.db = db
+        self.embeddings = embeddings
+        stored = db.get(include=["documents", "metadatas"])
+        self.ids = stored["ids"]
+        self.texts = stored["documents"]
+        self.metadatas = [metadata or {} for metadata in stored["metadatas"]]
+        self.row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.position = {}  # (source, chunk_index) -> row, for positions held by exactly one chunk
+        shared = set()
+        for row, metadata in enumerate(self.metadatas):
+            if "chunk_index" not in metadata:
+                continue
+            key = (metadata.get("source"), metadata["chunk_index"])
+            if key in self.position or key in shared:
+                # Stale or hand-made metadata: the neighbors of this position are unknown
+                self.position.pop(key, None)
+                shared.add(key)
+            else:
+                self.position[key] = row
+        self.bm25 = BM25Index(self.texts)
+
+    def close(self):
+        """Releases the vector store's client, so the index can be reopened fresh from disk."""
+        close = getattr(getattr(self.db, "_client", None), "close", None)
+        if close is not None:
+            close()
+
+    def _vector_rows(self, query_vector: list, n: int) -> list:
+        # Straight to the collection: the wrapper's Documents carry no ids, and metadata is not unique
+        found = self.db._collection.query(query_embeddings=[query_vector], n_results=min(n, len(self.ids)),
+                                          include=[])
+        return [self.row_of[doc_id] for doc_id in found["ids"][0] if doc_id in self.row_of]
+
+    def _index(self, row: int):
+        """The chunk_index of `row`, or None when its neighbors cannot be told apart."""
+        metadata = self.metadatas[row]
+        index = metadata.get("chunk_index")
+        if index is None or self.position.get((metadata.get("source"), index)) != row:
+            return None
+        return index
+
+    def _vectors(self, rows: list) -> dict:
+        stored = self.db.get(ids=[self.ids[row] for row in rows], include=["embeddings"])
+        by_id = dict(zip(stored["ids"], stored["embeddings"]))
+        return {row: by_id[self.ids[row]] for row in rows if self.ids[row] in by_id}
+
+    def _select(self, fused: list, query_vector: list, k: int, selection: str) -> list:
+        if selection == "top":
+            return [row for row, _ in fused[:k]]
+        vectors = self._vectors([row for row, _ in fused])
+        fused = [(row, score) for row, score in fused if row in vectors]
+        if not fused:
+            return []
+        if selection == "threshold":
+            similarity = _unit_rows([vectors[row] for row, _ in fused]) @ _unit_rows([query_vector])[0]
+            return [row for (row, _), sim in zip(fused, similarity) if sim >= KB_SCORE_THRESHOLD][:k]
+        top = fused[0][1]
+        picked = mmr_select([score / top for _, score in fused], [vectors[row] for row, _ in fused], k)
+        return [fused[i][0] for i in picked]
+
+    def _passages(self, rows: list, window: int) -> list:
+        """Expands the selected rows with their neighbors and merges each contiguous run into one passage."""
+        rank = {}  # row -> rank of the selected chunk that brought it in
+        for order, row in enumerate(rows):
+            source, index = self.metadatas[row].get("source"), self._index(row)
+            if index is None:
+                rank.setdefault(row, order)
+                continue
+            for offset in range(-window, window + 1):
+                neighbor = self.position.get((source, index + offset))
+                if neighbor is not None:
+                    rank.setdefault(neighbor, order)
+
+        runs = []  # [best rank, source, last chunk_index, text]
+        ordered = sorted(rank, key=lambda row: (str(self.metadatas[row].get("source")),
+                                                self.metadatas[row].get("chunk_index", -1), row))
+        for row in ordered:
+            source, index = self.metadatas[row].get("source"), self._index(row)
+            last = runs[-1] if runs else None
+            if last and index is not None and last[1] == source and last[2] == index - 1:
+                last[0] = min(last[0], rank[row])
+                last[2] = index
+                last[3] = _join_overlapping(last[3], self.texts[row])
+            else:
+                runs.append([rank[row], source, index, self.texts[row]])
+        return [text for _, _, _, text in sorted(runs, key=lambda run: run[0])]
+
+    def search(self, query: str, k: int = KB_TOP_K, selection: str = KB_SELECTION,
+               window: int = KB_NEIGHBOR_WINDOW, token_budget: int = KB_TOKEN_BUDGET) -> list:
+        """
+        Finds the passages of the knowledge base most relevant to `query`.
+
+        Args:
+            query: The search query.
+            k: Chunks selected before neighbor expansion.
+            selection: One of SELECTIONS.
+            window: Neighbors merged on each side of a selected chunk (0: none).
+            token_budget: Maximum estimated tokens returned; the best passage is cut to fit.
+
+        Returns:
+            Passages, best first.
+        """
+        if selection not in SELECTIONS:
+            raise ValueError(f"Unknown selection '{selection}'. Use one of: {', '.join(SELECTIONS)}.")
+        if not self.ids:
+            return []
+
+        with span("hybrid_recall") as attrs:
+            query_vector = self.embeddings.embed_query(query)
+            vector_rows = self._vector_rows(query_vector, KB_CANDIDATES)
+            keyword_rows = [row for row, _ in self.bm25.search(query, KB_CANDIDATES)]
+            fused = reciprocal_rank_fusion([vector_rows, keyword_rows])
+            attrs["candidates"] = len(fused)
+
+        passages, used = [], 0
+        for passage in self._passages(self._select(fused, query_vector, k, selection), window):
+            tokens = estimate_tokens(passage)
+            if used + tokens > token_budget:
+                if not passages:
+                    passages.append(passage[:max(0, token_budget) * 4])
+                break
+            passages.append(passage)
+            used += tokens
+        return passages
@@ -1,9 +1,67 @@
 import os
 from dotenv import load_dotenv
 load_dotenv()
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.tools import tool
 
+from utils.cache import TTLCache, normalize_query
+from utils.console import log
+from utils.tracing import span
+from utils.ratelimit import get_limiter
+
+# One Tavily client per process, reused across calls so its HTTP session stays warm.
+_tavily_search = None
+
+# Results are shared by every agent and debate in the process. Identical concurrent
+# queries are coalesced into a single request.
+_search_cache = TTLCache(
+    "web_search",
+    max_entries=int(os.getenv("WEB_SEARCH_CACHE_SIZE", "512")),
+    ttl_seconds=float(os.getenv("WEB_SEARCH_CACHE_TTL", "900")),
+)
+
+def _get_search_client():
+    global _tavily_search
+    if _tavily_search is None:
+        # langchain_community is slow to import; only pay for it on the first real search
+        from langchain_community.tools.tavily_search import TavilySearchResults
+        _tavily_search = TavilySearchResults(
+            max_results=1
+        )
+    return _tavily_search
+
+def _request(client, query: str):
+    wrapper = getattr(client, "api_wrapper", None)
+    if wrapper is None:
+        return client.invoke(query)
+    # TavilySearchResults.invoke turns every exception into a repr() string, so quota and
+    # network errors would never reach the limiter: call its API wrapper directly instead
+    raw_results = wrapper.raw_results(
+        query,
+        client.max_results,
+        client.search_depth,
+        client.include_domains,
+        client.exclude_domains,
+        client.include_answer,
+        client.include_raw_content,
+        client.include_images,
+    )
+    return wrapper.clean_results(raw_results["results"])
+
+def _search(query: str):
+    # Only real requests go through the limiter (rate limit, retries, breaker), not cache hits
+    return get_limiter("search").call(_request, _get_search_client(), query)
+
+def _is_results(results) -> bool:
+    # Results are a list; a client that reports a failure in-band (TavilySearchResults.invoke
+    # returns repr(error)) must not have it cached and served to every agent for the TTL
+    return isinstance(results, list)
+
+def set_search_client(client):
+    """Replaces the search client (anything with `.invoke(query)`), e.g. a fake for benchmarks."""
+    global _tavily_search
+    _tavily_search = client
+    _search_cache.clear()
+
 @tool
 def web_search(query: str) -> str:
     """
@@ -16,13 +74,15 @@ def web_search(query: str) -> str:
     Args:
         query: The specific search query or question to look up.
     """
-    print(f"\033[32mPerforming web search for: {query}\033[0m")
-    
-    tavil_search = TavilySearchResults(
-        max_results=1
-    )
+    log(f"\033[32mPerforming web search for: {query}\033[0m")
     
-    results= tavil_search.invoke(query)
+    key = normalize_query(query)
+    try:
+        with span("web_search", cache="hit" if key in _search_cache else "miss"):
+            results = _search_cache.get_or_compute(key, lambda: _search(query), cacheable=_is_results)
+    except Exception as e:
+        # Failures are not cached; the agent carries on without this search
+        return f"Web search unavailable: {e!r}"
     return results
 
 if __name__ == "__main__":
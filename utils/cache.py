@@ -0,0 +1,188 @@
+# /utils/cache.py
+
+import re
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Every cache registers itself here so its metrics can be exposed in one place.
+_registry = {}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a free-text query into a cache key: case-folded, whitespace collapsed
+    and trailing punctuation dropped, so "AI drones?" and "ai  drones" share one entry.
+    """
+    return _WHITESPACE.sub(" ", str(query).casefold()).strip().rstrip("?!.").strip()
+
+
+class TTLCache:
+    """
+    Thread-safe TTL + LRU cache with in-flight request coalescing.
+
+    `get_or_compute` returns a fresh cached value when there is one. Otherwise the first
+    caller computes it while concurrent callers asking for the same key wait for that
+    result instead of issuing their own call. Failures are never cached.
+    `aget_or_compute` does the same for coroutines, without blocking the event loop.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: float = 600):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value, compute_seconds)
+        self._inflight = {}            # key -> Future shared by coalesced callers
+        self._ainflight = {}           # key -> asyncio.Task shared by coalesced coroutines
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0, "evictions": 0, "saved_seconds": 0.0}
+        _registry[name] = self
+
+    _MISSING = object()
+
+    def _lookup_locked(self, key):
+        """Returns a fresh cached value (counting the hit) or _MISSING. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return self._MISSING
+        expires_at, value, compute_seconds = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return self._MISSING
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        self._stats["saved_seconds"] += compute_seconds
+        return value
+
+    def _store_locked(self, key, value, compute_seconds: float = 0.0):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, compute_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, key, default=None):
+        """Returns the fresh cached value for `key`, or `default`."""
+        with self._lock:
+            value = self._lookup_locked(key)
+        return default if value is self._MISSING else value
+
+    def put(self, key, value):
+        """Stores `value` under `key`, replacing any previous entry."""
+        with self._lock:
+            self._store_locked(key, value)
+
+    def __contains__(self, key) -> bool:
+        """True if `key` has a fresh entry. Does not count as a hit."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        """
+        Returns the cached value for `key`, computing it with `compute()` on a miss.
+
+        Args:
+            key: A hashable cache key (normalize free text with `normalize_query`).
+            compute: Zero-argument callable producing the value.
+            cacheable: Optional predicate; values it rejects are returned but not stored.
+        """
+        with self._lock:
+            value = self._lookup_locked(key)
+            if value is not self._MISSING:
+                return value
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            return future.result()  # Re-raises the leader's exception, if any
+
+        start = time.perf_counter()
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._stats["errors"] += 1
+            future.set_exception(e)
+            raise
+        compute_seconds = time.perf_counter() - start
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if cacheable is None or cacheable(value):
+                self._store_locked(key, value, compute_seconds)
+        future.set_result(value)
+        return value
+
+    async def aget_or_compute(self, key, acompute, cacheable=None):
+        """
+        Async version of `get_or_compute`: concurrent coroutines asking for the same key
+        await one shared task.
+
+        Args:
+            key: A hashable cache key.
+            acompute: Zero-argument coroutine function producing the value.
+            cacheable: Optional predicate; values it rejects are returned but not stored.
+        """
+        with self._lock:
+            value = self._lookup_locked(key)
+            if value is not self._MISSING:
+                return value
+
+            task = self._ainflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._acompute_and_store(key, acompute, cacheable))
+                self._ainflight[key] = task
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        # Shielded so one cancelled waiter does not cancel the call the others are awaiting
+        return await asyncio.shield(task)
+
+    async def _acompute_and_store(self, key, acompute, cacheable):
+        start = time.perf_counter()
+        try:
+            value = await acompute()
+        except BaseException:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._ainflight.pop(key, None)
+        if cacheable is None or cacheable(value):
+            with self._lock:
+                self._store_locked(key, value, time.perf_counter() - start)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / lookups, 4) if lookups else 0.0
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        return stats
+
+
+def cache_stats() -> dict:
+    """Returns the metrics of every registered cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
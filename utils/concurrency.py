@@ -0,0 +1,51 @@
+# /utils/concurrency.py
+
+import os
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Upper bound on the number of blocking calls (sync LangChain executors, SDK clients)
+# that may run at the same time. Keeping this bounded stops a burst of debates from
+# spawning an unbounded number of threads.
+SYNC_POOL_SIZE = int(os.getenv("DEBATE_SYNC_WORKERS", "16"))
+
+_sync_pool = None
+
+
+def _get_sync_pool() -> ThreadPoolExecutor:
+    """Lazily creates the process-wide thread pool used for blocking calls."""
+    global _sync_pool
+    if _sync_pool is None:
+        _sync_pool = ThreadPoolExecutor(
+            max_workers=SYNC_POOL_SIZE,
+            thread_name_prefix="debate-sync"
+        )
+    return _sync_pool
+
+
+async def run_sync(func, *args, **kwargs):
+    """
+    Runs a blocking callable in the bounded thread pool and awaits its result,
+    so the event loop keeps serving other debates while it runs.
+
+    Args:
+        func: The synchronous callable to run.
+        *args, **kwargs: Arguments forwarded to the callable.
+
+    Returns:
+        Whatever the callable returns.
+    """
+    loop = asyncio.get_running_loop()
+    # Run inside a copy of the caller's context so the debate's trace follows the call
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_sync_pool(), functools.partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_sync_pool():
+    """Stops the thread pool. Safe to call when the pool was never created."""
+    global _sync_pool
+    if _sync_pool is not None:
+        _sync_pool.shutdown(wait=False)
+        _sync_pool = None
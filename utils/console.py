@@ -0,0 +1,20 @@
+# /utils/console.py
+
+import os
+import sys
+
+# Verbose console output (agent thoughts, tool calls, progress messages) is on by default
+# for local runs. Set DEBATE_VERBOSE=0 in production: printing on every turn costs time
+# and floods the logs.
+VERBOSE = os.getenv("DEBATE_VERBOSE", "1") != "0"
+
+
+def log(*args, **kwargs):
+    """Prints progress output when verbose logging is enabled."""
+    if VERBOSE:
+        print(*args, **kwargs)
+
+
+def warn(*args, **kwargs):
+    """Prints a warning to stderr, whatever the verbosity."""
+    print(*args, file=sys.stderr, **kwargs)
@@ -0,0 +1,132 @@
+# /utils/history.py
+
+import os
+import re
+
+from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.output_parsers import StrOutputParser
+
+from utils.prompts import history_summary_template
+from utils.console import warn
+from utils.tokens import estimate_tokens
+from utils.tracing import span, tracing_config
+
+# --- Defaults ---
+HISTORY_TURNS = int(os.getenv("DEBATE_HISTORY_TURNS", "6"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("DEBATE_HISTORY_TOKEN_BUDGET", "3000"))
+# Summaries may use at most this share of the token budget
+SUMMARY_BUDGET_SHARE = 0.35
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _format_turn(message) -> str:
+    name = getattr(message, "name", None) or "Moderator"
+    return f"{name}: {message.content}"
+
+
+class ConversationHistory:
+    """
+    Bounded debate history. At least the last `keep_last_turns` turns are kept verbatim;
+    older turns are folded into a running summary that is updated incrementally, so the
+    context sent to each agent stays under `token_budget` however long the debate runs.
+    Turns are folded in batches rather than one per turn, which keeps summarizer calls
+    rare and the context prefix stable between folds.
+
+    Only what agents can still receive is kept: `context()`. The full debate is recorded
+    separately, as a compact Transcript (utils/transcript.py).
+    """
+
+    def __init__(self, opening: str, keep_last_turns: int = HISTORY_TURNS,
+                 token_budget: int = HISTORY_TOKEN_BUDGET, summarizer=None):
+        """
+        Args:
+            opening: The moderator's opening message, always kept.
+            keep_last_turns: Turns kept verbatim at the end of the context.
+            token_budget: Maximum estimated tokens of the context sent to an agent.
+            summarizer: A runnable taking {summary, turns, max_words} and returning text.
+                When None, older turns are folded extractively (first sentence of each).
+        """
+        self.opening = HumanMessage(content=opening)
+        self.keep_last_turns = max(1, keep_last_turns)
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary = ""
+        self._recent = []  # Turns not folded into the summary yet
+
+    def append(self, message: AIMessage):
+        self._recent.append(message)
+
+    @property
+    def _fold_batch(self) -> int:
+        return max(1, self.keep_last_turns // 2)
+
+    @property
+    def _summary_budget(self) -> int:
+        return int(self.token_budget * SUMMARY_BUDGET_SHARE)
+
+    def _summary_message(self):
+        if not self.summary:
+            return None
+        return HumanMessage(content=f"Moderator's summary of the earlier turns:\n{self.summary}")
+
+    def context(self) -> list:
+        """Returns the messages to send as `chat_history`: opening, summary, recent turns."""
+        summary_message = self._summary_message()
+        return [self.opening] + ([summary_message] if summary_message else []) + list(self._recent)
+
+    def context_tokens(self) -> int:
+        return sum(estimate_tokens(message.content) for message in self.context())
+
+    def _turns_to_fold(self) -> int:
+        """How many of the oldest recent turns must be folded to respect both limits."""
+        overflow = len(self._recent) - self.keep_last_turns
+        fold = overflow if overflow >= self._fold_batch else 0
+        fixed = estimate_tokens(self.opening.content) + self._summary_budget
+        # Keep at least the newest turn verbatim
+        while fold < len(self._recent) - 1 and (
+            fixed + sum(estimate_tokens(m.content) for m in self._recent[fold:]) > self.token_budget
+        ):
+            fold += 1
+        return fold
+
+    def _extractive_summary(self, turns: list) -> str:
+        lines = [self.summary] if self.summary else []
+        for message in turns:
+            first_sentence = _SENTENCE_END.split(message.content.strip(), maxsplit=1)[0]
+            lines.append(f"- {getattr(message, 'name', None) or 'Moderator'}: {first_sentence}")
+        return "\n".join(lines)
+
+    def _fit_summary(self, summary: str) -> str:
+        max_chars = self._summary_budget * 4
+        if len(summary) <= max_chars:
+            return summary
+        # Keep the newest part of an oversized summary
+        return "..." + summary[-max_chars:]
+
+    async def acompact(self):
+        """Folds turns that fall outside the verbatim window or the token budget into the summary."""
+        fold = self._turns_to_fold()
+        if fold == 0:
+            return
+        turns, self._recent = self._recent[:fold], self._recent[fold:]
+
+        summary = None
+        with span("history_summary", turns=len(turns)):
+            if self.summarizer is not None:
+                try:
+                    summary = await self.summarizer.ainvoke({
+                        "summary": self.summary or "(none yet)",
+                        "turns": "\n".join(_format_turn(m) for m in turns),
+                        "max_words": max(50, self._summary_budget * 3 // 4),
+                    }, config=tracing_config())
+                except Exception as e:
+                    warn(f"History summarization failed, falling back to extractive summary: {e}")
+            if not summary:
+                summary = self._extractive_summary(turns)
+        self.summary = self._fit_summary(summary.strip())
+
+
+def build_llm_summarizer(llm):
+    """Returns the summary chain used to fold older turns with `llm`, a chat model."""
+    return history_summary_template | llm | StrOutputParser()
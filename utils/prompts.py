@@ -48,17 +48,13 @@ debator_template = ChatPromptTemplate.from_messages([
     MessagesPlaceholder(variable_name="agent_scratchpad")
 ])
 
-# Alternative version with separate chat_history placeholder (if needed for agent framework)
-debator_agent_with_tools_template = ChatPromptTemplate.from_messages([
-    (
-        "system",
-        """You are a world-class debater participating in a discussion.
+# Rules shared by every debater, with no template variables: as the first part of the
+# prompt they form a prefix that is byte-identical across agents, turns and debates, which
+# is what provider-side prefix (context) caching reuses.
+DEBATER_RULES = """You are a world-class debater participating in a discussion.
         You are a human expert on the topic, and you must argue from your assigned perspective.
         You have access to a web search tool to find current facts and data to strengthen your arguments.
 
-        **Your Assigned Stance:** {stance}
-        **Debate Topic:** {topic}
-
         **Your Goal:** Persuasively argue your case, counter opposing points, and convince the audience of your position.
         Use the `web_search` tool when you need specific, up-to-date information to strengthen your arguments.
 
@@ -77,6 +73,18 @@ debator_agent_with_tools_template = ChatPromptTemplate.from_messages([
         **RESPONSE LENGTH LIMIT:** Keep your response concise and impactful. Your argument must be no longer than 300 characters (approximately 2-3 sentences). Be direct and powerful.
         
         Your final response must be your argument ONLY, without any of your instructions, preamble, or notes about tool usage."""
+
+# The prompt used by the debater executor, ordered from most to least stable so that each
+# request shares the longest possible prefix with the previous one:
+#   rules (every request) -> persona (every turn of this agent) -> history (append-only
+#   between summary folds) -> the turn's input and tool calls (the only new part)
+debator_agent_with_tools_template = ChatPromptTemplate.from_messages([
+    ("system", DEBATER_RULES),
+    # Consecutive system messages are sent together as the system instruction
+    (
+        "system",
+        """**Your Assigned Stance:** {stance}
+        **Debate Topic:** {topic}"""
     ),
     # This placeholder will be filled with the conversation history (if using agent framework)
     MessagesPlaceholder(variable_name="chat_history"),
@@ -84,4 +92,23 @@ debator_agent_with_tools_template = ChatPromptTemplate.from_messages([
     ("user", "{input}"),
     # This placeholder is crucial for the agent's reasoning process and tool calls
     MessagesPlaceholder(variable_name="agent_scratchpad")
-])
\ No newline at end of file
+])
+
+# Used by utils/history.py to fold older debate turns into a running summary
+history_summary_template = PromptTemplate(
+    template="""
+    You are the debate Moderator keeping notes on a long debate.
+    Update the running summary with the new turns below. Keep every distinct argument, claim,
+    statistic and source, attributed to the agent who made it. Drop repetition and rhetoric.
+    The updated summary must stay under {max_words} words.
+
+    Current summary:
+    {summary}
+
+    New turns:
+    {turns}
+
+    Updated summary:
+    """,
+    input_variables=["summary", "turns", "max_words"],
+)
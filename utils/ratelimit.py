@@ -0,0 +1,525 @@
+# /utils/ratelimit.py
+"""
+Process-wide client-side limits, retries and circuit breakers for the paid APIs.
+
+Every debate in the process (API streams, batch workers) goes through the same
+limiter per provider, so running more debates at once never pushes the request or
+token rate above the configured limits:
+
+    llm        -> every chat model call (orchestrator, debaters, history summarizer)
+    search     -> every Tavily request (cache hits are free)
+    embedding  -> every call to a remote embedding API (cache hits are free)
+
+Each call is retried on quota, overload and network errors, with jittered
+exponential backoff. Every retry waits for the limiter again, so retries never
+exceed the limits either. Quota errors also halve the provider's request rate, which
+then recovers gradually on success. Without a configured rate, a quota error sets the
+limit to the rate observed over the previous second; that discovered limit is lifted
+again after DISCOVERED_LIMIT_SECONDS without another quota error, so one stray 429
+under light traffic does not cap the process for good. Other failures (outages,
+timeouts) count towards the circuit breaker: after `BREAKER_FAILURES` in a row, calls
+fail fast for `BREAKER_COOLDOWN_SECONDS` instead of piling up retries.
+
+A rate or budget of 0 means unlimited.
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import RunnableBinding
+
+from utils.console import warn
+
+# --- Configuration ---
+LLM_REQUESTS_PER_SECOND = float(os.getenv("DEBATE_LLM_RPS", "0"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("DEBATE_LLM_TPM", "0"))
+SEARCH_REQUESTS_PER_SECOND = float(os.getenv("DEBATE_SEARCH_RPS", "0"))
+EMBEDDING_REQUESTS_PER_SECOND = float(os.getenv("DEBATE_EMBEDDING_RPS", "0"))
+RETRY_ATTEMPTS = int(os.getenv("DEBATE_RETRY_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = float(os.getenv("DEBATE_RETRY_BASE_SECONDS", "1.0"))
+RETRY_MAX_SECONDS = float(os.getenv("DEBATE_RETRY_MAX_SECONDS", "30"))
+BREAKER_FAILURES = int(os.getenv("DEBATE_BREAKER_FAILURES", "8"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("DEBATE_BREAKER_COOLDOWN_SECONDS", "30"))
+DISCOVERED_LIMIT_SECONDS = float(os.getenv("DEBATE_DISCOVERED_LIMIT_SECONDS", "60"))
+
+# Adaptive rate: quota errors multiply the rate by this factor, never going below
+# MIN_RATE_SHARE of the configured limit; each success adds back RECOVERY_SHARE of it.
+BACKOFF_FACTOR = 0.5
+MIN_RATE_SHARE = 0.1
+RECOVERY_SHARE = 0.05
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+_RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "RateLimitError", "Timeout", "ReadTimeout", "ConnectTimeout",
+    "ConnectionError",
+}
+_QUOTA_ERRORS = {"ResourceExhausted", "TooManyRequests", "RateLimitError"}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is unavailable after repeated failures; retry in {retry_after:.0f}s.")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def _status_code(error: Exception):
+    for candidate in (getattr(error, "code", None), getattr(error, "status_code", None),
+                      getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Quota, overload, timeout and connection errors are worth retrying; others are not."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in _RETRYABLE_ERRORS:
+        return True
+    return _status_code(error) in _RETRYABLE_STATUS
+
+
+def is_quota_error(error: Exception) -> bool:
+    return type(error).__name__ in _QUOTA_ERRORS or _status_code(error) == 429
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket usable from sync and async code. `limit` is the configured
+    rate (units per second); `rate` is the current one, lowered by `backoff()` on quota
+    errors and raised back by `recover()`. Without a configured rate, `limit` may be one
+    discovered from a quota error; it expires DISCOVERED_LIMIT_SECONDS after the last one.
+    """
+
+    def __init__(self, name: str, limit: float = 0.0, burst: float = None):
+        self.name = name
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=4096)  # Acquisition times, to discover a limit when none is set
+        self.stats = {"acquired": 0, "waited": 0, "wait_seconds": 0.0}
+        self.configure(limit, burst)
+
+    def configure(self, limit: float, burst: float = None):
+        """
+        Changes the limit in place; everyone holding this bucket sees the new rate.
+
+        Args:
+            limit: Sustained rate in units per second. 0 or less disables the limit.
+            burst: Units allowed back to back after an idle period (default: one second's worth).
+        """
+        with self._lock:
+            self.limit = max(0.0, limit)
+            self.rate = self.limit
+            self.burst = burst or max(1.0, self.limit)
+            self._tokens = self.burst
+            self._updated = time.monotonic()
+            self._discovered_until = None  # Set while `limit` is a discovered one
+
+    def _expire_discovered_locked(self):
+        if self._discovered_until is not None and time.monotonic() >= self._discovered_until:
+            self.limit = self.rate = 0.0
+            self._discovered_until = None
+
+    def _refill_locked(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, cost: float) -> float:
+        """Takes `cost` units if available. Returns 0, or the seconds until they will be."""
+        with self._lock:
+            self._expire_discovered_locked()
+            if self.limit <= 0:
+                self.stats["acquired"] += 1
+                self._recent.append(time.monotonic())
+                return 0.0
+            self._refill_locked()
+            if self._tokens >= cost:
+                self._tokens -= cost
+                self.stats["acquired"] += 1
+                return 0.0
+            return (cost - self._tokens) / self.rate
+
+    def _record_wait(self, seconds: float):
+        if seconds > 0.001:
+            with self._lock:
+                self.stats["waited"] += 1
+                self.stats["wait_seconds"] += seconds
+
+    def acquire(self, cost: float = 1.0, blocking: bool = True) -> bool:
+        """Waits until `cost` units are available and takes them. A cost of 0 just waits out any debt."""
+        start = time.monotonic()
+        wait = self._take(cost)
+        while wait:
+            if not blocking:
+                return False
+            time.sleep(wait)
+            wait = self._take(cost)
+        self._record_wait(time.monotonic() - start)
+        return True
+
+    async def aacquire(self, cost: float = 1.0, blocking: bool = True) -> bool:
+        start = time.monotonic()
+        wait = self._take(cost)
+        while wait:
+            if not blocking:
+                return False
+            await asyncio.sleep(wait)
+            wait = self._take(cost)
+        self._record_wait(time.monotonic() - start)
+        return True
+
+    def charge(self, amount: float):
+        """Takes `amount` units after the fact; the bucket may go into debt."""
+        with self._lock:
+            if self.limit > 0:
+                self._refill_locked()
+                self._tokens -= amount
+
+    def backoff(self):
+        with self._lock:
+            self._expire_discovered_locked()
+            now = time.monotonic()
+            if self.limit <= 0:
+                # No limit configured: adopt the rate that just hit the provider's quota
+                observed = sum(1 for t in self._recent if now - t < 1.0)
+                self.limit = self.rate = self.burst = max(1.0, float(observed))
+                self._tokens, self._updated = 0.0, now
+                warn(f"{self.name} hit a quota; limiting it to {self.limit:.0f} requests/s "
+                     f"for {DISCOVERED_LIMIT_SECONDS:.0f}s.")
+                self._discovered_until = now + DISCOVERED_LIMIT_SECONDS
+            elif self._discovered_until is not None:
+                # Every further quota error keeps the discovered limit for another period
+                self._discovered_until = now + DISCOVERED_LIMIT_SECONDS
+            self._refill_locked()
+            self.rate = max(self.limit * MIN_RATE_SHARE, self.rate * BACKOFF_FACTOR)
+
+    def recover(self):
+        with self._lock:
+            if self.limit > 0 and self.rate < self.limit:
+                self._refill_locked()
+                self.rate = min(self.limit, self.rate + self.limit * RECOVERY_SHARE)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. While open, calls are rejected
+    until `cooldown_seconds` have passed; then a single probe call is let through, and
+    its outcome closes or re-opens the circuit. A probe that ends without an outcome
+    (cancelled, e.g. by a turn budget) is released by `end_probe`, so the next call probes.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURES,
+                 cooldown_seconds: float = BREAKER_COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe = None  # Token of the probe in flight while half open
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Raises CircuitOpenError if the call must not be made now. Returns a token if this
+        call is the half-open probe, else None; pass it to `end_probe` when the call is over.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return None
+            retry_after = self._opened_at + self.cooldown_seconds - time.monotonic()
+            if self.state == "open" and retry_after <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and self._probe is None:
+                self._probes += 1
+                self._probe = self._probes
+                return self._probe
+            raise CircuitOpenError(self.name, max(0.0, retry_after))
+
+    def end_probe(self, probe):
+        """Releases `probe` if its outcome was never recorded, so the next call can probe again."""
+        if probe is None:
+            return
+        with self._lock:
+            if self._probe == probe:
+                self._probe = None
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._probe = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    warn(f"Circuit for {self.name} opened after {self._failures} consecutive failures.")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probe = None
+
+
+class ProviderLimiter:
+    """Request and token budgets, retries and a circuit breaker for one provider."""
+
+    def __init__(self, name: str, requests_per_second: float = 0.0, tokens_per_minute: float = 0.0,
+                 attempts: int = RETRY_ATTEMPTS):
+        self.name = name
+        self.attempts = max(1, attempts)
+        self.requests = TokenBucket(name, requests_per_second)
+        self.tokens = TokenBucket(f"{name}_tokens", tokens_per_minute / 60, burst=tokens_per_minute or None)
+        self.breaker = CircuitBreaker(name)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "quota_errors": 0}
+
+    def configure(self, requests_per_second: float = None, tokens_per_minute: float = None):
+        """Changes the request rate and/or the token budget per minute (0: unlimited)."""
+        if requests_per_second is not None:
+            self.requests.configure(requests_per_second)
+        if tokens_per_minute is not None:
+            self.tokens.configure(tokens_per_minute / 60, burst=tokens_per_minute or None)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # "Full jitter": spreads the retries of concurrent callers instead of syncing them up
+        return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+    def _on_success(self):
+        self.breaker.record_success()
+        self.requests.recover()
+
+    def _on_error(self, error: Exception, attempt: int):
+        """Returns the delay before the next attempt, or None if the error must be raised."""
+        if not is_retryable(error):
+            # The provider answered; the request itself was bad
+            self.breaker.record_success()
+            return None
+        self._count("failures")
+        if is_quota_error(error):
+            # The provider is up but we are too fast: slow down, and count it as reachable
+            self._count("quota_errors")
+            self.requests.backoff()
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        if attempt + 1 >= self.attempts:
+            return None
+        delay = self._backoff_delay(attempt)
+        self._count("retries")
+        warn(f"{self.name} call failed ({type(error).__name__}: {error}); retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    def _wait_for_budgets(self):
+        self.requests.acquire()
+        self.tokens.acquire(cost=0)
+
+    async def _await_budgets(self):
+        await self.requests.aacquire()
+        await self.tokens.aacquire(cost=0)
+
+    # Every attempt ends its breaker probe (if it is one) in `finally`: an outcome is
+    # normally recorded first, but a cancelled attempt must not hold the probe forever.
+    def call(self, func, *args, **kwargs):
+        """Calls `func` within the limits, retrying transient failures."""
+        self._count("calls")
+        for attempt in range(self.attempts):
+            probe = self.breaker.before_call()
+            try:
+                self._wait_for_budgets()
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            else:
+                self._on_success()
+                return result
+            finally:
+                self.breaker.end_probe(probe)
+
+    async def acall(self, afunc, *args, **kwargs):
+        """Awaits `afunc` within the limits, retrying transient failures."""
+        self._count("calls")
+        for attempt in range(self.attempts):
+            probe = self.breaker.before_call()
+            try:
+                await self._await_budgets()
+                result = await afunc(*args, **kwargs)
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            else:
+                self._on_success()
+                return result
+            finally:
+                self.breaker.end_probe(probe)
+
+    def stream(self, func, *args, **kwargs):
+        """Yields from the generator `func` returns. Retries are only possible until its first item."""
+        self._count("calls")
+        for attempt in range(self.attempts):
+            probe = self.breaker.before_call()
+            try:
+                self._wait_for_budgets()
+                iterator = func(*args, **kwargs)
+                first = next(iterator)
+            except StopIteration:
+                self._on_success()
+                return
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            else:
+                self._on_success()
+            finally:
+                self.breaker.end_probe(probe)
+            yield first
+            yield from iterator
+            return
+
+    async def astream(self, func, *args, **kwargs):
+        """Async version of `stream` for async generators."""
+        self._count("calls")
+        for attempt in range(self.attempts):
+            probe = self.breaker.before_call()
+            try:
+                await self._await_budgets()
+                iterator = func(*args, **kwargs)
+                first = await iterator.__anext__()
+            except StopAsyncIteration:
+                self._on_success()
+                return
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            else:
+                self._on_success()
+            finally:
+                self.breaker.end_probe(probe)
+            yield first
+            async for item in iterator:
+                yield item
+            return
+
+    def charge_tokens(self, tokens: int):
+        """Counts tokens used by a finished call against the token budget."""
+        if tokens:
+            self.tokens.charge(tokens)
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update({
+            "requests_per_second": self.requests.limit,
+            "current_requests_per_second": round(self.requests.rate, 3),
+            "tokens_per_minute": self.tokens.limit * 60,
+            "request_waits": self.requests.stats["waited"],
+            "token_waits": self.tokens.stats["waited"],
+            "wait_seconds": round(self.requests.stats["wait_seconds"] + self.tokens.stats["wait_seconds"], 3),
+            "circuit": self.breaker.state,
+        })
+        return stats
+
+
+_limiters = {
+    "llm": ProviderLimiter("llm", LLM_REQUESTS_PER_SECOND, LLM_TOKENS_PER_MINUTE),
+    "search": ProviderLimiter("search", SEARCH_REQUESTS_PER_SECOND),
+    "embedding": ProviderLimiter("embedding", EMBEDDING_REQUESTS_PER_SECOND),
+}
+
+
+def get_limiter(name: str) -> ProviderLimiter:
+    """Returns the shared limiter of a provider ('llm', 'search' or 'embedding')."""
+    return _limiters[name]
+
+
+def limiter_stats() -> dict:
+    """Limits, waits, retries and circuit state of every provider, keyed by name."""
+    return {name: limiter.report() for name, limiter in _limiters.items()}
+
+
+def _usage_tokens(message) -> int:
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """
+    Wraps a chat model so every call goes through a provider limiter: request and token
+    budgets, retries with backoff and the circuit breaker. Works with any inner chat
+    model, including tool binding.
+    """
+
+    inner: BaseChatModel
+    provider: str = "llm"
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _limiter(self) -> ProviderLimiter:
+        return get_limiter(self.provider)
+
+    def bind_tools(self, tools, **kwargs):
+        # Let the inner model format the tools, then bind the same arguments to the wrapper
+        bound = self.inner.bind_tools(tools, **kwargs)
+        if isinstance(bound, RunnableBinding):
+            return self.bind(**bound.kwargs)
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        result = self._limiter.call(self.inner._generate, messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._limiter.charge_tokens(sum(_usage_tokens(g.message) for g in result.generations))
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        result = await self._limiter.acall(self.inner._agenerate, messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._limiter.charge_tokens(sum(_usage_tokens(g.message) for g in result.generations))
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = 0
+        try:
+            for chunk in self._limiter.stream(self.inner._stream, messages, stop=stop, run_manager=run_manager, **kwargs):
+                tokens += _usage_tokens(chunk.message)
+                yield chunk
+        finally:
+            self._limiter.charge_tokens(tokens)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = 0
+        try:
+            async for chunk in self._limiter.astream(self.inner._astream, messages, stop=stop, run_manager=run_manager, **kwargs):
+                tokens += _usage_tokens(chunk.message)
+                yield chunk
+        finally:
+            self._limiter.charge_tokens(tokens)
@@ -0,0 +1,375 @@
+# /utils/sessions.py
+"""
+Durable debate sessions.
+
+Every debate started through the API gets an id and runs in its own background task,
+independent of the HTTP connection that started it. Each event it produces is
+numbered (1, 2, ...) and recorded in a local SQLite store, so a client can reconnect
+at any time and replay the events after the last one it saw, then follow the live
+debate. Reconnecting never re-runs a turn: it costs no LLM calls.
+
+Nothing here blocks the event loop. Writes are queued to one writer thread, which
+commits whatever has piled up in a single transaction. Reads run in the sync thread
+pool (utils/concurrency.py) and first wait for the writes queued before them, so they
+always see every event published before them. Token deltas
+('argument_delta') are only sent live: the 'argument' event that ends each turn
+carries the full text, so replays skip them and their sequence numbers.
+
+Several server processes (e.g. uvicorn workers) may share the store. Each debate
+records the process running it. When a process opens the store, running sessions whose
+process is gone are marked "interrupted", with a final error event so their replay ends
+cleanly. Sessions of processes that are still running are left alone.
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import socket
+import asyncio
+import sqlite3
+import threading
+
+from utils.console import warn
+from utils.concurrency import run_sync
+
+# --- Configuration ---
+SESSION_DB_PATH = os.getenv("DEBATE_SESSION_DB", os.path.join(".cache", "sessions.sqlite"))
+SESSION_RETENTION_DAYS = float(os.getenv("DEBATE_SESSION_RETENTION_DAYS", "7"))
+
+TRANSIENT_EVENTS = ('argument_delta',)  # Sent to live followers only, never stored
+_WRITE_BATCH = 1000  # Most statements committed in one transaction
+
+_store = None
+_live = {}  # debate id -> DebateSession running in this process
+
+
+def _process_owner() -> str:
+    """Identifies this process in the store: host and pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner: str) -> bool:
+    """False if `owner` is a process of this host that has exited. Other hosts' processes count as alive."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return bool(owner)
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, but belongs to another user
+    return True
+
+
+class SessionStore:
+    """
+    SQLite store of debates and their numbered events, safe to share between threads.
+
+    create/append/finish only queue their statement and return; a writer thread
+    applies them in order. Reads, mark_interrupted and prune block on the caller's
+    thread: from async code, call them through `run_sync`.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Durable enough for transcripts and much faster than a full sync per event
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS debates (
+                id TEXT PRIMARY KEY,
+                topic TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                debate_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                PRIMARY KEY (debate_id, seq)
+            );
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(debates)")]
+        if "owner" not in columns:  # Stores created before sessions recorded their process
+            self._conn.execute("ALTER TABLE debates ADD COLUMN owner TEXT")
+        self._conn.commit()
+        self.owner = _process_owner()
+        self._writes = queue.Queue()  # (sql, params), a flush marker (threading.Event), or None to stop
+        self._writer = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+        self._writer.start()
+
+    # --- Writes ---
+    def _write_loop(self):
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < _WRITE_BATCH:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            statements = [item for item in batch if isinstance(item, tuple)]
+            try:
+                with self._lock:
+                    self._apply_locked(statements)
+            finally:
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+            if None in batch:
+                return
+
+    def _apply_locked(self, statements: list):
+        """Commits `statements` in one transaction, or one by one if any of them fails."""
+        try:
+            for statement in statements:
+                self._conn.execute(*statement)
+            self._conn.commit()
+            return
+        except sqlite3.Error:
+            self._conn.rollback()
+        # One bad statement (e.g. a duplicate event number) must not cost the others their writes
+        for sql, params in statements:
+            try:
+                self._conn.execute(sql, params)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                warn(f"Session store: write dropped ({e}): {sql.split('(')[0].strip()}")
+
+    def flush(self):
+        """Waits until the writes queued before this call are committed (not the ones queued after)."""
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._writes.put(done)
+        done.wait()
+
+    def close(self):
+        """Commits the queued writes and stops the writer thread."""
+        if self._writer.is_alive():
+            self._writes.put(None)
+            self._writer.join()
+
+    def create(self, debate_id: str, topic: str, params: dict):
+        now = time.time()
+        self._writes.put((
+            "INSERT INTO debates (id, topic, params, status, created_at, updated_at, owner) "
+            "VALUES (?, ?, ?, 'running', ?, ?, ?)",
+            (debate_id, topic, json.dumps(params), now, now, self.owner),
+        ))
+
+    def append(self, debate_id: str, seq: int, event: dict):
+        self._writes.put((
+            "INSERT INTO events (debate_id, seq, event) VALUES (?, ?, ?)", (debate_id, seq, json.dumps(event)),
+        ))
+
+    def finish(self, debate_id: str, status: str):
+        self._writes.put((
+            "UPDATE debates SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), debate_id),
+        ))
+
+    # --- Reads ---
+    def get(self, debate_id: str) -> dict:
+        """The debate's row as a dict, or None if unknown."""
+        self.flush()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, topic, params, status, created_at, updated_at FROM debates WHERE id = ?", (debate_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "debate_id": row[0], "topic": row[1], "params": json.loads(row[2]),
+            "status": row[3], "created_at": row[4], "updated_at": row[5],
+        }
+
+    def events(self, debate_id: str, after: int = 0) -> list:
+        """The (seq, event) pairs of a debate numbered above `after`, in order."""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, event FROM events WHERE debate_id = ? AND seq > ? ORDER BY seq", (debate_id, after)
+            ).fetchall()
+        return [(seq, json.loads(event)) for seq, event in rows]
+
+    def mark_interrupted(self):
+        """
+        Closes the sessions that stopped processes left running. Call once at startup:
+        sessions recorded under this process's own id then belong to an earlier process
+        that had the same pid (e.g. a restarted container).
+        """
+        self.flush()
+        with self._lock:
+            rows = [
+                (debate_id, last_seq) for debate_id, last_seq, owner in self._conn.execute(
+                    "SELECT id, (SELECT COALESCE(MAX(seq), 0) FROM events WHERE debate_id = debates.id), owner "
+                    "FROM debates WHERE status = 'running'"
+                ).fetchall()
+                if owner == self.owner or not _owner_alive(owner)
+            ]
+            for debate_id, last_seq in rows:
+                self._conn.execute(
+                    "INSERT INTO events (debate_id, seq, event) VALUES (?, ?, ?)",
+                    (debate_id, last_seq + 1, json.dumps({'type': 'error', 'content': 'The debate was interrupted by a server restart.'})),
+                )
+                self._conn.execute(
+                    "UPDATE debates SET status = 'interrupted', updated_at = ? WHERE id = ?", (time.time(), debate_id)
+                )
+            self._conn.commit()
+        return len(rows)
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Deletes finished debates older than `max_age_seconds`. Returns how many."""
+        cutoff = time.time() - max_age_seconds
+        self.flush()
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM debates WHERE status != 'running' AND updated_at < ?", (cutoff,)
+            ).fetchall()]
+            for debate_id in ids:
+                self._conn.execute("DELETE FROM events WHERE debate_id = ?", (debate_id,))
+                self._conn.execute("DELETE FROM debates WHERE id = ?", (debate_id,))
+            self._conn.commit()
+        return len(ids)
+
+
+def get_session_store() -> SessionStore:
+    """Returns the process-wide session store, closing sessions left over by a previous run."""
+    global _store
+    if _store is None:
+        store = SessionStore(SESSION_DB_PATH)
+        store.mark_interrupted()
+        if SESSION_RETENTION_DAYS > 0:
+            store.prune(SESSION_RETENTION_DAYS * 86400)
+        _store = store
+    return _store
+
+
+def close_session_store():
+    """Commits the events still queued. Call at shutdown."""
+    if _store is not None:
+        _store.close()
+
+
+class DebateSession:
+    """A debate running in this process: records its events and wakes up its followers."""
+
+    def __init__(self, debate_id: str, store: SessionStore):
+        self.id = debate_id
+        self.store = store
+        self.events = []
+        self.done = False
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def _publish(self, event: dict):
+        seq = len(self.events) + 1
+        if event['type'] not in TRANSIENT_EVENTS:
+            self.store.append(self.id, seq, event)
+        self.events.append(event)
+        # Wake everyone waiting, then start a fresh event for the next wait
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _run(self, events):
+        status = "done"
+        try:
+            async for event in events:
+                self._publish(event)
+                if event['type'] == 'error':
+                    status = "error"
+        except asyncio.CancelledError:
+            status = "cancelled"
+            self._publish({'type': 'error', 'content': 'The debate was cancelled.'})
+            raise
+        except Exception as e:
+            status = "error"
+            self._publish({'type': 'error', 'content': f'The debate failed: {e}'})
+        finally:
+            self.done = True
+            self.store.finish(self.id, status)
+            self._changed.set()
+            _live.pop(self.id, None)
+
+    async def follow(self, after: int = 0):
+        """Yields (seq, event) for every event numbered above `after`, live until the debate ends."""
+        seq = after
+        while True:
+            changed = self._changed
+            while seq < len(self.events):
+                seq += 1
+                yield seq, self.events[seq - 1]
+            if self.done:
+                return
+            await changed.wait()
+
+
+def start_session(topic: str, params: dict, events) -> DebateSession:
+    """
+    Starts recording a debate in a background task.
+
+    Args:
+        topic: The debate topic.
+        params: The request parameters, kept with the session for reference.
+        events: The async iterator of event dicts to run, e.g. `run_debate(...)`.
+
+    Returns:
+        The live DebateSession. Its first event is {'type': 'session', 'debate_id': ...}.
+    """
+    store = get_session_store()
+    debate_id = uuid.uuid4().hex
+    store.create(debate_id, topic, params)
+    session = DebateSession(debate_id, store)
+    session._publish({'type': 'session', 'debate_id': debate_id})
+    session.task = asyncio.create_task(session._run(events))
+    _live[debate_id] = session
+    return session
+
+
+async def follow_session(debate_id: str, after: int = 0):
+    """
+    Yields (seq, event) for the events of a debate numbered above `after`: recorded ones
+    first, then, while the debate is still running, new ones as they are produced.
+
+    Raises:
+        KeyError: If the debate is unknown.
+    """
+    session = _live.get(debate_id)
+    if session is not None:
+        async for item in session.follow(after):
+            yield item
+        return
+
+    # Finished debates are replayed from the store
+    store = get_session_store()
+    if await run_sync(store.get, debate_id) is None:
+        raise KeyError(debate_id)
+    for item in await run_sync(store.events, debate_id, after):
+        yield item
+
+
+async def session_transcript(debate_id: str) -> dict:
+    """The stored debate with its stances and arguments, or None if unknown."""
+    store = get_session_store()
+    debate = await run_sync(store.get, debate_id)
+    if debate is None:
+        return None
+    events = await run_sync(store.events, debate_id)
+    debate["events"] = len(events)
+    debate["stances"], debate["transcript"] = [], []
+    for _, event in events:
+        if event['type'] == 'agent_stance':
+            debate["stances"].append({"name": event['name'], "stance": event['stance']})
+        elif event['type'] == 'argument':
+            debate["transcript"].append({"name": event['name'], "content": event['content']})
+    return debate
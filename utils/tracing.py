@@ -0,0 +1,263 @@
+# /utils/tracing.py
+
+import time
+import threading
+import contextlib
+from contextvars import ContextVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Latency buckets (seconds) for the Prometheus histogram
+SPAN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# The trace of the debate running in the current task, if any. Tools run in worker threads
+# with a copy of the caller's context, so their spans land in the right debate too.
+_current_trace = ContextVar("debate_trace", default=None)
+
+# Token usage of the agent turn running in the current task, if any (see `usage_scope`)
+_current_usage = ContextVar("turn_usage", default=None)
+_usage_lock = threading.Lock()
+
+# Usage attributes recorded on LLM spans. Cached input tokens are part of input_tokens:
+# they are the prompt prefix the provider served from its context cache.
+TOKEN_KEYS = ("input_tokens", "cached_input_tokens", "output_tokens")
+
+
+class Metrics:
+    """Process-wide counters and latency histograms, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._gauges = {}      # (name, labels) -> value
+
+    @staticmethod
+    def _labels(labels: dict) -> tuple:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, self._labels(labels))] = value
+
+    def add_gauge(self, name: str, value: float, **labels):
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, self._labels(labels))
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * len(SPAN_BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(SPAN_BUCKETS):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self, extra_lines: list = ()) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for kind, series in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted({name for name, _ in series}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (metric, labels), value in sorted(series.items()):
+                        if metric == name:
+                            lines.append(f"{name}{fmt(labels)} {value}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), series in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for i, bound in enumerate(SPAN_BUCKETS):
+                        lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {series[i]}")
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {series[-1]}")
+                    lines.append(f"{name}_sum{fmt(labels)} {round(series[-2], 6)}")
+                    lines.append(f"{name}_count{fmt(labels)} {series[-1]}")
+        return "\n".join(lines + list(extra_lines)) + "\n"
+
+
+metrics = Metrics()
+
+
+class DebateTrace:
+    """Collects the spans of one debate for its timing summary."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans = []  # (name, seconds, attrs)
+        self.started = time.perf_counter()
+
+    def record(self, name: str, seconds: float, attrs: dict):
+        with self._lock:
+            self.spans.append((name, seconds, attrs))
+
+    def summary(self) -> dict:
+        """Per span name: count, total and max latency, plus token counts (cached and not) and cache hits."""
+        result = {}
+        with self._lock:
+            spans = list(self.spans)
+        for name, seconds, attrs in spans:
+            entry = result.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+            for key in TOKEN_KEYS:
+                if attrs.get(key):
+                    entry[key] = entry.get(key, 0) + attrs[key]
+            if "cache" in attrs:
+                entry[f"cache_{attrs['cache']}"] = entry.get(f"cache_{attrs['cache']}", 0) + 1
+        for entry in result.values():
+            entry["total_ms"] = round(entry["total_ms"], 1)
+            entry["max_ms"] = round(entry["max_ms"], 1)
+            if "input_tokens" in entry:
+                entry["uncached_input_tokens"] = entry["input_tokens"] - entry.get("cached_input_tokens", 0)
+        return {"wall_ms": round((time.perf_counter() - self.started) * 1000, 1), "spans": result}
+
+
+def activate_trace(trace: DebateTrace) -> DebateTrace:
+    """
+    Makes `trace` the current debate's trace for the rest of the current task. Each
+    debate runs in its own task (one per SSE stream or batch job), so nothing leaks
+    between debates.
+    """
+    _current_trace.set(trace)
+    return trace
+
+
+@contextlib.contextmanager
+def usage_scope():
+    """
+    Adds up the token usage of every LLM call made inside the block, e.g. one agent turn.
+    Yields the dict being filled: input_tokens, cached_input_tokens and output_tokens.
+    """
+    usage = dict.fromkeys(TOKEN_KEYS, 0)
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+def turn_usage(usage: dict) -> dict:
+    """A `usage_scope` dict with the uncached input tokens spelled out, for events and reports."""
+    return {**usage, "uncached_input_tokens": usage["input_tokens"] - usage["cached_input_tokens"]}
+
+
+def record_span(name: str, seconds: float, **attrs):
+    """Records a finished span in the metrics, the current debate's trace and the current turn's usage."""
+    metrics.observe("debate_span_seconds", seconds, span=name)
+    for key in TOKEN_KEYS:
+        if attrs.get(key):
+            metrics.inc("debate_llm_tokens_total", attrs[key], span=name, kind=key[:-len("_tokens")])
+    usage = _current_usage.get()
+    if usage is not None:
+        with _usage_lock:
+            for key in TOKEN_KEYS:
+                usage[key] += attrs.get(key) or 0
+    if "cache" in attrs:
+        metrics.inc("debate_span_cache_total", span=name, result=attrs["cache"])
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(name, seconds, attrs)
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs):
+    """
+    Times a block of work. Attributes (e.g. cache="hit") can be added to the yielded dict
+    while the block runs. Failed spans are recorded with error=True.
+    """
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException:
+        attrs["error"] = True
+        raise
+    finally:
+        record_span(name, time.perf_counter() - start, **attrs)
+
+
+def llm_usage(response) -> dict:
+    """Extracts token usage from an LLMResult (message usage metadata or provider output)."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {
+                    "input_tokens": usage.get("input_tokens", 0),
+                    "cached_input_tokens": (usage.get("input_token_details") or {}).get("cache_read", 0),
+                    "output_tokens": usage.get("output_tokens", 0),
+                }
+    usage = (response.llm_output or {}).get("usage_metadata") or {}
+    return {
+        "input_tokens": usage.get("prompt_token_count", 0),
+        "cached_input_tokens": usage.get("cached_content_token_count", 0),
+        "output_tokens": usage.get("candidates_token_count", 0),
+    }
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler turning every LLM and tool call into a span."""
+
+    # Cheap and thread-safe, so skip the executor hop LangChain uses for sync handlers
+    run_inline = True
+
+    def __init__(self):
+        self._starts = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, name):
+        with self._lock:
+            self._starts[run_id] = (name, time.perf_counter())
+
+    def _end(self, run_id, **attrs):
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+        if started is not None:
+            name, start = started
+            record_span(name, time.perf_counter() - start, **attrs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm_call")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm_call")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, **llm_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, f"tool_call.{(serialized or {}).get('name', 'tool')}")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+
+# Stateless apart from in-flight start times, so one instance serves every call
+tracing_handler = TracingCallbackHandler()
+
+
+def tracing_config() -> dict:
+    """The `config` to pass to invoke/ainvoke/astream_events so calls are traced."""
+    return {"callbacks": [tracing_handler]}
@@ -0,0 +1,376 @@
+# /utils/transcript.py
+"""
+Compact debate transcripts and their append-only archive.
+
+In memory, a debate is a Transcript: its stances and one TurnRecord per argument.
+TurnRecord uses __slots__ and interned agent names, so a turn costs little more than
+its text, and it keeps each turn's tool calls, wall time and tokens.
+
+On disk, debates are appended to a gzip-compressed JSONL archive (`*.jsonl.gz`), one
+debate after another:
+
+    {"debate": "q-17", "topic": "...", "stances": [["Agent A", "..."], ...], "turns": 6, ...}
+    ["Agent A", "text of the turn", 1, 4.21, 1830, 1412, 96]      <- TURN_FIELDS, in order
+    ["Agent B", "...", 0, 2.87, 1911, 1530, 88]
+
+A debate's header (an object) comes first, then its turns (arrays). Each debate is
+compressed as its own gzip member and appended in one write, so every gzip reader sees
+one continuous file. A crash can only leave the last member unfinished: readers stop
+before it, and reopening the archive cuts it off before appending, so an interrupted
+run resumes with every complete debate intact.
+
+`iter_debates` and `iter_turns` read an archive lazily, one line at a time, so no
+debate is ever loaded whole. `export_parquet` converts an archive to Parquet (one row
+per turn), which needs the optional pyarrow package.
+
+Usage:
+    python -m utils.transcript stats archive.jsonl.gz
+    python -m utils.transcript export archive.jsonl.gz archive.parquet
+"""
+
+import os
+import sys
+import gzip
+import json
+import uuid
+import zlib
+import argparse
+import threading
+
+from utils.console import warn
+
+# --- Configuration ---
+# Where the engine appends every finished debate; empty to keep transcripts in memory only
+TRANSCRIPT_ARCHIVE = os.getenv("DEBATE_TRANSCRIPT_ARCHIVE", "")
+ARCHIVE_SUFFIX = ".jsonl.gz"
+PARQUET_BATCH_TURNS = 10000  # Turns per Parquet row group
+COMPRESS_LEVEL = 6
+
+# Every member starts with these bytes (no file name, mtime 0), which lets the start of
+# the last member be found from the end of the file
+_MEMBER_HEADER = gzip.compress(b"", compresslevel=COMPRESS_LEVEL, mtime=0)[:10]
+_TAIL_CHUNK = 1 << 20
+
+TURN_FIELDS = ("name", "content", "tool_calls", "seconds", "input_tokens", "cached_input_tokens", "output_tokens")
+
+_archives = {}  # path -> TranscriptArchive shared by this process
+_archives_lock = threading.Lock()
+
+
+class TurnRecord:
+    """One argument of a debate, with what it took to produce it."""
+
+    __slots__ = TURN_FIELDS
+
+    def __init__(self, name: str, content: str, tool_calls: int = 0, seconds: float = 0.0,
+                 input_tokens: int = 0, cached_input_tokens: int = 0, output_tokens: int = 0):
+        self.name = sys.intern(name)  # A handful of names repeated over millions of turns
+        self.content = content
+        self.tool_calls = tool_calls
+        self.seconds = seconds
+        self.input_tokens = input_tokens
+        self.cached_input_tokens = cached_input_tokens
+        self.output_tokens = output_tokens
+
+    @classmethod
+    def from_event(cls, event: dict) -> "TurnRecord":
+        """The record of an engine 'argument' event."""
+        usage = event.get('usage', {})
+        return cls(
+            event['name'],
+            event['content'],
+            tool_calls=event.get('tool_calls', 0),
+            seconds=event.get('seconds', 0.0),
+            input_tokens=usage.get("input_tokens", 0),
+            cached_input_tokens=usage.get("cached_input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+        )
+
+    @classmethod
+    def from_row(cls, row: list) -> "TurnRecord":
+        return cls(*row)
+
+    def to_row(self) -> list:
+        return [getattr(self, field) for field in TURN_FIELDS]
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in TURN_FIELDS}
+
+    def __repr__(self):
+        return f"TurnRecord({self.name!r}, {self.content[:40]!r}..., tool_calls={self.tool_calls})"
+
+
+class Transcript:
+    """A debate's stances and turns, built from the engine's events as they arrive."""
+
+    __slots__ = ("debate_id", "topic", "stances", "turns", "meta")
+
+    def __init__(self, topic: str, debate_id: str = None, **meta):
+        self.debate_id = debate_id or uuid.uuid4().hex
+        self.topic = topic
+        self.stances = []  # (name, stance)
+        self.turns = []    # TurnRecord
+        self.meta = meta   # Anything else worth archiving with the debate (status, usage...)
+
+    def add(self, event: dict) -> TurnRecord:
+        """Records an 'agent_stance' or 'argument' event; other events are ignored.
+        Returns the new TurnRecord for an argument, else None."""
+        if event['type'] == 'agent_stance':
+            self.stances.append((sys.intern(event['name']), event['stance']))
+        elif event['type'] == 'argument':
+            turn = TurnRecord.from_event(event)
+            self.turns.append(turn)
+            return turn
+        return None
+
+    def header(self) -> dict:
+        return {
+            "debate": self.debate_id,
+            "topic": self.topic,
+            "stances": [list(stance) for stance in self.stances],
+            "turns": len(self.turns),
+            **self.meta,
+        }
+
+    def __iter__(self):
+        return iter(self.turns)
+
+    def __len__(self):
+        return len(self.turns)
+
+
+def _last_member_start(f, size: int) -> int:
+    """Offset of the last member header in the file, or 0 if there is none."""
+    end = size
+    while end > 0:
+        start = max(0, end - _TAIL_CHUNK)
+        f.seek(start)
+        # Overlap by a header's length so one split across chunks is still found
+        found = f.read(min(size, end + len(_MEMBER_HEADER)) - start).rfind(_MEMBER_HEADER)
+        if found != -1:
+            return start + found
+        end = start
+    return 0
+
+
+def seal_archive(path: str) -> int:
+    """
+    Cuts off an unfinished last member, as left by a crash mid-write, so appending
+    after it keeps the archive readable. Returns how many bytes were removed.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r+b") as f:
+        size = os.fstat(f.fileno()).st_size
+        start = _last_member_start(f, size)
+        f.seek(start)
+        decompressor = zlib.decompressobj(wbits=31)
+        try:
+            while not decompressor.eof:
+                data = f.read(_TAIL_CHUNK)
+                if not data:
+                    break
+                decompressor.decompress(data)
+        except zlib.error:
+            pass
+        if decompressor.eof:
+            # Complete; anything after it is the start of a member that was never written out
+            end = f.tell() - len(decompressor.unused_data)
+        else:
+            end = start
+        if end < size:
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+        return size - end
+
+
+class TranscriptArchive:
+    """
+    An append-only gzip JSONL archive of debates, safe to share between threads.
+    `append` blocks on disk I/O: call it through `run_sync` from async code.
+    """
+
+    def __init__(self, path: str):
+        if not path.endswith(ARCHIVE_SUFFIX):
+            raise ValueError(f"Transcript archives are gzip JSONL files; '{path}' should end with {ARCHIVE_SUFFIX}.")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        cut = seal_archive(path)
+        if cut:
+            warn(f"Transcript archive {path}: dropped {cut} bytes of a debate a crash left unfinished.")
+        self._file = open(path, "ab")
+
+    def append(self, transcript: Transcript):
+        """Writes one debate, header then turns, as one gzip member and syncs it to disk."""
+        lines = [json.dumps(transcript.header(), ensure_ascii=False, separators=(",", ":"))]
+        lines.extend(json.dumps(turn.to_row(), ensure_ascii=False, separators=(",", ":")) for turn in transcript)
+        member = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), compresslevel=COMPRESS_LEVEL, mtime=0)
+        with self._lock:
+            self._file.write(member)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def get_archive(path: str = TRANSCRIPT_ARCHIVE) -> TranscriptArchive:
+    """The process-wide archive at `path` (DEBATE_TRANSCRIPT_ARCHIVE by default), or None if unset."""
+    if not path:
+        return None
+    with _archives_lock:
+        if path not in _archives:
+            _archives[path] = TranscriptArchive(path)
+        return _archives[path]
+
+
+# --- Reading ---
+def _lines(path: str):
+    """The decoded lines of an archive, stopping quietly where an interrupted write cut it."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut short by a crash
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            return  # An unfinished member: nothing after it was written by a clean run
+
+
+def iter_debates(path: str):
+    """
+    Yields (header, turns) for every debate of an archive, in order. `turns` is an
+    iterator of TurnRecord over that debate's lines; whatever the caller does not
+    read is skipped before the next debate, so memory never holds more than one line.
+    """
+    lines = _lines(path)
+    line = next(lines, None)
+    while line is not None:
+        if not isinstance(line, dict):
+            line = next(lines, None)  # Turns without a header: their debate's start was lost
+            continue
+        following = {"line": None}
+
+        def turns():
+            for row in lines:
+                if isinstance(row, dict):
+                    following["line"] = row
+                    return
+                yield TurnRecord.from_row(row)
+
+        debate_turns = turns()
+        yield line, debate_turns
+        for _ in debate_turns:
+            pass
+        line = following["line"]
+
+
+def iter_turns(path: str):
+    """Yields (debate id, TurnRecord) for every turn of an archive."""
+    for header, turns in iter_debates(path):
+        for turn in turns:
+            yield header["debate"], turn
+
+
+def load_transcript(header: dict, turns) -> Transcript:
+    """Builds a whole Transcript from one `iter_debates` item, for when one debate is needed in memory."""
+    meta = {key: value for key, value in header.items() if key not in ("debate", "topic", "stances", "turns")}
+    transcript = Transcript(header["topic"], header["debate"], **meta)
+    transcript.stances = [(sys.intern(name), stance) for name, stance in header["stances"]]
+    transcript.turns = list(turns)
+    return transcript
+
+
+def archive_stats(path: str) -> dict:
+    """Debates, turns and sizes of an archive, read in one lazy pass."""
+    debates = turns = text_bytes = 0
+    for _, debate_turns in iter_debates(path):
+        debates += 1
+        for turn in debate_turns:
+            turns += 1
+            text_bytes += len(turn.content.encode("utf-8"))
+    size = os.path.getsize(path)
+    return {
+        "debates": debates,
+        "turns": turns,
+        "archive_bytes": size,
+        "text_bytes": text_bytes,
+        "bytes_per_turn": round(size / turns, 1) if turns else 0.0,
+    }
+
+
+# --- Parquet export ---
+def export_parquet(path: str, out: str, batch_turns: int = PARQUET_BATCH_TURNS) -> int:
+    """
+    Converts an archive to a Parquet file with one row per turn (the debate id, topic
+    and speaker's stance on every row, dictionary-encoded), written a row group at a
+    time. Returns the number of turns written.
+
+    Raises:
+        RuntimeError: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow") from e
+
+    schema = pa.schema([
+        ("debate", pa.string()),
+        ("topic", pa.string()),
+        ("turn", pa.int32()),
+        ("name", pa.string()),
+        ("stance", pa.string()),
+        ("content", pa.string()),
+        ("tool_calls", pa.int32()),
+        ("seconds", pa.float32()),
+        ("input_tokens", pa.int32()),
+        ("cached_input_tokens", pa.int32()),
+        ("output_tokens", pa.int32()),
+    ])
+    columns = {field.name: [] for field in schema}
+    written = 0
+
+    with pq.ParquetWriter(out, schema, compression="zstd", use_dictionary=True) as writer:
+        def flush():
+            if columns["debate"]:
+                writer.write_table(pa.table(columns, schema=schema))
+                for values in columns.values():
+                    values.clear()
+
+        for header, turns in iter_debates(path):
+            stances = dict(header["stances"])
+            for number, turn in enumerate(turns):
+                columns["debate"].append(header["debate"])
+                columns["topic"].append(header["topic"])
+                columns["turn"].append(number)
+                columns["stance"].append(stances.get(turn.name))
+                for field in TURN_FIELDS:
+                    columns[field].append(getattr(turn, field))
+                written += 1
+                if len(columns["debate"]) >= batch_turns:
+                    flush()
+        flush()
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or export a debate transcript archive.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats_parser = commands.add_parser("stats", help="Count the debates and turns of an archive.")
+    stats_parser.add_argument("archive")
+    export_parser = commands.add_parser("export", help="Convert an archive to Parquet (needs pyarrow).")
+    export_parser.add_argument("archive")
+    export_parser.add_argument("out")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(archive_stats(args.archive), indent=2))
+    else:
+        print(f"Exported {export_parquet(args.archive, args.out)} turns to {args.out}")